@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import auth, orders, client, files
+from app.api.v1.endpoints import auth, orders, analytics, client, files, uploads, system
 
 api_router = APIRouter()
 
@@ -8,9 +8,12 @@ api_router.include_router(auth.router, prefix="/auth", tags=["Authentication"])
 
 # Admin routes
 api_router.include_router(orders.router, prefix="/admin/orders", tags=["Admin - Orders"])
+api_router.include_router(analytics.router, prefix="/admin/orders", tags=["Admin - Analytics"])
+api_router.include_router(system.router, prefix="/admin/system", tags=["Admin - System"])
 
 # Client routes
 api_router.include_router(client.router, prefix="/client", tags=["Client"])
 
 # File routes
 api_router.include_router(files.router, prefix="/files", tags=["Files"])
+api_router.include_router(uploads.router, prefix="/files/uploads", tags=["Files - Resumable Uploads"])
@@ -0,0 +1,77 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime, timedelta
+from typing import Optional, Literal
+from app.db.session import get_db
+from app.core.config import settings
+from app.core.deps import get_current_admin
+from app.core.dates import as_utc
+from app.models.admin import Admin
+from app.schemas.analytics import AnalyticsTimeseriesResponse, AnalyticsSummaryResponse
+from app.services.order_cache import order_cache
+from app.services import rollups
+
+router = APIRouter()
+
+DEFAULT_WINDOWS = {"hour": timedelta(hours=48), "day": timedelta(days=30)}
+
+
+async def require_order(db: AsyncSession, order_id: int):
+    order = await order_cache.get_by_id(db, order_id)
+    if not order:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Order not found"
+        )
+    return order
+
+
+@router.get("/{order_id}/analytics", response_model=AnalyticsSummaryResponse)
+async def get_order_analytics(
+    order_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_admin: Admin = Depends(get_current_admin)
+):
+    """
+    All-time access totals for an order: events per action, per file, and unique IPs
+    - Read from the daily rollups; cost does not grow with the number of log rows
+    """
+    await require_order(db, order_id)
+
+    return {"order_id": order_id, **await rollups.summary(db, order_id)}
+
+
+@router.get("/{order_id}/analytics/timeseries", response_model=AnalyticsTimeseriesResponse)
+async def get_order_analytics_timeseries(
+    order_id: int,
+    granularity: Literal["hour", "day"] = "day",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_db),
+    current_admin: Admin = Depends(get_current_admin)
+):
+    """
+    Events per action in hourly or daily UTC buckets over [start, end)
+    - Defaults to the last 48 hours (hour) or 30 days (day)
+    - Daily buckets include a unique-IP estimate
+    """
+    await require_order(db, order_id)
+
+    end = as_utc(end) if end else datetime.utcnow()
+    start = as_utc(start) if start else end - DEFAULT_WINDOWS[granularity]
+
+    if start >= end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start must be before end"
+        )
+
+    if (end - start) / rollups.BUCKET_SIZES[granularity] > settings.ANALYTICS_MAX_BUCKETS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Range spans more than {settings.ANALYTICS_MAX_BUCKETS} {granularity} buckets"
+        )
+
+    buckets = await rollups.timeseries(db, order_id, granularity, start, end)
+
+    return {"order_id": order_id, "granularity": granularity, "start": start, "end": end, "buckets": buckets}
@@ -1,38 +1,73 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from datetime import timedelta
 from app.db.session import get_db
-from app.core.security import verify_password, create_access_token
+from app.core.security import verify_password_async, create_access_token, PasswordHasherBusy
 from app.core.config import settings
+from app.core.deps import get_client_ip
+from app.core.rate_limit import SlidingWindowLimiter
 from app.models.admin import Admin
 from app.schemas.admin import Token
 
 router = APIRouter()
 
+# Brute-force protection: every attempt counts per IP, failures count per
+# (username, IP), so failures from one client never lock the account out for others
+ip_limiter = SlidingWindowLimiter(settings.LOGIN_MAX_ATTEMPTS_PER_IP, settings.LOGIN_ATTEMPT_WINDOW_SECONDS)
+username_limiter = SlidingWindowLimiter(settings.LOGIN_MAX_FAILURES_PER_USERNAME, settings.LOGIN_ATTEMPT_WINDOW_SECONDS)
+
 
 @router.post("/login", response_model=Token)
 async def login(
+    request: Request,
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: AsyncSession = Depends(get_db)
 ):
     """
     Admin login endpoint
     Returns JWT token for authentication
+    - Rate limited per IP and per (username, IP) before any bcrypt work
+    - Password verification runs in a bounded thread pool, off the event loop
     """
+    ip = get_client_ip(request)
+    user_key = f"{form_data.username}|{ip}"
+    retry_after = max(ip_limiter.retry_after(ip), username_limiter.retry_after(user_key))
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts, try again later",
+            headers={"Retry-After": str(retry_after)},
+        )
+    ip_limiter.hit(ip)
+    
     # Query admin by username
     result = await db.execute(select(Admin).where(Admin.username == form_data.username))
     admin = result.scalar_one_or_none()
     
     # Verify credentials
-    if not admin or not verify_password(form_data.password, admin.hashed_password):
+    try:
+        valid = await verify_password_async(
+            form_data.password, admin.hashed_password if admin else None
+        )
+    except PasswordHasherBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Login service busy, try again shortly",
+            headers={"Retry-After": "1"},
+        )
+    
+    if not valid:
+        username_limiter.hit(user_key)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    username_limiter.reset(user_key)
+    
     # Create access token
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
@@ -1,35 +1,42 @@
-from fastapi import APIRouter, Depends, BackgroundTasks, Request
+from fastapi import APIRouter, Depends, BackgroundTasks, HTTPException, Request, Query, status
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from datetime import datetime
+from typing import Optional
 from app.db.session import get_db
+from app.core.config import settings
 from app.core.deps import get_order_by_hash, get_client_ip, get_user_agent
 from app.models.order import Order
-from app.models.file import File
-from app.models.log import AccessLog
+from app.models.file import File, FileType
 from app.schemas.order import OrderResponse
 from app.schemas.file import FileListResponse
+from app.schemas.client import ClientLandingResponse
+from app.services.access_log import access_log_writer
+from app.services import blob_store
+from app.services.storage import storage
+from app.services.downloads import content_disposition, if_none_match
+from app.services.landing_cache import landing_cache
+from app.services.zipstream import ZipEntry, compression_for, unique_names, archive_size, stream_zip
 
 router = APIRouter()
 
 
 async def log_access(
-    db: AsyncSession,
     order_id: int,
     ip_address: str,
     user_agent: str,
     action_type: str,
     target_file: str = None
 ):
-    """Background task to log access"""
-    log = AccessLog(
+    """Queue an access log row for the batched writer"""
+    await access_log_writer.record(
         order_id=order_id,
         ip_address=ip_address,
         user_agent=user_agent,
         action_type=action_type,
         target_file=target_file
     )
-    db.add(log)
-    await db.commit()
 
 
 @router.get("/{access_key}/info", response_model=OrderResponse)
@@ -37,7 +44,6 @@ async def get_order_info(
     access_key: str,
     request: Request,
     background_tasks: BackgroundTasks,
-    db: AsyncSession = Depends(get_db),
     order: Order = Depends(get_order_by_hash)
 ):
     """
@@ -50,7 +56,6 @@ async def get_order_info(
     
     background_tasks.add_task(
         log_access,
-        db=db,
         order_id=order.id,
         ip_address=ip,
         user_agent=ua,
@@ -60,6 +65,52 @@ async def get_order_info(
     return order
 
 
+@router.get(
+    "/{access_key}/landing",
+    response_model=ClientLandingResponse,
+    responses={304: {"description": "Not modified since the ETag in If-None-Match"}}
+)
+async def get_landing(
+    access_key: str,
+    request: Request,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Order info and file list in one response, for the client page
+    - One joined query on a cache miss, none on a hit
+    - ETag / If-None-Match: repeat visits get 304 with no body
+    - Logs the visit in background, like /info
+    """
+    entry = await landing_cache.get(db, access_key)
+    
+    if entry is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Order not found or invalid access key"
+        )
+    
+    if entry["expires_at"] and entry["expires_at"] < datetime.utcnow():
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Order has expired"
+        )
+    
+    background_tasks.add_task(
+        log_access,
+        order_id=entry["order_id"],
+        ip_address=get_client_ip(request),
+        user_agent=get_user_agent(request),
+        action_type="VISIT_PAGE"
+    )
+    
+    headers = {"ETag": entry["etag"], "Cache-Control": "private, no-cache"}
+    if if_none_match(request, entry["etag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    return Response(content=entry["body"], media_type="application/json", headers=headers)
+
+
 @router.get("/{access_key}/files", response_model=FileListResponse)
 async def get_order_files(
     access_key: str,
@@ -75,3 +126,76 @@ async def get_order_files(
     files = result.scalars().all()
     
     return {"files": files}
+
+
+@router.get("/{access_key}/bundle.zip")
+async def download_bundle(
+    access_key: str,
+    request: Request,
+    file_type: Optional[FileType] = Query(None, description="Only include req or source files"),
+    db: AsyncSession = Depends(get_db),
+    order: Order = Depends(get_order_by_hash)
+):
+    """
+    Download all of the order's files as one ZIP archive
+    - Built on the fly while streaming; no temp files, bounded memory
+    - Already-compressed formats are stored, everything else deflated
+    - Content-Length is sent when every member is stored
+    - Logs a single DOWNLOAD_BUNDLE entry once the whole archive has been
+      sent; aborted downloads are not logged
+    """
+    query = select(File).where(File.order_id == order.id)
+    if file_type is not None:
+        query = query.where(File.file_type == file_type)
+    result = await db.execute(query.order_by(File.uploaded_at, File.id))
+    files = result.scalars().all()
+    
+    if not files:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No files to download"
+        )
+    
+    def opener(filename_saved: str):
+        key = blob_store.storage_key(filename_saved)
+        return lambda: storage.open_stream(key, chunk_size=settings.DOWNLOAD_CHUNK_SIZE)
+    
+    names = unique_names([f.filename_original for f in files])
+    entries = [
+        ZipEntry(
+            name=name,
+            size=f.file_size,
+            modified=f.uploaded_at,
+            open=opener(f.filename_saved),
+            method=compression_for(name),
+        )
+        for name, f in zip(names, files)
+    ]
+    
+    bundle_name = f"order-{order.id}-{file_type.value}.zip" if file_type else f"order-{order.id}.zip"
+    headers = {"Content-Disposition": content_disposition(bundle_name)}
+    size = archive_size(entries)
+    if size is not None:
+        headers["Content-Length"] = str(size)
+    
+    ip_address = get_client_ip(request)
+    user_agent = get_user_agent(request)
+    
+    async def stream_and_log():
+        async for chunk in stream_zip(entries):
+            yield chunk
+        # Reached only once the last chunk has been sent; a client that
+        # disconnects mid-stream cancels the generator before this point
+        await log_access(
+            order_id=order.id,
+            ip_address=ip_address,
+            user_agent=user_agent,
+            action_type="DOWNLOAD_BUNDLE",
+            target_file=f"{bundle_name} ({len(entries)} files)"
+        )
+    
+    return StreamingResponse(
+        stream_and_log(),
+        media_type="application/zip",
+        headers=headers
+    )
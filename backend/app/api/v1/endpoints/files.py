@@ -1,9 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File as FastAPIFile, BackgroundTasks, Request, Query
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks, Request, Query
+from fastapi.responses import Response, RedirectResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-import uuid
-import os
 from pathlib import Path
 from typing import Optional
 from app.db.session import get_db
@@ -12,8 +10,23 @@ from app.core.deps import get_current_admin, get_order_by_hash, get_client_ip, g
 from app.models.admin import Admin
 from app.models.order import Order
 from app.models.file import File, FileType
-from app.models.log import AccessLog
 from app.schemas.file import FileResponse
+from app.services.uploads import (
+    MultipartFileStream, MultipartError, MULTIPART_OVERHEAD, check_content_length, receive_upload, discard_upload,
+)
+from app.services import blob_store
+from app.services.storage import storage
+from app.services import compression
+from app.services.compression import compression_worker
+from app.services.blob_gc import deletion_worker
+from app.services.access_log import access_log_writer
+from app.services.order_cache import order_cache
+from app.services.landing_cache import landing_cache
+from app.services.order_stats import adjust_file_totals
+from app.services.downloads import (
+    FileRangeResponse, StorageRangeResponse, make_etag, http_date, content_disposition,
+    is_not_modified, parse_range_header, covers_end, offload_response,
+)
 
 router = APIRouter()
 
@@ -27,6 +40,23 @@ ALLOWED_EXTENSIONS = {
 }
 
 
+# upload_file parses its body itself; describe it for the OpenAPI docs
+UPLOAD_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                    "required": ["file"],
+                }
+            }
+        },
+    }
+}
+
+
 def is_allowed_file(filename: str) -> bool:
     """Check if file extension is allowed"""
     ext = Path(filename).suffix.lower()
@@ -34,38 +64,44 @@ def is_allowed_file(filename: str) -> bool:
 
 
 async def log_download(
-    db: AsyncSession,
     order_id: int,
     ip_address: str,
     user_agent: str,
     filename: str
 ):
-    """Background task to log file download"""
-    log = AccessLog(
+    """Queue a file download log row for the batched writer"""
+    await access_log_writer.record(
         order_id=order_id,
         ip_address=ip_address,
         user_agent=user_agent,
         action_type="DOWNLOAD_SUCCESS",
         target_file=filename
     )
-    db.add(log)
-    await db.commit()
 
 
-@router.post("/upload", response_model=FileResponse, status_code=status.HTTP_201_CREATED)
+@router.post(
+    "/upload",
+    response_model=FileResponse,
+    status_code=status.HTTP_201_CREATED,
+    openapi_extra=UPLOAD_REQUEST_BODY,
+)
 async def upload_file(
     access_key: str,
     file_type: FileType,
-    file: UploadFile = FastAPIFile(...),
+    request: Request,
     db: AsyncSession = Depends(get_db),
     current_admin: Admin = Depends(get_current_admin)
 ):
     """
-    Upload a file for an order
+    Upload a file for an order, as the multipart/form-data field "file"
     - Validates file extension
-    - Renames to UUID for security
+    - Streams the body straight to disk in chunks, enforcing UPLOAD_MAX_SIZE
+      (a larger declared Content-Length is refused before reading)
+    - Stores content-addressed: identical uploads share one blob on disk
     - Stores metadata in database
     """
+    check_content_length(request, settings.UPLOAD_MAX_SIZE, MULTIPART_OVERHEAD)
+    
     # Get order by access_key
     result = await db.execute(select(Order).where(Order.access_key == access_key))
     order = result.scalar_one_or_none()
@@ -75,50 +111,64 @@ async def upload_file(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Order not found"
         )
+    order_id = order.id
+    
+    # The body may take minutes to arrive; don't keep a pooled connection meanwhile
+    await db.rollback()
+    
+    try:
+        upload = MultipartFileStream(request, "file")
+        filename = await upload.start()
+    except MultipartError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     
     # Validate file extension
-    if not is_allowed_file(file.filename):
+    if not is_allowed_file(filename):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"File type not allowed. Allowed extensions: {', '.join(ALLOWED_EXTENSIONS)}"
         )
     
-    # Generate UUID filename with original extension
-    original_ext = Path(file.filename).suffix
-    uuid_filename = f"{uuid.uuid4()}{original_ext}"
-    
-    # Save file to disk
-    file_path = Path(settings.UPLOAD_DIR) / uuid_filename
-    
+    # Stream the file to a temp file in chunks, then hand it to the blob store;
+    # identical content already stored only gains a reference
+    spooled = await receive_upload(
+        upload.chunks(),
+        Path(settings.UPLOAD_DIR),
+        max_size=settings.UPLOAD_MAX_SIZE,
+        chunk_size=settings.UPLOAD_CHUNK_SIZE,
+    )
     try:
-        content = await file.read()
-        with open(file_path, "wb") as f:
-            f.write(content)
-        
-        file_size = len(content)
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to save file: {str(e)}"
-        )
+        digest = await blob_store.store(db, spooled)
+    except BaseException:
+        await discard_upload(spooled)
+        raise
     
     # Create file record in database
     db_file = File(
-        order_id=order.id,
-        filename_original=file.filename,
-        filename_saved=uuid_filename,
-        file_size=file_size,
+        order_id=order_id,
+        filename_original=filename,
+        filename_saved=digest,
+        file_size=spooled.size,
+        content_hash=digest,
         file_type=file_type
     )
     
     db.add(db_file)
+    await adjust_file_totals(db, order_id, 1, spooled.size)
     await db.commit()
     await db.refresh(db_file)
+    await landing_cache.invalidate(access_key)
+    
+    # Precompressed download variants are built in the background
+    compression_worker.enqueue(db_file.filename_saved, db_file.filename_original, db_file.file_size)
     
     return db_file
 
 
-@router.get("/download/{file_id}")
+@router.api_route("/download/{file_id}", methods=["GET", "HEAD"])
 async def download_file(
     file_id: int,
     request: Request,
@@ -129,8 +179,15 @@ async def download_file(
     """
     Download a file
     - Can be accessed by admin (with JWT) or client (with access_key)
-    - Logs download in background
-    - Returns file as streaming response
+    - Supports single and multiple byte ranges (206) for resumable downloads
+    - Answers If-None-Match / If-Modified-Since with 304
+    - Bytes are shipped by sendfile / chunked reads, or by the reverse proxy
+      when FILE_SERVE_MODE is x-accel-redirect / x-sendfile
+    - With STORAGE_BACKEND=s3, redirects to a presigned bucket URL
+      (S3_PRESIGNED_DOWNLOADS) or streams from the bucket
+    - Text deliverables honour Accept-Encoding: a precompressed variant when
+      one exists, otherwise compressed while streaming
+    - Logs one download per completed transfer in background
     """
     # Get file from database
     result = await db.execute(select(File).where(File.id == file_id))
@@ -143,49 +200,132 @@ async def download_file(
         )
     
     # Verify access
+    order = None
     if access_key:
         # Client access - verify access_key matches file's order
-        order_result = await db.execute(select(Order).where(Order.id == db_file.order_id))
-        order = order_result.scalar_one_or_none()
+        order = await order_cache.get_by_id(db, db_file.order_id)
         
         if not order or order.access_key != access_key:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Access denied"
             )
-        
-        # Log download in background
+    
+    # Check if file exists on disk (remote backends are trusted to hold it)
+    key = blob_store.storage_key(db_file.filename_saved)
+    file_path = storage.local_path(key)
+    
+    if file_path is not None and not file_path.exists():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="File not found on server"
+        )
+    
+    etag = make_etag(db_file.content_hash, db_file.filename_saved, db_file.file_size, db_file.uploaded_at)
+    media_type = compression.media_type_for(db_file.filename_original)
+    size = db_file.file_size
+    
+    # Negotiate a compressed representation for text deliverables. Range
+    # requests and proxy offload always get the stored bytes.
+    encoding = None
+    variants = {}
+    negotiable = (
+        request.method == "GET"
+        and "range" not in request.headers
+        and (file_path is None or settings.FILE_SERVE_MODE == "inline")
+        and compression.is_compressible(db_file.filename_original, size)
+    )
+    if negotiable:
+        variants = await compression.load_variants(db, db_file.filename_saved)
+        offered = [e for e in compression.PRECOMPRESSED_ENCODINGS if e in variants] or compression.STREAMING_ENCODINGS
+        encoding = compression.negotiate(request.headers.get("accept-encoding"), offered)
+        if encoding is not None:
+            etag = compression.encoded_etag(etag, encoding)
+    
+    headers = {
+        "ETag": etag,
+        "Last-Modified": http_date(db_file.uploaded_at),
+        "Cache-Control": "private, no-cache",
+    }
+    if negotiable:
+        headers["Vary"] = "Accept-Encoding"
+    
+    if is_not_modified(request, etag, db_file.uploaded_at):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    ranges = parse_range_header(request, size, etag, db_file.uploaded_at)
+    
+    # Log download in background, once per logical download: either a full
+    # response or the range request that fetches the final byte
+    if order is not None and request.method == "GET" and covers_end(ranges, size):
         ip = get_client_ip(request)
         ua = get_user_agent(request)
         background_tasks.add_task(
             log_download,
-            db=db,
             order_id=order.id,
             ip_address=ip,
             user_agent=ua,
             filename=db_file.filename_original
         )
     
-    # Check if file exists on disk
-    file_path = Path(settings.UPLOAD_DIR) / db_file.filename_saved
+    headers["Content-Disposition"] = content_disposition(db_file.filename_original)
     
-    if not file_path.exists():
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="File not found on server"
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+        if encoding not in variants:
+            # No variant yet (still being built, or not worth keeping): compress while streaming
+            headers["Content-Type"] = media_type
+            return StreamingResponse(
+                compression.compress_stream(
+                    storage.open_stream(key, chunk_size=settings.DOWNLOAD_CHUNK_SIZE), encoding
+                ),
+                headers=headers,
+            )
+        # Serve the precompressed variant like any stored file
+        key = blob_store.variant_key(db_file.filename_saved, encoding)
+        size = variants[encoding]
+        if file_path is not None:
+            file_path = storage.local_path(key)
+    
+    if file_path is None:
+        # Remote storage: send the client straight to the bucket when possible,
+        # otherwise stream the bytes through
+        if settings.S3_PRESIGNED_DOWNLOADS and request.method == "GET":
+            url = await storage.presigned_url(
+                key,
+                db_file.filename_original,
+                settings.S3_PRESIGN_EXPIRE_SECONDS,
+                content_type=media_type,
+                content_encoding=encoding,
+            )
+            if url:
+                return RedirectResponse(url, status_code=status.HTTP_307_TEMPORARY_REDIRECT)
+        return StorageRangeResponse(
+            storage,
+            key,
+            size=size,
+            ranges=ranges,
+            headers=headers,
+            media_type=media_type,
+            chunk_size=settings.DOWNLOAD_CHUNK_SIZE,
         )
     
-    # Stream file to client
-    def iterfile():
-        with open(file_path, "rb") as f:
-            yield from f
-    
-    return StreamingResponse(
-        iterfile(),
-        media_type="application/octet-stream",
-        headers={
-            "Content-Disposition": f'attachment; filename="{db_file.filename_original}"'
-        }
+    if settings.FILE_SERVE_MODE != "inline":
+        return offload_response(
+            settings.FILE_SERVE_MODE,
+            key,
+            prefix=settings.FILE_ACCEL_PREFIX,
+            directory=Path(settings.UPLOAD_DIR),
+            headers=headers,
+        )
+    
+    return FileRangeResponse(
+        file_path,
+        size=size,
+        ranges=ranges,
+        headers=headers,
+        media_type=media_type,
+        chunk_size=settings.DOWNLOAD_CHUNK_SIZE,
     )
 
 
@@ -207,13 +347,18 @@ async def delete_file(
             detail="File not found"
         )
     
-    # Delete file from disk
-    file_path = Path(settings.UPLOAD_DIR) / db_file.filename_saved
-    if file_path.exists():
-        os.remove(file_path)
-    
-    # Delete from database
+    # Drop this file's reference to its blob, then delete the row
+    unreferenced = await blob_store.release(db, db_file.filename_saved)
     await db.delete(db_file)
+    await adjust_file_totals(db, db_file.order_id, -1, -db_file.file_size)
     await db.commit()
     
+    # Remove the bytes, in the background, only once the last reference is gone
+    if unreferenced:
+        await deletion_worker.submit(db_file.filename_saved)
+    
+    order = await order_cache.get_by_id(db, db_file.order_id)
+    if order is not None:
+        await landing_cache.invalidate(order.access_key)
+    
     return None
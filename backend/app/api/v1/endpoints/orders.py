@@ -1,19 +1,41 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File as FastAPIFile
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete, func
-from typing import Optional
+from sqlalchemy import select, insert, delete, func, tuple_
+from sqlalchemy.exc import IntegrityError
+from pydantic import ValidationError
+from datetime import datetime
+from typing import Optional, Literal
+import csv
+import io
 import secrets
 import string
 from app.db.session import get_db
+from app.core.config import settings
 from app.core.deps import get_current_admin
+from app.core.pagination import encode_cursor, decode_cursor, cached_count
+from app.core.dates import as_utc
 from app.models.admin import Admin
 from app.models.order import Order, OrderStatus
 from app.models.log import AccessLog
-from app.schemas.order import OrderCreate, OrderResponse, OrderListResponse
+from app.models.file import File
+from app.schemas.order import (
+    OrderCreate, OrderUpdate, OrderAdminResponse, OrderListResponse, OrderBulkCreateResponse,
+)
 from app.schemas.log import AccessLogResponse, AccessLogListResponse
+from app.services.order_cache import order_cache, order_count_key, invalidate_order_counts
+from app.services.landing_cache import landing_cache
+from app.services import blob_store
+from app.services.blob_gc import deletion_worker
+from app.services import log_export
+from app.services import log_archive
+from app.services.log_export import LogExport
+from app.services.order_expiry import live_order_filter
 
 router = APIRouter()
 
+ACCESS_KEY_ATTEMPTS = 3
+
 
 def generate_access_key(length: int = 12) -> str:
     """Generate a random access key"""
@@ -21,39 +43,174 @@ def generate_access_key(length: int = 12) -> str:
     return ''.join(secrets.choice(alphabet) for _ in range(length))
 
 
+async def generate_access_keys(db: AsyncSession, count: int) -> list:
+    """
+    `count` distinct access keys that no order uses yet
+    Each round checks all candidates in one query; with 62^12 possible keys a
+    second round is practically never needed
+    """
+    keys = set()
+    while len(keys) < count:
+        candidates = {generate_access_key() for _ in range(count - len(keys))} - keys
+        result = await db.execute(select(Order.access_key).where(Order.access_key.in_(candidates)))
+        keys |= candidates - set(result.scalars().all())
+    return list(keys)
+
+
+async def create_orders(db: AsyncSession, orders_in: list) -> list:
+    """
+    Insert orders with fresh access keys in one transaction, returned in input order
+    A key taken by a concurrent create between the check and the insert trips
+    the unique constraint; the whole batch is then retried with new keys
+    """
+    for _ in range(ACCESS_KEY_ATTEMPTS):
+        keys = await generate_access_keys(db, len(orders_in))
+        rows = [
+            {
+                "access_key": access_key,
+                "client_name": order_in.client_name,
+                "description": order_in.description,
+                "status": order_in.status,
+                "expires_at": order_in.expires_at,
+            }
+            for access_key, order_in in zip(keys, orders_in)
+        ]
+        try:
+            # One multi-row INSERT ... RETURNING; SQLite does not promise the
+            # RETURNING order, so rows are matched back by their unique key
+            result = await db.scalars(insert(Order).returning(Order), rows)
+            created = {order.access_key: order for order in result.all()}
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            continue
+        orders = [created[access_key] for access_key in keys]
+        
+        # Drop any negative cache entries for the new keys
+        await order_cache.invalidate_many(orders)
+        await invalidate_order_counts()
+        return orders
+    
+    raise HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="Could not allocate unique access keys, please retry"
+    )
+
+
+def check_bulk_size(count: int):
+    if not count:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No orders given"
+        )
+    if count > settings.ORDER_BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.ORDER_BULK_MAX_ITEMS} orders per request"
+        )
+
+
+def parse_orders_csv(data: bytes) -> list:
+    """OrderCreate per CSV row; all row errors are reported at once as a 422"""
+    try:
+        text = data.decode("utf-8-sig")  # Spreadsheet exports often start with a BOM
+    except UnicodeDecodeError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="CSV must be UTF-8 encoded"
+        )
+    
+    reader = csv.DictReader(io.StringIO(text))
+    fieldnames = [name.strip() for name in reader.fieldnames or []]
+    if "client_name" not in fieldnames:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="CSV needs a header row with a client_name column"
+        )
+    reader.fieldnames = fieldnames
+    
+    orders_in = []
+    errors = []
+    for row in reader:
+        # Blank cells fall back to the field defaults; extra columns are ignored
+        values = {name: value.strip() for name, value in row.items() if name and value and value.strip()}
+        try:
+            orders_in.append(OrderCreate(**values))
+        except ValidationError as exc:
+            for error in exc.errors():
+                errors.append({
+                    "line": reader.line_num,
+                    "field": ".".join(str(part) for part in error["loc"]),
+                    "message": error["msg"],
+                })
+    
+    if errors:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=errors
+        )
+    
+    return orders_in
+
+
 @router.get("/", response_model=OrderListResponse)
 async def list_orders(
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
     status_filter: Optional[OrderStatus] = None,
+    include_expired: bool = True,
+    cursor: Optional[str] = None,
+    include_total: bool = True,
     db: AsyncSession = Depends(get_db),
     current_admin: Admin = Depends(get_current_admin)
 ):
     """
     List all orders with pagination and optional status filter
+    - Each item carries its file / visit / download counters, stored on the
+      order row, so the page is one indexed query whatever the log volume
+    - Pass next_cursor from the previous page as `cursor` (keyset pagination);
+      `skip` is only honoured without a cursor
+    - `total` is cached for a few seconds; set include_total=false to skip it
+    - include_expired=false leaves out orders past expires_at, whether or not
+      the expiry sweeper has marked them yet
     """
     query = select(Order)
     
     if status_filter:
         query = query.where(Order.status == status_filter)
+    if not include_expired:
+        query = query.where(*live_order_filter())
     
-    query = query.offset(skip).limit(limit).order_by(Order.created_at.desc())
+    position = decode_cursor(cursor)
+    if position:
+        query = query.where(tuple_(Order.created_at, Order.id) < position)
+    elif skip:
+        query = query.offset(skip)
+    
+    query = query.order_by(Order.created_at.desc(), Order.id.desc()).limit(limit + 1)
     
     result = await db.execute(query)
     orders = result.scalars().all()
     
-    # Get total count
-    count_query = select(func.count(Order.id))
-    if status_filter:
-        count_query = count_query.where(Order.status == status_filter)
+    next_cursor = None
+    if len(orders) > limit:
+        orders = orders[:limit]
+        next_cursor = encode_cursor(orders[-1].created_at, orders[-1].id)
     
-    count_result = await db.execute(count_query)
-    total = count_result.scalar()
+    # Get total count
+    total = None
+    if include_total:
+        count_query = select(func.count(Order.id))
+        if status_filter:
+            count_query = count_query.where(Order.status == status_filter)
+        if not include_expired:
+            count_query = count_query.where(*live_order_filter())
+        total = await cached_count(db, order_count_key(status_filter, include_expired), count_query)
     
-    return {"total": total, "items": orders}
+    return {"total": total, "items": orders, "next_cursor": next_cursor}
 
 
-@router.post("/", response_model=OrderResponse, status_code=status.HTTP_201_CREATED)
+@router.post("/", response_model=OrderAdminResponse, status_code=status.HTTP_201_CREATED)
 async def create_order(
     order_in: OrderCreate,
     db: AsyncSession = Depends(get_db),
@@ -62,30 +219,57 @@ async def create_order(
     """
     Create a new order with auto-generated access key
     """
-    # Generate unique access key
-    while True:
-        access_key = generate_access_key()
-        result = await db.execute(select(Order).where(Order.access_key == access_key))
-        if result.scalar_one_or_none() is None:
-            break
-    
-    # Create order
-    order = Order(
-        access_key=access_key,
-        client_name=order_in.client_name,
-        description=order_in.description,
-        status=order_in.status,
-        expires_at=order_in.expires_at
-    )
+    orders = await create_orders(db, [order_in])
     
-    db.add(order)
-    await db.commit()
-    await db.refresh(order)
+    return orders[0]
+
+
+@router.post("/bulk", response_model=OrderBulkCreateResponse, status_code=status.HTTP_201_CREATED)
+async def create_orders_bulk(
+    orders_in: list[OrderCreate],
+    db: AsyncSession = Depends(get_db),
+    current_admin: Admin = Depends(get_current_admin)
+):
+    """
+    Create up to ORDER_BULK_MAX_ITEMS orders from a JSON array, all or none
+    - Returns the created orders, in input order, with their access keys
+    """
+    check_bulk_size(len(orders_in))
     
-    return order
+    orders = await create_orders(db, orders_in)
+    
+    return {"created": len(orders), "items": orders}
+
+
+@router.post("/bulk/csv", response_model=OrderBulkCreateResponse, status_code=status.HTTP_201_CREATED)
+async def create_orders_bulk_csv(
+    file: UploadFile = FastAPIFile(...),
+    db: AsyncSession = Depends(get_db),
+    current_admin: Admin = Depends(get_current_admin)
+):
+    """
+    Create orders from a CSV upload, one per row, all or none
+    - Header row required: client_name, plus optional description, status
+      (pending / dev / delivered) and expires_at (ISO 8601)
+    - Invalid rows are reported together, by line number, and nothing is created
+    """
+    data = await file.read(settings.ORDER_BULK_MAX_CSV_BYTES + 1)
+    
+    if len(data) > settings.ORDER_BULK_MAX_CSV_BYTES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"CSV larger than {settings.ORDER_BULK_MAX_CSV_BYTES} bytes"
+        )
+    
+    orders_in = parse_orders_csv(data)
+    check_bulk_size(len(orders_in))
+    
+    orders = await create_orders(db, orders_in)
+    
+    return {"created": len(orders), "items": orders}
 
 
-@router.get("/{order_id}", response_model=OrderResponse)
+@router.get("/{order_id}", response_model=OrderAdminResponse)
 async def get_order(
     order_id: int,
     db: AsyncSession = Depends(get_db),
@@ -106,21 +290,70 @@ async def get_order(
     return order
 
 
+@router.patch("/{order_id}", response_model=OrderAdminResponse)
+async def update_order(
+    order_id: int,
+    order_in: OrderUpdate,
+    db: AsyncSession = Depends(get_db),
+    current_admin: Admin = Depends(get_current_admin)
+):
+    """
+    Update order fields (client name, description, status, expiry)
+    """
+    result = await db.execute(select(Order).where(Order.id == order_id))
+    order = result.scalar_one_or_none()
+    
+    if not order:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Order not found"
+        )
+    
+    updates = order_in.model_dump(exclude_unset=True)
+    if updates.get("expires_at") is not None:
+        updates["expires_at"] = as_utc(updates["expires_at"])
+    for field, value in updates.items():
+        setattr(order, field, value)
+    
+    # Extending an expired order brings it back with the status it had before
+    # expiring, unless the request sets one itself
+    extended = "expires_at" in updates and (order.expires_at is None or order.expires_at > datetime.utcnow())
+    if order.status == OrderStatus.expired and extended and "status" not in updates:
+        order.status = order.status_before_expiry or OrderStatus.pending
+        order.status_before_expiry = None
+    
+    await db.commit()
+    await db.refresh(order)
+    
+    await order_cache.invalidate(access_key=order.access_key, order_id=order.id)
+    await landing_cache.invalidate(order.access_key)
+    if "status" in updates or "expires_at" in updates:
+        # Live counts depend on both
+        await invalidate_order_counts()
+    
+    return order
+
+
 @router.get("/{order_id}/logs", response_model=AccessLogListResponse)
 async def get_order_logs(
     order_id: int,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    include_total: bool = True,
     db: AsyncSession = Depends(get_db),
     current_admin: Admin = Depends(get_current_admin)
 ):
     """
     Get all access logs for a specific order
     This is a core feature for generating evidence of client access
+    - Pass next_cursor from the previous page as `cursor` (keyset pagination);
+      `skip` is only honoured without a cursor
+    - `total` is cached for a few seconds; set include_total=false to skip it
+    - Rows past the retention period are read back from the log archive
     """
     # Verify order exists
-    result = await db.execute(select(Order).where(Order.id == order_id))
-    order = result.scalar_one_or_none()
+    order = await order_cache.get_by_id(db, order_id)
     
     if not order:
         raise HTTPException(
@@ -129,19 +362,99 @@ async def get_order_logs(
         )
     
     # Get logs
-    query = select(AccessLog).where(AccessLog.order_id == order_id)\
-        .order_by(AccessLog.timestamp.desc())\
-        .offset(skip).limit(limit)
+    query = select(AccessLog).where(AccessLog.order_id == order_id)
+    
+    position = decode_cursor(cursor)
+    if position:
+        query = query.where(tuple_(AccessLog.timestamp, AccessLog.id) < position)
+    elif skip:
+        query = query.offset(skip)
+    
+    query = query.order_by(AccessLog.timestamp.desc(), AccessLog.id.desc()).limit(limit + 1)
     
     result = await db.execute(query)
     logs = result.scalars().all()
     
-    # Get total count
+    # Archived rows are all older than the hot ones: continue into the archive
+    # once the hot rows run out
     count_query = select(func.count(AccessLog.id)).where(AccessLog.order_id == order_id)
-    count_result = await db.execute(count_query)
-    total = count_result.scalar()
+    if len(logs) <= limit:
+        archive_skip = 0
+        if skip and not position and not logs:
+            archive_skip = max(0, skip - await cached_count(db, f"count:logs:{order_id}", count_query))
+        logs += await log_archive.read_page(db, order_id, position, archive_skip, limit + 1 - len(logs))
     
-    return {"total": total, "logs": logs}
+    next_cursor = None
+    if len(logs) > limit:
+        logs = logs[:limit]
+        next_cursor = encode_cursor(logs[-1].timestamp, logs[-1].id)
+    
+    # Get total count
+    total = None
+    if include_total:
+        total = await cached_count(db, f"count:logs:{order_id}", count_query)
+        total += await log_archive.archived_count(db, order_id)
+    
+    return {"total": total, "logs": logs, "next_cursor": next_cursor}
+
+
+@router.get("/{order_id}/logs/export")
+async def export_order_logs(
+    order_id: int,
+    format: Literal["csv", "ndjson", "parquet"] = "csv",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    signed: bool = False,
+    db: AsyncSession = Depends(get_db),
+    current_admin: Admin = Depends(get_current_admin)
+):
+    """
+    Download all access logs of an order as evidence, oldest first
+    - Streamed from a server-side cursor: constant memory for any row count
+    - format: csv, ndjson, or parquet (needs pyarrow)
+    - Optional [start, end) time filter
+    - signed=true: a ZIP holding the export and manifest.json (row count,
+      SHA-256 of the export, HMAC signature); check it with verify_export.py
+    """
+    order = await order_cache.get_by_id(db, order_id)
+    
+    if not order:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Order not found"
+        )
+    
+    if format not in log_export.available_formats():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Export format '{format}' is not available on this server (install pyarrow)"
+        )
+    
+    export = LogExport(
+        order_id,
+        format,
+        start=as_utc(start) if start else None,
+        end=as_utc(end) if end else None,
+        batch_size=settings.LOG_EXPORT_BATCH_SIZE,
+    )
+    
+    if signed:
+        filename = f"order-{order_id}-access-logs-signed.zip"
+        body = export.signed_archive(exported_by=current_admin.username)
+        media_type = "application/zip"
+    else:
+        filename = export.filename
+        body = export.stream()
+        media_type = log_export.MEDIA_TYPES[format]
+    
+    return StreamingResponse(
+        body,
+        headers={
+            "Content-Type": media_type,
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "Cache-Control": "no-store",
+        },
+    )
 
 
 @router.delete("/{order_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -152,6 +465,7 @@ async def delete_order(
 ):
     """
     Delete an order and all associated files and logs
+    Blobs are only removed from disk once no other order's files use them
     """
     result = await db.execute(select(Order).where(Order.id == order_id))
     order = result.scalar_one_or_none()
@@ -162,7 +476,18 @@ async def delete_order(
             detail="Order not found"
         )
     
+    # Release the order's blob references before the rows cascade away
+    result = await db.execute(select(File.filename_saved).where(File.order_id == order_id))
+    unreferenced = [name for name in result.scalars().all() if await blob_store.release(db, name)]
+    
     await db.delete(order)
     await db.commit()
     
+    for name in unreferenced:
+        await deletion_worker.submit(name)
+    
+    await order_cache.invalidate(access_key=order.access_key, order_id=order.id)
+    await landing_cache.invalidate(order.access_key)
+    await invalidate_order_counts()
+    
     return None
@@ -0,0 +1,125 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import PlainTextResponse
+from typing import Optional
+from app.core.config import settings
+from app.core.profiling import profiler
+from app.schemas.profiling import ProfilingStart
+from app.core.deps import get_current_admin
+from app.models.admin import Admin
+from app.services.access_log import access_log_writer
+from app.core.security import token_cache, password_hasher
+from app.api.v1.endpoints.auth import ip_limiter, username_limiter
+from app.services.order_cache import order_cache
+from app.services.landing_cache import landing_cache
+from app.services.admin_cache import admin_cache
+from app.services.compression import compression_worker
+from app.services.order_stats import counter_reconciler
+from app.services.log_archive import log_archiver, database_stats
+from app.services.blob_gc import deletion_worker, orphan_reconciler
+from app.services.order_expiry import expiry_sweeper
+from app.services.upload_sessions import upload_session_sweeper
+from app.services.health import health_monitor
+
+router = APIRouter()
+
+
+@router.get("/stats")
+async def get_system_stats(
+    current_admin: Admin = Depends(get_current_admin)
+):
+    """
+    Runtime counters of this worker's background pipelines, and database size
+    """
+    return {
+        "access_log": access_log_writer.stats(),
+        "compression": compression_worker.stats(),
+        "order_counters": counter_reconciler.stats(),
+        "log_archive": log_archiver.stats(),
+        "deletion_worker": deletion_worker.stats(),
+        "orphan_reconciler": orphan_reconciler.stats(),
+        "order_expiry": expiry_sweeper.stats(),
+        "upload_sessions": upload_session_sweeper.stats(),
+        "health": health_monitor.stats(),
+        "database": await database_stats(),
+        "order_cache": order_cache.stats(),
+        "landing_cache": landing_cache.stats(),
+        "token_cache": token_cache.stats(),
+        "admin_cache": admin_cache.stats(),
+        "password_hasher": password_hasher.stats(),
+        "login_limiter": {
+            "ip": ip_limiter.stats(),
+            "username": username_limiter.stats(),
+        },
+    }
+
+
+@router.get("/profiling")
+async def get_profiling_status(
+    current_admin: Admin = Depends(get_current_admin)
+):
+    """
+    Profiling session of this worker and requests / samples collected per route
+    """
+    return {"enabled": settings.PROFILING_ENABLED, **profiler.status()}
+
+
+@router.post("/profiling")
+async def start_profiling(
+    session_in: ProfilingStart,
+    current_admin: Admin = Depends(get_current_admin)
+):
+    """
+    Start sampling requests on this worker, discarding earlier stacks
+    - sample_rate: fraction of requests profiled
+    - path_pattern: only requests whose path matches this regex
+    - header: profile every (matching) request sent with this header instead
+    - Stops by itself after duration_seconds
+    """
+    if not settings.PROFILING_ENABLED:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Profiling is disabled (PROFILING_ENABLED=false)"
+        )
+    
+    if session_in.duration_seconds > settings.PROFILING_MAX_DURATION_SECONDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"duration_seconds can be at most {settings.PROFILING_MAX_DURATION_SECONDS}"
+        )
+    
+    profiler.start(
+        session_in.sample_rate,
+        session_in.path_pattern,
+        session_in.header,
+        session_in.duration_seconds,
+    )
+    
+    return profiler.status()
+
+
+@router.delete("/profiling")
+async def stop_profiling(
+    current_admin: Admin = Depends(get_current_admin)
+):
+    """
+    Stop sampling; the stacks collected so far stay downloadable
+    """
+    profiler.stop()
+    
+    return profiler.status()
+
+
+@router.get("/profiling/stacks", response_class=PlainTextResponse)
+async def download_profiling_stacks(
+    route: Optional[str] = None,
+    current_admin: Admin = Depends(get_current_admin)
+):
+    """
+    Collected stacks in collapsed format, for flamegraph.pl or speedscope
+    - route: one route template (as listed by GET /profiling); otherwise all
+      routes, each as the root frame of its stacks
+    """
+    return PlainTextResponse(
+        profiler.collapsed(route),
+        headers={"Content-Disposition": 'attachment; filename="profile.folded"'},
+    )
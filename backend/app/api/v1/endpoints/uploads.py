@@ -0,0 +1,406 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Header
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, literal
+from sqlalchemy.dialects.sqlite import insert
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional
+import shutil
+import uuid
+from starlette.concurrency import run_in_threadpool
+from app.db.session import get_db
+from app.core.config import settings
+from app.core.deps import get_current_admin
+from app.models.admin import Admin
+from app.models.order import Order
+from app.models.file import File
+from app.models.upload import UploadSession, UploadPart, UploadSessionStatus
+from app.schemas.file import FileResponse
+from app.schemas.upload import UploadSessionCreate, UploadSessionResponse, UploadPartResponse
+from app.services.uploads import spool_stream, commit_upload, discard_upload, assemble_parts, UploadTooLarge
+from app.services import blob_store
+from app.services.compression import compression_worker
+from app.services.order_cache import order_cache
+from app.services.landing_cache import landing_cache
+from app.services.order_stats import adjust_file_totals
+from app.services.upload_sessions import session_dir, part_path
+from app.api.v1.endpoints.files import is_allowed_file, ALLOWED_EXTENSIONS
+
+router = APIRouter()
+
+
+async def get_active_session(session_id: str, db: AsyncSession) -> UploadSession:
+    """Load an upload session that can still accept parts"""
+    result = await db.execute(select(UploadSession).where(UploadSession.id == session_id))
+    upload = result.scalar_one_or_none()
+    
+    if not upload:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Upload session not found"
+        )
+    
+    if upload.status != UploadSessionStatus.active:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Upload session is {upload.status.value}"
+        )
+    
+    if upload.expires_at < datetime.utcnow():
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="Upload session has expired"
+        )
+    
+    return upload
+
+
+async def session_response(upload: UploadSession, db: AsyncSession) -> dict:
+    result = await db.execute(
+        select(UploadPart).where(UploadPart.session_id == upload.id).order_by(UploadPart.part_number)
+    )
+    parts = result.scalars().all()
+    return {
+        **{c.name: getattr(upload, c.name) for c in UploadSession.__table__.columns},
+        "parts": [UploadPartResponse.model_validate(p) for p in parts],
+    }
+
+
+@router.post("/", response_model=UploadSessionResponse, status_code=status.HTTP_201_CREATED)
+async def create_upload_session(
+    session_in: UploadSessionCreate,
+    db: AsyncSession = Depends(get_db),
+    current_admin: Admin = Depends(get_current_admin)
+):
+    """
+    Start a resumable upload
+    Parts are then sent with PUT /files/uploads/{session_id}/parts/{part_number},
+    in any order and in parallel, and joined with POST .../complete
+    """
+    result = await db.execute(select(Order).where(Order.access_key == session_in.access_key))
+    order = result.scalar_one_or_none()
+    
+    if not order:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Order not found"
+        )
+    
+    if not is_allowed_file(session_in.filename):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"File type not allowed. Allowed extensions: {', '.join(ALLOWED_EXTENSIONS)}"
+        )
+    
+    if session_in.total_size is not None and session_in.total_size > settings.UPLOAD_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Upload exceeds maximum size of {settings.UPLOAD_MAX_SIZE} bytes"
+        )
+    
+    part_size = session_in.part_size or settings.UPLOAD_PART_SIZE
+    if part_size > settings.UPLOAD_MAX_PART_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"part_size cannot exceed {settings.UPLOAD_MAX_PART_SIZE} bytes"
+        )
+    
+    upload = UploadSession(
+        id=uuid.uuid4().hex,
+        order_id=order.id,
+        filename_original=session_in.filename,
+        file_type=session_in.file_type,
+        total_size=session_in.total_size,
+        part_size=part_size,
+        status=UploadSessionStatus.active,
+        expires_at=datetime.utcnow() + timedelta(hours=settings.UPLOAD_SESSION_TTL_HOURS)
+    )
+    
+    await run_in_threadpool(session_dir(upload.id).mkdir, parents=True, exist_ok=True)
+    db.add(upload)
+    await db.commit()
+    await db.refresh(upload)
+    
+    return await session_response(upload, db)
+
+
+@router.get("/{session_id}", response_model=UploadSessionResponse)
+async def get_upload_session(
+    session_id: str,
+    db: AsyncSession = Depends(get_db),
+    current_admin: Admin = Depends(get_current_admin)
+):
+    """
+    Get upload session state, including received parts
+    Clients use this to find out which parts still need to be sent after a failure
+    """
+    result = await db.execute(select(UploadSession).where(UploadSession.id == session_id))
+    upload = result.scalar_one_or_none()
+    
+    if not upload:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Upload session not found"
+        )
+    
+    return await session_response(upload, db)
+
+
+@router.put("/{session_id}/parts/{part_number}", response_model=UploadPartResponse)
+async def upload_part(
+    session_id: str,
+    part_number: int,
+    request: Request,
+    x_part_sha256: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db),
+    current_admin: Admin = Depends(get_current_admin)
+):
+    """
+    Upload one part as the raw request body
+    - Re-sending a part replaces it, so failed parts can simply be retried
+    - If X-Part-SHA256 is given, the part is rejected when the digest differs
+    """
+    upload = await get_active_session(session_id, db)
+    part_size = upload.part_size
+    
+    if part_number < 1:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="part_number must be >= 1"
+        )
+    
+    if upload.total_size is not None:
+        part_count = max(1, -(-upload.total_size // part_size))
+        if part_number > part_count:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"part_number must be <= {part_count}"
+            )
+    
+    # The body may take minutes to arrive; don't keep a pooled connection meanwhile
+    await db.rollback()
+    
+    directory = session_dir(session_id)
+    try:
+        spooled = await spool_stream(
+            request.stream(),
+            directory,
+            max_size=part_size,
+            chunk_size=settings.UPLOAD_CHUNK_SIZE,
+        )
+    except UploadTooLarge:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Part exceeds part_size of {part_size} bytes"
+        )
+    
+    if x_part_sha256 and x_part_sha256.lower() != spooled.content_hash:
+        await discard_upload(spooled)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Part checksum mismatch"
+        )
+    
+    # Record the part only if the session still accepts parts. The upsert
+    # takes the write lock, and the file is moved into place before it is
+    # released, so a /complete claim sees either the old part or the new one
+    now = datetime.utcnow()
+    still_active = (
+        select(UploadSession.id)
+        .where(
+            UploadSession.id == session_id,
+            UploadSession.status == UploadSessionStatus.active,
+            UploadSession.expires_at >= now,
+        )
+        .exists()
+    )
+    columns = {
+        "session_id": session_id,
+        "part_number": part_number,
+        "size": spooled.size,
+        "checksum": spooled.content_hash,
+        "uploaded_at": now,
+    }
+    stmt = insert(UploadPart).from_select(
+        list(columns),
+        select(*[literal(value, UploadPart.__table__.c[name].type) for name, value in columns.items()]).where(still_active),
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[UploadPart.session_id, UploadPart.part_number],
+        set_={name: stmt.excluded[name] for name in ("size", "checksum", "uploaded_at")},
+    )
+    try:
+        result = await db.execute(stmt)
+        if result.rowcount == 1:
+            await commit_upload(spooled, part_path(session_id, part_number))
+            await db.commit()
+    except BaseException:
+        await db.rollback()
+        await discard_upload(spooled)
+        raise
+    
+    if result.rowcount != 1:
+        await db.rollback()
+        await discard_upload(spooled)
+        # Raises the matching 404 / 409 / 410
+        await get_active_session(session_id, db)
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Upload session no longer accepts parts"
+        )
+    
+    return columns
+
+
+@router.post("/{session_id}/complete", response_model=FileResponse, status_code=status.HTTP_201_CREATED)
+async def complete_upload_session(
+    session_id: str,
+    db: AsyncSession = Depends(get_db),
+    current_admin: Admin = Depends(get_current_admin)
+):
+    """
+    Assemble all parts into a regular file
+    - Parts must be numbered 1..N without gaps
+    - Every part but the last must be exactly part_size bytes
+    """
+    upload = await get_active_session(session_id, db)
+    
+    # Claim the session so a concurrent /complete (e.g. a client retry) cannot
+    # assemble it a second time; parts and aborts are refused meanwhile, so
+    # the parts read below stay as they are until the session is released
+    claimed = await db.execute(
+        update(UploadSession)
+        .where(UploadSession.id == session_id, UploadSession.status == UploadSessionStatus.active)
+        .values(status=UploadSessionStatus.completing)
+    )
+    await db.commit()
+    if claimed.rowcount != 1:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Upload session is already being completed"
+        )
+    
+    try:
+        result = await db.execute(
+            select(UploadPart).where(UploadPart.session_id == session_id).order_by(UploadPart.part_number)
+        )
+        parts = result.scalars().all()
+        
+        if not parts:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="No parts uploaded"
+            )
+        
+        numbers = [p.part_number for p in parts]
+        missing = sorted(set(range(1, numbers[-1] + 1)) - set(numbers))
+        if missing:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Missing parts: {missing[:20]}"
+            )
+        
+        short = [p.part_number for p in parts[:-1] if p.size != upload.part_size]
+        if short:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Parts must be exactly {upload.part_size} bytes except the last: {short[:20]}"
+            )
+        
+        total = sum(p.size for p in parts)
+        if upload.total_size is not None and total != upload.total_size:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Received {total} bytes, expected {upload.total_size}"
+            )
+        
+        if total > settings.UPLOAD_MAX_SIZE:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"Upload exceeds maximum size of {settings.UPLOAD_MAX_SIZE} bytes"
+            )
+        
+        # Join parts off the event loop and hand the result to the blob store
+        try:
+            spooled = await assemble_parts(
+                [part_path(session_id, p.part_number) for p in parts],
+                Path(settings.UPLOAD_DIR),
+                settings.UPLOAD_CHUNK_SIZE,
+            )
+        except OSError as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Failed to assemble file: {str(e)}"
+            )
+        try:
+            digest = await blob_store.store(db, spooled)
+        except BaseException:
+            await discard_upload(spooled)
+            raise
+    except BaseException:
+        # Hand the session back so the client can fix it up and retry /complete
+        await db.rollback()
+        await db.execute(
+            update(UploadSession)
+            .where(UploadSession.id == session_id, UploadSession.status == UploadSessionStatus.completing)
+            .values(status=UploadSessionStatus.active)
+        )
+        await db.commit()
+        raise
+    
+    db_file = File(
+        order_id=upload.order_id,
+        filename_original=upload.filename_original,
+        filename_saved=digest,
+        file_size=spooled.size,
+        content_hash=digest,
+        file_type=upload.file_type
+    )
+    db.add(db_file)
+    await db.flush()
+    await adjust_file_totals(db, upload.order_id, 1, spooled.size)
+    
+    upload.status = UploadSessionStatus.completed
+    upload.file_id = db_file.id
+    await db.commit()
+    await db.refresh(db_file)
+    
+    order = await order_cache.get_by_id(db, upload.order_id)
+    if order is not None:
+        await landing_cache.invalidate(order.access_key)
+    
+    # Precompressed download variants are built in the background
+    compression_worker.enqueue(db_file.filename_saved, db_file.filename_original, db_file.file_size)
+    
+    await run_in_threadpool(shutil.rmtree, session_dir(session_id), True)
+    
+    return db_file
+
+
+@router.delete("/{session_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def abort_upload_session(
+    session_id: str,
+    db: AsyncSession = Depends(get_db),
+    current_admin: Admin = Depends(get_current_admin)
+):
+    """
+    Abort an upload session and discard its parts
+    """
+    await get_active_session(session_id, db)
+    
+    # Conditional, so a session claimed by /complete meanwhile is not aborted
+    aborted = await db.execute(
+        update(UploadSession)
+        .where(UploadSession.id == session_id, UploadSession.status == UploadSessionStatus.active)
+        .values(status=UploadSessionStatus.aborted)
+    )
+    await db.commit()
+    if aborted.rowcount != 1:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Upload session is being completed"
+        )
+    
+    await run_in_threadpool(shutil.rmtree, session_dir(session_id), True)
+    
+    return None
@@ -0,0 +1,150 @@
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+
+# Returned by CacheBackend.get when the key is absent or expired.
+# Distinct from None so that None can be cached (negative caching).
+MISSING = object()
+
+
+class CacheBackend(ABC):
+    """
+    Key/value store with per-entry TTL
+    Values must be JSON-serializable so that shared backends can store them
+    """
+
+    @abstractmethod
+    async def get(self, key: str) -> Any:
+        """Return the cached value or MISSING"""
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        """Store a value for `ttl` seconds"""
+
+    @abstractmethod
+    async def delete(self, *keys: str) -> None:
+        """Remove keys, ignoring ones that are absent"""
+
+    @abstractmethod
+    async def clear(self) -> None:
+        """Remove everything"""
+
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    Bounded LRU cache local to one worker process
+    Entries evicted by other workers are not seen here until their TTL runs out
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._data: OrderedDict = OrderedDict()
+
+    async def get(self, key: str) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            return MISSING
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return MISSING
+        self._data.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        self._data[key] = (value, time.monotonic() + ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._data.pop(key, None)
+
+    async def clear(self) -> None:
+        self._data.clear()
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """
+    Cache shared by all workers on one host through a small SQLite file
+    Stand-in for an external shared cache; invalidations are seen by every worker
+    """
+
+    def __init__(self, path: str, max_entries: int):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.execute("PRAGMA busy_timeout=2000")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+
+    def _get(self, key: str) -> Any:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or row[1] < time.time():
+            return MISSING
+        return json.loads(row[0])
+
+    def _set(self, key: str, value: Any, ttl: float) -> None:
+        payload = json.dumps(value, separators=(",", ":"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, payload, time.time() + ttl),
+            )
+            self._writes += 1
+            if self._writes % 1000 == 0:
+                self._prune()
+
+    def _prune(self) -> None:
+        self._conn.execute("DELETE FROM cache WHERE expires_at < ?", (time.time(),))
+        self._conn.execute(
+            "DELETE FROM cache WHERE key IN ("
+            " SELECT key FROM cache ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def _delete(self, keys: tuple) -> None:
+        with self._lock:
+            self._conn.executemany("DELETE FROM cache WHERE key = ?", [(k,) for k in keys])
+
+    def _clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+
+    async def get(self, key: str) -> Any:
+        return await run_in_threadpool(self._get, key)
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        await run_in_threadpool(self._set, key, value, ttl)
+
+    async def delete(self, *keys: str) -> None:
+        if keys:
+            await run_in_threadpool(self._delete, keys)
+
+    async def clear(self) -> None:
+        await run_in_threadpool(self._clear)
+
+
+def create_cache_backend() -> CacheBackend:
+    """Build the cache backend selected by CACHE_BACKEND"""
+    if settings.CACHE_BACKEND == "sqlite":
+        return SQLiteCacheBackend(settings.CACHE_SQLITE_PATH, settings.CACHE_MAX_ENTRIES)
+    return MemoryCacheBackend(settings.CACHE_MAX_ENTRIES)
+
+
+cache = create_cache_backend()
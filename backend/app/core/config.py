@@ -1,19 +1,164 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Literal
+import ipaddress
 import os
 
 
 class Settings(BaseSettings):
     # Database
     SQLITE_URL: str = "sqlite+aiosqlite:///./app.db"
+    DB_ECHO: bool = False  # Log every SQL statement (debugging only)
+    DB_JOURNAL_MODE: str = "WAL"  # WAL lets readers proceed while a writer commits
+    DB_SYNCHRONOUS: str = "NORMAL"  # Safe with WAL, far fewer fsyncs than FULL
+    DB_BUSY_TIMEOUT_MS: int = 5000
+    DB_MMAP_SIZE: int = 256 * 1024 * 1024  # 256 MiB
+    DB_CACHE_SIZE_KB: int = 64 * 1024  # Page cache per connection, 64 MiB
+    DB_FOREIGN_KEYS: bool = True  # Enforce FKs so ON DELETE CASCADE works
+    DB_AUTO_VACUUM: Literal["NONE", "FULL", "INCREMENTAL"] = "INCREMENTAL"  # Takes effect on new databases (existing ones: archive_logs.py --full-vacuum)
+    DB_VACUUM_STEP_PAGES: int = 2000  # Pages returned to the filesystem per incremental_vacuum step
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30
     
     # Security
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 10080  # 7 days
+    AUTH_CACHE_ENABLED: bool = True  # Cache verified tokens and admin principals
+    TOKEN_CACHE_MAX_ENTRIES: int = 1000
+    ADMIN_CACHE_TTL_SECONDS: int = 300
+    # Reverse proxies whose X-Forwarded-For is believed (IPs or CIDRs, comma-separated);
+    # requests from anywhere else are attributed to the connecting address
+    TRUSTED_PROXIES: str = "127.0.0.1,::1"
+    
+    # Login Protection
+    PASSWORD_HASH_WORKERS: int = 2  # bcrypt threads per worker process
+    PASSWORD_HASH_QUEUE_LIMIT: int = 16  # Running + waiting hash operations
+    LOGIN_ATTEMPT_WINDOW_SECONDS: int = 300
+    LOGIN_MAX_ATTEMPTS_PER_IP: int = 30  # All attempts from one IP per window
+    LOGIN_MAX_FAILURES_PER_USERNAME: int = 10  # Failed attempts on one username from one IP per window
     
     # File Upload
     UPLOAD_DIR: str
+    UPLOAD_MAX_SIZE: int = 2 * 1024 * 1024 * 1024  # 2 GiB
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024  # 1 MiB
+    
+    # File Serving
+    # inline: served by the API worker (sendfile when the server supports it)
+    # x-accel-redirect / x-sendfile: access checks here, bytes shipped by nginx / Apache
+    FILE_SERVE_MODE: Literal["inline", "x-accel-redirect", "x-sendfile"] = "inline"
+    FILE_ACCEL_PREFIX: str = "/protected-files"  # nginx `internal` location aliased to UPLOAD_DIR
+    DOWNLOAD_CHUNK_SIZE: int = 1024 * 1024  # 1 MiB
+    
+    # Storage Backend
+    # local: blobs live under UPLOAD_DIR
+    # s3: blobs live in an S3-compatible bucket (AWS S3, MinIO, ...); UPLOAD_DIR
+    #     is then only scratch space for uploads in progress
+    STORAGE_BACKEND: Literal["local", "s3"] = "local"
+    S3_ENDPOINT_URL: str = "http://localhost:9000"
+    S3_PUBLIC_URL: str = ""  # Endpoint clients use for presigned URLs, if different
+    S3_REGION: str = "us-east-1"
+    S3_BUCKET: str = "xianyu-orders"
+    S3_ACCESS_KEY_ID: str = ""
+    S3_SECRET_ACCESS_KEY: str = ""
+    S3_KEY_PREFIX: str = ""
+    S3_MAX_CONNECTIONS: int = 32  # Pooled keep-alive connections per worker
+    S3_TIMEOUT_SECONDS: float = 30.0
+    S3_PRESIGNED_DOWNLOADS: bool = True  # Redirect downloads to the bucket instead of proxying
+    S3_PRESIGN_EXPIRE_SECONDS: int = 300
+    
+    # Compression (text deliverables: .py, .js, .html, .css, .json, .md, .txt)
+    # Variants are precomputed after upload (gzip always; brotli / zstd when
+    # the optional packages are installed) and negotiated via Accept-Encoding
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MIN_SIZE: int = 1024  # Smaller files are always sent as-is
+    COMPRESSION_MAX_SIZE: int = 256 * 1024 * 1024  # 256 MiB
+    COMPRESSION_MIN_SAVING: float = 0.1  # Keep a variant only if it is at least 10% smaller
+    COMPRESSION_QUEUE_SIZE: int = 1000
+    
+    # Resumable Uploads
+    UPLOAD_PART_SIZE: int = 8 * 1024 * 1024  # Default part size, 8 MiB
+    UPLOAD_MAX_PART_SIZE: int = 512 * 1024 * 1024  # 512 MiB
+    UPLOAD_SESSION_TTL_HOURS: int = 24
+    UPLOAD_SESSION_SWEEP_INTERVAL_SECONDS: int = 3600  # Abort expired sessions, remove their parts; 0 disables
+    
+    # Access Logging (write-behind batching)
+    ACCESS_LOG_BATCH_SIZE: int = 500
+    ACCESS_LOG_FLUSH_INTERVAL_MS: int = 200
+    ACCESS_LOG_QUEUE_SIZE: int = 50000
+    ACCESS_LOG_ENQUEUE_TIMEOUT_MS: int = 50
+    ACCESS_ROLLUPS_ENABLED: bool = True  # Maintain hourly/daily rollups for the analytics endpoints
+    ANALYTICS_MAX_BUCKETS: int = 1000  # Largest time series one request may ask for
+    LOG_EXPORT_BATCH_SIZE: int = 1000  # Rows fetched and encoded per step of a log export
+    
+    # Bulk Order Creation
+    ORDER_BULK_MAX_ITEMS: int = 1000  # Orders per bulk request (JSON array or CSV rows)
+    ORDER_BULK_MAX_CSV_BYTES: int = 5 * 1024 * 1024
+    
+    # Order Counters (file_count, total_bytes, visit_count, ... on orders)
+    # Kept current by the upload, delete and log write paths; the reconciler
+    # re-derives them from files / access_logs and repairs any drift
+    ORDER_COUNTERS_RECONCILE_INTERVAL_SECONDS: int = 6 * 3600  # 0 disables the periodic job
+    ORDER_COUNTERS_RECONCILE_BATCH_SIZE: int = 500  # Orders per write transaction
+    
+    # Log Retention
+    # access_logs rows older than LOG_RETENTION_DAYS are moved, a UTC month at
+    # a time, into gzip NDJSON archives in the storage backend; log pages,
+    # exports, counters and rollup rebuilds read them back transparently
+    LOG_RETENTION_DAYS: int = 180  # 0 keeps every row in the database
+    LOG_ARCHIVE_INTERVAL_SECONDS: int = 24 * 3600
+    LOG_ARCHIVE_SEGMENT_ROWS: int = 5000  # Rows per gzip member; reading an archived page fetches one or two
+    LOG_ARCHIVE_PREFIX: str = "log-archive"  # Storage key prefix of the archive files
+    
+    # Order Expiry
+    # A sweeper marks orders past expires_at as "expired"; with ORDER_EXPIRY_ACTION
+    # purge_files / delete it also frees their files (or removes the orders)
+    # once they have been expired for ORDER_EXPIRY_PURGE_AFTER_DAYS
+    ORDER_EXPIRY_SWEEP_INTERVAL_SECONDS: int = 300  # 0 disables the sweeper
+    ORDER_EXPIRY_BATCH_SIZE: int = 500  # Orders per write transaction
+    ORDER_EXPIRY_ACTION: Literal["mark", "purge_files", "delete"] = "mark"
+    ORDER_EXPIRY_PURGE_AFTER_DAYS: int = 30
+    
+    # Storage Cleanup
+    # Deleted files' bytes are removed by background workers; the reconciler
+    # periodically moves stored objects nothing references into .quarantine/
+    DELETION_WORKERS: int = 4
+    DELETION_QUEUE_SIZE: int = 10000  # When full, deletes unlink inline
+    ORPHAN_RECONCILE_INTERVAL_SECONDS: int = 24 * 3600  # 0 disables the periodic pass
+    ORPHAN_GRACE_SECONDS: int = 3600  # Younger objects may belong to an upload still committing
+    ORPHAN_QUARANTINE_DAYS: int = 7  # Then quarantined objects are deleted for good
+    
+    # Caching
+    CACHE_BACKEND: Literal["memory", "sqlite"] = "memory"  # sqlite: shared by all workers on the host
+    CACHE_SQLITE_PATH: str = "./cache.db"
+    CACHE_MAX_ENTRIES: int = 10000
+    ORDER_CACHE_TTL_SECONDS: int = 60
+    ORDER_CACHE_NEGATIVE_TTL_SECONDS: int = 10
+    COUNT_CACHE_TTL_SECONDS: int = 30  # Totals shown next to paginated lists
+    LANDING_CACHE_TTL_SECONDS: int = 300  # Client landing payloads, invalidated on change
+    
+    # Metrics
+    METRICS_ENABLED: bool = True  # Request / query instrumentation and GET /metrics
+    METRICS_TOKEN: str = ""  # When set, /metrics requires "Authorization: Bearer <token>"
+    
+    # Profiling
+    # With PROFILING_ENABLED, admins can start sampling sessions at runtime
+    # (/api/v1/admin/system/profiling); without it the middleware is not installed
+    PROFILING_ENABLED: bool = False
+    PROFILING_INTERVAL_MS: float = 5.0  # Sampling period of profiled requests
+    PROFILING_MAX_STACKS: int = 2000  # Distinct stacks kept per route; the rest are folded together
+    PROFILING_MAX_DURATION_SECONDS: int = 3600
+    
+    # Health Checks
+    # /health/live only shows the process answers; /health/ready runs the deep
+    # checks below and returns 503 when one fails, so load balancers drain the worker
+    HEALTH_CACHE_SECONDS: float = 2.0  # Readiness results are reused this long
+    HEALTH_DB_TIMEOUT_MS: int = 1000  # Max DB round trip / write-lock wait
+    HEALTH_MIN_FREE_DISK_MB: int = 512  # In UPLOAD_DIR
+    HEALTH_MIN_FREE_INODES_PERCENT: float = 5.0
+    HEALTH_MAX_QUEUE_FILL: float = 0.9  # Fraction of a background queue's capacity
+    HEALTH_LOOP_LAG_INTERVAL_MS: int = 250  # Event loop lag sampling period
+    HEALTH_MAX_LOOP_LAG_MS: int = 500  # Worst lag since the previous check
     
     # CORS
     CORS_ORIGINS: str = "http://localhost:3000"
@@ -27,6 +172,11 @@ class Settings(BaseSettings):
         """Convert comma-separated CORS origins to list"""
         return [origin.strip() for origin in self.CORS_ORIGINS.split(",")]
     
+    @property
+    def trusted_proxy_networks(self) -> list:
+        """TRUSTED_PROXIES parsed into ip_network objects"""
+        return [ipaddress.ip_network(p.strip(), strict=False) for p in self.TRUSTED_PROXIES.split(",") if p.strip()]
+    
     def ensure_upload_dir(self):
         """Ensure upload directory exists"""
         if not os.path.exists(self.UPLOAD_DIR):
@@ -0,0 +1,8 @@
+from datetime import datetime, timezone
+
+
+def as_utc(value: datetime) -> datetime:
+    """Naive UTC, like every timestamp stored by the app"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
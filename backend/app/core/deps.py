@@ -1,15 +1,20 @@
 from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
 from datetime import datetime
+import ipaddress
+from app.core.config import settings
 from app.db.session import get_db
 from app.core.security import decode_access_token
 from app.models.admin import Admin
 from app.models.order import Order
+from app.services.order_cache import order_cache
+from app.services.admin_cache import admin_cache
 
 security = HTTPBearer()
 
+_TRUSTED_PROXIES = settings.trusted_proxy_networks
+
 
 async def get_current_admin(
     credentials: HTTPAuthorizationCredentials = Depends(security),
@@ -17,6 +22,7 @@ async def get_current_admin(
 ) -> Admin:
     """
     Verify JWT token and return current admin user
+    Verified tokens and admin principals are cached (see AUTH_CACHE_ENABLED)
     """
     token = credentials.credentials
     username = decode_access_token(token)
@@ -28,8 +34,7 @@ async def get_current_admin(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    result = await db.execute(select(Admin).where(Admin.username == username))
-    admin = result.scalar_one_or_none()
+    admin = await admin_cache.get(db, username)
     
     if admin is None:
         raise HTTPException(
@@ -48,9 +53,9 @@ async def get_order_by_hash(
     """
     Verify access_key and return order
     Checks if order exists and is not expired
+    Lookups go through the order cache; the returned order is a read-only copy
     """
-    result = await db.execute(select(Order).where(Order.access_key == access_key))
-    order = result.scalar_one_or_none()
+    order = await order_cache.get_by_key(db, access_key)
     
     if order is None:
         raise HTTPException(
@@ -68,15 +73,30 @@ async def get_order_by_hash(
     return order
 
 
+def _is_trusted_proxy(address: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in _TRUSTED_PROXIES)
+
+
 def get_client_ip(request: Request) -> str:
     """
     Extract client IP address from request
-    Checks X-Forwarded-For header first (for proxies)
+    X-Forwarded-For is only believed when the connection comes from a
+    TRUSTED_PROXIES address; the client is then the rightmost hop that is
+    not itself a trusted proxy (entries further left are client-supplied)
     """
+    peer = request.client.host if request.client else "unknown"
     forwarded = request.headers.get("X-Forwarded-For")
-    if forwarded:
-        return forwarded.split(",")[0].strip()
-    return request.client.host if request.client else "unknown"
+    if not forwarded or not _is_trusted_proxy(peer):
+        return peer
+    hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+    for hop in reversed(hops):
+        if not _is_trusted_proxy(hop):
+            return hop
+    return hops[0] if hops else peer
 
 
 def get_user_agent(request: Request) -> str:
@@ -0,0 +1,255 @@
+"""
+In-process metrics in the Prometheus text exposition format
+- Counters, histograms and callback gauges, each with fixed label names
+- Values live in this worker process; scrape every worker, or run one
+- Updated from the event loop thread only, so no locking
+"""
+import time
+from bisect import bisect_left
+from typing import Callable, Optional
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+CONTENT_TYPE = "text/plain; version=0.0.4"  # Starlette appends the charset
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: dict = {}
+
+    def inc(self, labels: tuple = (), amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels: tuple = ()) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (last one is +Inf), sum]
+        self._series: dict = {}
+
+    def observe(self, value: float, labels: tuple = ()) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def count(self, labels: tuple = ()) -> int:
+        series = self._series.get(labels)
+        return sum(series[0]) if series else 0
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {total!r}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """
+    Read at scrape time from `callback`: a number, or, with labelnames, a
+    dict of label tuple -> number
+    """
+
+    def __init__(self, name: str, help: str, callback: Callable, labelnames: tuple = ()):
+        self.name = name
+        self.help = help
+        self.callback = callback
+        self.labelnames = labelnames
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        values = self.callback()
+        if not self.labelnames:
+            values = {(): values}
+        for labels, value in sorted(values.items()):
+            if value is not None:
+                lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict = {}
+
+    def _add(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: tuple = ()) -> Counter:
+        return self._add(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, labelnames, buckets))
+
+    def gauge(self, name: str, help: str, callback: Callable, labelnames: tuple = ()) -> Gauge:
+        return self._add(Gauge(name, help, callback, labelnames))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.counter(
+    "http_requests_total", "HTTP requests by route template and status code", ("method", "route", "status")
+)
+http_duration = registry.histogram(
+    "http_request_duration_seconds",
+    "Time from request start to the last response byte (background tasks excluded)",
+    ("method", "route"),
+)
+http_in_progress = 0
+registry.gauge("http_requests_in_progress", "Requests being handled", lambda: http_in_progress)
+http_request_bytes = registry.counter(
+    "http_request_body_bytes_total", "Request body bytes received (uploads)", ("route",)
+)
+http_response_bytes = registry.counter(
+    "http_response_body_bytes_total", "Response body bytes sent, including sendfile", ("route",)
+)
+db_query_duration = registry.histogram(
+    "db_query_duration_seconds", "SQL statement execution time", ("operation",), QUERY_BUCKETS
+)
+
+_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "PRAGMA", "BEGIN", "COMMIT", "ROLLBACK"}
+
+
+def statement_operation(statement: str) -> str:
+    """Label for a SQL statement: its leading keyword, or OTHER"""
+    head = statement[:16].split(None, 1)
+    keyword = head[0].upper() if head else ""
+    return keyword if keyword in _OPERATIONS else "OTHER"
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info["metrics_query_start"] = time.perf_counter()
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    start = conn.info.pop("metrics_query_start", None)
+    if start is not None:
+        db_query_duration.observe(time.perf_counter() - start, (statement_operation(statement),))
+
+
+class RouteTemplates:
+    """
+    Path template of the route that handled a request ("/files/download/{file_id}"),
+    read from the endpoint the router stored in the scope; "unmatched" for
+    404s, so labels stay bounded
+    """
+
+    def __init__(self):
+        self._routes: Optional[dict] = None
+
+    def __call__(self, scope: Scope) -> str:
+        if self._routes is None:
+            # Built on first use, once the application's routes are all registered
+            self._routes = {}
+            for route in scope["app"].routes:
+                endpoint = getattr(route, "endpoint", None)
+                if endpoint is not None:
+                    self._routes.setdefault(endpoint, route.path)
+        return self._routes.get(scope.get("endpoint"), "unmatched")
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording per-route request counts, latency and
+    body bytes, labelled by route template
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._route = RouteTemplates()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        global http_in_progress
+        start = time.perf_counter()
+        finished = None
+        status_code = 500
+        received = 0
+        sent = 0
+
+        async def receive_counted() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+            return message
+
+        async def send_counted(message: Message) -> None:
+            nonlocal finished, status_code, sent
+            kind = message["type"]
+            if kind == "http.response.start":
+                status_code = message["status"]
+            elif kind == "http.response.body":
+                sent += len(message.get("body", b""))
+                if not message.get("more_body", False):
+                    finished = time.perf_counter()
+            elif kind == "http.response.zerocopysend":
+                sent += message.get("count") or 0
+            await send(message)
+
+        http_in_progress += 1
+        try:
+            await self.app(scope, receive_counted, send_counted)
+        finally:
+            http_in_progress -= 1
+            elapsed = (finished or time.perf_counter()) - start
+            route = self._route(scope)
+            method = scope["method"]
+            http_requests.inc((method, route, str(status_code)))
+            http_duration.observe(elapsed, (method, route))
+            if received:
+                http_request_bytes.inc((route,), received)
+            if sent:
+                http_response_bytes.inc((route,), sent)
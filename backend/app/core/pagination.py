@@ -0,0 +1,43 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional
+from fastapi import HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.cache import MISSING, cache
+from app.core.config import settings
+
+
+def encode_cursor(timestamp: datetime, row_id: int) -> str:
+    """Opaque keyset cursor for a (timestamp, id) position"""
+    raw = json.dumps([timestamp.isoformat(), row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[tuple]:
+    """Inverse of encode_cursor; raises 400 for cursors we did not issue"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+async def cached_count(db: AsyncSession, key: str, query) -> int:
+    """
+    Run a COUNT query at most once per COUNT_CACHE_TTL_SECONDS
+    Totals are therefore approximate, which is fine for pagination UIs
+    """
+    cached = await cache.get(key)
+    if cached is not MISSING:
+        return cached
+    result = await db.execute(query)
+    total = result.scalar()
+    await cache.set(key, total, settings.COUNT_CACHE_TTL_SECONDS)
+    return total
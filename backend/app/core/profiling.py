@@ -0,0 +1,217 @@
+"""
+Opt-in sampling profiler for individual requests
+- An admin starts a session (see endpoints/system.py); matching requests
+  are then sampled every PROFILING_INTERVAL_MS by a background thread
+- Each sample is the request's own stack: its task's chain of awaiting
+  coroutines, continued into the thread's live frames while it runs, or
+  ending in "[await]" while it waits; so profiles are wall-clock and show
+  I/O waits next to CPU. Work handed to the threadpool shows as the await
+- Stacks are aggregated per route template in collapsed format
+  ("frame;frame;frame count"), the input of flamegraph.pl and speedscope
+- Sessions live in this worker process
+"""
+import asyncio
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Optional
+from starlette.types import ASGIApp, Receive, Scope, Send
+from app.core.config import settings
+from app.core.metrics import RouteTemplates
+
+_APP_ROOT = str(Path(__file__).resolve().parents[2]) + "/"
+OVERFLOW_STACK = "[other stacks]"
+
+
+def _short_path(filename: str) -> str:
+    if filename.startswith(_APP_ROOT):
+        return filename[len(_APP_ROOT):]
+    _, marker, rest = filename.rpartition("site-packages/")
+    return rest if marker else filename.rsplit("/", 1)[-1]
+
+
+class _Sampled:
+    """One request being profiled"""
+
+    def __init__(self, task: asyncio.Task, thread_id: int):
+        self.task = task
+        self.thread_id = thread_id
+        self.stacks: Counter = Counter()
+
+
+class Profiler:
+    def __init__(self, interval_ms: float, max_stacks: int):
+        self.interval = interval_ms / 1000
+        self.max_stacks = max_stacks
+        self.session: Optional[dict] = None
+        self._pattern = None
+        self._until = 0.0
+        self._lock = threading.Lock()
+        self._active: dict = {}
+        self._routes: dict = {}  # route -> {"requests": n, "stacks": Counter}
+        self._thread: Optional[threading.Thread] = None
+        self._names: dict = {}
+
+    # Sessions (called from the event loop)
+
+    def start(self, sample_rate: float, path_pattern: Optional[str], header: Optional[str], duration_seconds: int) -> None:
+        """Begin a new session, discarding the previous one's stacks"""
+        with self._lock:
+            self._routes = {}
+        self._pattern = re.compile(path_pattern) if path_pattern else None
+        self._until = time.monotonic() + duration_seconds
+        self.session = {
+            "sample_rate": sample_rate,
+            "path_pattern": path_pattern,
+            "header": header.lower() if header else None,
+            "duration_seconds": duration_seconds,
+            "started_at": time.time(),
+        }
+
+    def stop(self) -> None:
+        """Stop sampling new requests; collected stacks stay downloadable"""
+        self.session = None
+
+    @property
+    def active(self) -> bool:
+        if self.session is not None and time.monotonic() > self._until:
+            self.session = None
+        return self.session is not None
+
+    def should_sample(self, scope: Scope) -> bool:
+        if not self.active:
+            return False
+        if self._pattern is not None and not self._pattern.search(scope["path"]):
+            return False
+        header = self.session["header"]
+        if header is not None:
+            return any(name.decode("latin-1").lower() == header for name, _ in scope["headers"])
+        return random.random() < self.session["sample_rate"]
+
+    def begin(self) -> _Sampled:
+        sampled = _Sampled(asyncio.current_task(), threading.get_ident())
+        with self._lock:
+            self._active[id(sampled)] = sampled
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                self._thread.start()
+        return sampled
+
+    def end(self, sampled: _Sampled, route: str) -> None:
+        with self._lock:
+            self._active.pop(id(sampled), None)
+            entry = self._routes.setdefault(route, {"requests": 0, "stacks": Counter()})
+            entry["requests"] += 1
+            stacks = entry["stacks"]
+            for stack, count in sampled.stacks.items():
+                if stack in stacks or len(stacks) < self.max_stacks:
+                    stacks[stack] += count
+                else:
+                    stacks[OVERFLOW_STACK] += count
+
+    # Sampling (background thread)
+
+    def _name(self, code) -> str:
+        name = self._names.get(code)
+        if name is None:
+            name = self._names[code] = f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})"
+        return name
+
+    def _stack(self, sampled: _Sampled, thread_frames: dict) -> Optional[str]:
+        # Await chain of the request's task, outermost coroutine first
+        chain = []
+        awaitable = sampled.task.get_coro()
+        while awaitable is not None:
+            frame = getattr(awaitable, "cr_frame", None) or getattr(awaitable, "gi_frame", None) or getattr(awaitable, "ag_frame", None)
+            if frame is None:
+                break
+            chain.append(frame)
+            awaitable = getattr(awaitable, "cr_await", None) or getattr(awaitable, "gi_yieldfrom", None) or getattr(awaitable, "ag_await", None)
+        if not chain:
+            return None
+        positions = {id(frame): index for index, frame in enumerate(chain)}
+
+        # If the task is running, its deepest coroutine is on the thread's stack
+        running = []
+        frame = thread_frames.get(sampled.thread_id)
+        while frame is not None and id(frame) not in positions:
+            running.append(frame)
+            frame = frame.f_back
+        if frame is not None:
+            frames = chain[:positions[id(frame)] + 1] + running[::-1]
+            return ";".join(self._name(f.f_code) for f in frames)
+        return ";".join(self._name(f.f_code) for f in chain) + ";[await]"
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._active:
+                    self._thread = None
+                    return
+                thread_frames = sys._current_frames()
+                for sampled in self._active.values():
+                    try:
+                        stack = self._stack(sampled, thread_frames)
+                    except Exception:
+                        stack = None  # Frames changed under us; skip this tick
+                    if stack is not None:
+                        sampled.stacks[stack] += 1
+                del thread_frames
+
+    # Results
+
+    def status(self) -> dict:
+        active = self.active
+        with self._lock:
+            routes = {
+                route: {"requests": entry["requests"], "samples": sum(entry["stacks"].values())}
+                for route, entry in sorted(self._routes.items())
+            }
+            in_flight = len(self._active)
+        return {
+            "active": active,
+            "session": self.session,
+            "interval_ms": self.interval * 1000,
+            "requests_in_flight": in_flight,
+            "routes": routes,
+        }
+
+    def collapsed(self, route: Optional[str] = None) -> str:
+        """Collapsed stacks of one route, or of all with the route as root frame"""
+        lines = []
+        with self._lock:
+            for name, entry in sorted(self._routes.items()):
+                if route is not None and name != route:
+                    continue
+                prefix = "" if route is not None else f"{name};"
+                for stack, count in entry["stacks"].most_common():
+                    lines.append(f"{prefix}{stack} {count}")
+        return "\n".join(lines) + "\n" if lines else ""
+
+
+class ProfilingMiddleware:
+    """Hands requests chosen by the active session to the profiler; a single check otherwise"""
+
+    def __init__(self, app: ASGIApp, profiler: "Profiler"):
+        self.app = app
+        self.profiler = profiler
+        self._route = RouteTemplates()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.profiler.should_sample(scope):
+            await self.app(scope, receive, send)
+            return
+
+        sampled = self.profiler.begin()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.profiler.end(sampled, self._route(scope))
+
+
+profiler = Profiler(settings.PROFILING_INTERVAL_MS, settings.PROFILING_MAX_STACKS)
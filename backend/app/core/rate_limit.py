@@ -0,0 +1,50 @@
+import math
+import time
+from collections import OrderedDict, deque
+
+
+class SlidingWindowLimiter:
+    """
+    Per-key sliding window counter
+    Keeps at most `max_keys` keys, evicting the least recently used one
+    """
+
+    def __init__(self, limit: int, window_seconds: float, max_keys: int = 100000):
+        self.limit = limit
+        self.window = window_seconds
+        self.max_keys = max_keys
+        self._events: OrderedDict = OrderedDict()
+        self.blocked = 0
+
+    def _prune(self, key: str, now: float) -> deque:
+        events = self._events.get(key)
+        if events is None:
+            return deque()
+        while events and events[0] <= now - self.window:
+            events.popleft()
+        return events
+
+    def retry_after(self, key: str) -> int:
+        """Seconds until `key` may try again, 0 if it is under the limit"""
+        now = time.monotonic()
+        events = self._prune(key, now)
+        if len(events) < self.limit:
+            return 0
+        self.blocked += 1
+        return max(1, math.ceil(events[0] + self.window - now))
+
+    def hit(self, key: str) -> None:
+        """Record one event for `key`"""
+        now = time.monotonic()
+        events = self._prune(key, now)
+        events.append(now)
+        self._events[key] = events
+        self._events.move_to_end(key)
+        while len(self._events) > self.max_keys:
+            self._events.popitem(last=False)
+
+    def reset(self, key: str) -> None:
+        self._events.pop(key, None)
+
+    def stats(self) -> dict:
+        return {"tracked_keys": len(self._events), "blocked": self.blocked}
@@ -1,5 +1,11 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Optional
+import asyncio
+import hashlib
+import time
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from app.core.config import settings
@@ -18,6 +24,88 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+class PasswordHasherBusy(Exception):
+    """Raised when too many hash operations are already queued"""
+
+
+class PasswordHasherPool:
+    """
+    Runs bcrypt off the event loop in a dedicated, size-limited thread pool
+    At most `queue_limit` operations may be running or waiting at once;
+    anything beyond that is rejected instead of piling up
+    """
+    
+    def __init__(self, workers: int, queue_limit: int):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        return self._executor
+    
+    async def run(self, fn, *args):
+        if self.pending >= self.queue_limit:
+            self.rejected += 1
+            raise PasswordHasherBusy()
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            self.pending -= 1
+            self.completed += 1
+    
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+    
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queue_limit": self.queue_limit,
+            "pending": self.pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+
+password_hasher = PasswordHasherPool(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_QUEUE_LIMIT)
+
+@lru_cache(maxsize=1)
+def _dummy_hash() -> str:
+    """
+    Verified against when the username does not exist, so both paths cost the same
+    Built on first use (in the hashing pool), not at import in every process and script
+    """
+    return pwd_context.hash("dummy-password-for-timing")
+
+
+def _verify_dummy(plain_password: str) -> bool:
+    return verify_password(plain_password, _dummy_hash())
+
+
+async def verify_password_async(plain_password: str, hashed_password: Optional[str]) -> bool:
+    """
+    Verify a password in the hashing pool
+    A missing hash still costs one bcrypt round so usernames cannot be probed by timing
+    """
+    if hashed_password is None:
+        await password_hasher.run(_verify_dummy, plain_password)
+        return False
+    return await password_hasher.run(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """Hash a password in the hashing pool"""
+    return await password_hasher.run(get_password_hash, password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token"""
     to_encode = data.copy()
@@ -31,11 +119,69 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
+class VerifiedTokenCache:
+    """
+    Bounded cache of already-verified JWTs
+    Keyed by SHA-256 of the token; entries are dropped once the token's exp passes
+    """
+    
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._data: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+    
+    def get(self, token: str) -> Optional[str]:
+        key = self._key(token)
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        username, expires_at = entry
+        if expires_at <= time.time():
+            del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return username
+    
+    def put(self, token: str, username: str, expires_at: float) -> None:
+        key = self._key(token)
+        self._data[key] = (username, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+    
+    def clear(self) -> None:
+        self._data.clear()
+    
+    def stats(self) -> dict:
+        return {"entries": len(self._data), "hits": self.hits, "misses": self.misses}
+
+
+token_cache = VerifiedTokenCache(settings.TOKEN_CACHE_MAX_ENTRIES)
+
+
 def decode_access_token(token: str) -> Optional[str]:
     """Decode JWT token and return username"""
+    if settings.AUTH_CACHE_ENABLED:
+        username = token_cache.get(token)
+        if username is not None:
+            return username
+    
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         username: str = payload.get("sub")
-        return username
     except JWTError:
         return None
+    
+    # Only tokens with an expiry are cached, and never past it
+    exp = payload.get("exp")
+    if settings.AUTH_CACHE_ENABLED and username is not None and exp is not None:
+        token_cache.put(token, username, float(exp))
+    return username
@@ -1,13 +1,56 @@
+from sqlalchemy import event, inspect
+from sqlalchemy.schema import CreateColumn
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.core.config import settings
+from app.core import metrics
+
+
+def _engine_options() -> dict:
+    """Engine arguments for the configured SQLite profile"""
+    options = {
+        "connect_args": {"check_same_thread": False},  # Required for SQLite
+        "echo": settings.DB_ECHO,
+    }
+    database = make_url(settings.SQLITE_URL).database
+    if database and database != ":memory:":
+        # aiosqlite defaults to NullPool, opening a connection (and thread) per session
+        options.update(
+            poolclass=AsyncAdaptedQueuePool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+        )
+    return options
+
 
 # Create async engine with SQLite-specific configuration
-engine = create_async_engine(
-    settings.SQLITE_URL,
-    connect_args={"check_same_thread": False},  # Required for SQLite
-    echo=True,  # Set to False in production
-)
+engine = create_async_engine(settings.SQLITE_URL, **_engine_options())
+
+
+@event.listens_for(engine.sync_engine, "connect")
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """Apply the SQLite tuning pragmas to every new pooled connection"""
+    cursor = dbapi_connection.cursor()
+    # Only applies before the first table is created, or on the next VACUUM
+    cursor.execute(f"PRAGMA auto_vacuum={settings.DB_AUTO_VACUUM}")
+    cursor.execute(f"PRAGMA journal_mode={settings.DB_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={settings.DB_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.DB_BUSY_TIMEOUT_MS)}")
+    cursor.execute(f"PRAGMA mmap_size={int(settings.DB_MMAP_SIZE)}")
+    cursor.execute(f"PRAGMA cache_size=-{int(settings.DB_CACHE_SIZE_KB)}")
+    cursor.execute(f"PRAGMA foreign_keys={'ON' if settings.DB_FOREIGN_KEYS else 'OFF'}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+if settings.METRICS_ENABLED:
+    # Time every statement (see core/metrics.py, db_query_duration_seconds)
+    event.listen(engine.sync_engine, "before_cursor_execute", metrics.before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", metrics.after_cursor_execute)
+
 
 # Create async session factory
 AsyncSessionLocal = sessionmaker(
@@ -36,3 +79,29 @@ async def init_db():
     """Initialize database tables"""
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_add_missing_columns)
+        await conn.run_sync(_create_missing_indexes)
+
+
+def _add_missing_columns(conn):
+    """
+    Add columns added to existing models since the database was made
+    New columns must be nullable or carry a server_default
+    """
+    inspector = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                ddl = CreateColumn(column).compile(dialect=conn.dialect)
+                conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {ddl}")
+
+
+def _create_missing_indexes(conn):
+    """
+    create_all skips tables that already exist, including their indexes
+    Create indexes added to existing models since the database was made
+    """
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
@@ -1,10 +1,23 @@
 from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from contextlib import asynccontextmanager
+import secrets
 from app.core.config import settings
-from app.db.session import init_db
+from app.core import metrics
+from app.core.profiling import ProfilingMiddleware, profiler
+from app.db.session import engine, init_db
 from app.api.v1.api import api_router
+from app.core.security import password_hasher
+from app.services.access_log import access_log_writer
+from app.services.storage import storage
+from app.services.compression import compression_worker
+from app.services.order_stats import counter_reconciler
+from app.services.log_archive import log_archiver
+from app.services.blob_gc import deletion_worker, orphan_reconciler
+from app.services.order_expiry import expiry_sweeper
+from app.services.upload_sessions import upload_session_sweeper
+from app.services.health import health_monitor
 
 
 @asynccontextmanager
@@ -12,7 +25,7 @@ async def lifespan(app: FastAPI):
     """
     Lifespan events for the application
     - Startup: Initialize database and ensure upload directory exists
-    - Shutdown: Cleanup tasks
+    - Shutdown: Flush queued access logs, close storage connections
     """
     # Startup
     print("🚀 Starting up application...")
@@ -25,10 +38,59 @@ async def lifespan(app: FastAPI):
     await init_db()
     print("✅ Database initialized")
     
+    # Start batched access log writer
+    await access_log_writer.start()
+    print("✅ Access log writer started")
+    
+    # Start background builder of precompressed download variants
+    await compression_worker.start()
+    print("✅ Compression worker started")
+    
+    # Periodically repair drift in the denormalized order counters
+    await counter_reconciler.start()
+    print("✅ Order counter reconciler started")
+    
+    # Move access logs past their retention period into archive files
+    await log_archiver.start()
+    print("✅ Access log archiver started")
+    
+    # Remove deleted files' bytes off the request path; sweep up orphans
+    await deletion_worker.start()
+    await orphan_reconciler.start()
+    print("✅ Storage cleanup workers started")
+    
+    # Mark (and optionally purge) orders past their expiry date
+    await expiry_sweeper.start()
+    print("✅ Order expiry sweeper started")
+    
+    # Abort resumable uploads past their TTL and remove their parts
+    await upload_session_sweeper.start()
+    print("✅ Upload session sweeper started")
+    
+    # Measure event loop lag for the liveness / readiness probes
+    await health_monitor.start()
+    print("✅ Health monitor started")
+    
     yield
     
     # Shutdown
     print("👋 Shutting down application...")
+    
+    await health_monitor.stop()
+    await upload_session_sweeper.stop()
+    await expiry_sweeper.stop()
+    await orphan_reconciler.stop()
+    await deletion_worker.stop()
+    await log_archiver.stop()
+    await counter_reconciler.stop()
+    await compression_worker.stop()
+    
+    # Flush queued access logs before exiting
+    await access_log_writer.stop()
+    print("✅ Access log writer flushed")
+    
+    password_hasher.shutdown()
+    await storage.close()
 
 
 # Create FastAPI application
@@ -49,6 +111,32 @@ app.add_middleware(
 )
 
 
+if settings.PROFILING_ENABLED:
+    # Inside the metrics middleware, so profiled requests are timed as usual
+    app.add_middleware(ProfilingMiddleware, profiler=profiler)
+
+if settings.METRICS_ENABLED:
+    # Outermost but for error handling: times the whole request, CORS included
+    app.add_middleware(metrics.MetricsMiddleware)
+    
+    metrics.registry.gauge(
+        "background_queue_depth",
+        "Jobs waiting in this worker's background queues",
+        lambda: {
+            ("access_log",): access_log_writer.depth(),
+            ("compression",): compression_worker.depth(),
+            ("deletion",): deletion_worker.depth(),
+            ("password_hash",): password_hasher.pending,
+        },
+        ("queue",),
+    )
+    metrics.registry.gauge(
+        "db_pool_connections_in_use",
+        "Database connections checked out of the pool",
+        lambda: engine.pool.checkedout() if hasattr(engine.pool, "checkedout") else None,
+    )
+
+
 # Global exception handler
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
@@ -78,6 +166,36 @@ async def health_check():
     }
 
 
+@app.get("/health/live")
+async def liveness_check():
+    """Liveness probe: the process and its event loop respond"""
+    return health_monitor.liveness()
+
+
+@app.get("/health/ready")
+async def readiness_check():
+    """
+    Readiness probe: database, write lock, disk, queues and loop lag
+    Returns 503 when any check fails, so load balancers stop routing here
+    """
+    result = await health_monitor.readiness()
+    if result["status"] != "ready":
+        return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content=result)
+    return result
+
+
+# Metrics endpoint (Prometheus text format)
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint(request: Request):
+    """This worker's request, query and queue metrics"""
+    if not settings.METRICS_ENABLED:
+        return JSONResponse(status_code=status.HTTP_404_NOT_FOUND, content={"detail": "Not Found"})
+    expected = f"Bearer {settings.METRICS_TOKEN}"
+    if settings.METRICS_TOKEN and not secrets.compare_digest(request.headers.get("authorization", ""), expected):
+        return JSONResponse(status_code=status.HTTP_401_UNAUTHORIZED, content={"detail": "Invalid metrics token"})
+    return Response(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
+
 # Root endpoint
 @app.get("/")
 async def root():
@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, BigInteger, DateTime, ForeignKey
+from datetime import datetime
+from app.db.session import Base
+
+
+class Blob(Base):
+    __tablename__ = "blobs"
+    
+    digest = Column(String(64), primary_key=True)  # SHA-256 hex of the content
+    size = Column(BigInteger, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)  # Number of File rows pointing here
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+# Precompressed copy of a blob, stored next to it (<digest>.gz / .br / .zst)
+class BlobVariant(Base):
+    __tablename__ = "blob_variants"
+    
+    digest = Column(String(64), ForeignKey("blobs.digest", ondelete="CASCADE"), primary_key=True)
+    encoding = Column(String(10), primary_key=True)  # Content-Encoding token: gzip, br, zstd
+    size = Column(BigInteger, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, BigInteger, ForeignKey, DateTime, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, BigInteger, ForeignKey, DateTime, Index, Enum as SQLEnum
 from datetime import datetime
 import enum
 from app.db.session import Base
@@ -11,11 +11,18 @@ class FileType(str, enum.Enum):
 
 class File(Base):
     __tablename__ = "files"
+    __table_args__ = (
+        # Serves an order's file list, newest first, and cascading deletes
+        Index("ix_files_order_id_uploaded_at", "order_id", "uploaded_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     order_id = Column(Integer, ForeignKey("orders.id", ondelete="CASCADE"), nullable=False)
     filename_original = Column(String(255), nullable=False)
-    filename_saved = Column(String(255), nullable=False)  # UUID-based filename
+    filename_saved = Column(String(255), nullable=False)  # Blob digest (legacy rows: UUID-based filename)
     file_size = Column(BigInteger, nullable=False)
+    # SHA-256 hex digest; NULL for rows uploaded before hashing. Databases made
+    # before this column existed get it from init_db (_add_missing_columns)
+    content_hash = Column(String(64), nullable=True)
     file_type = Column(SQLEnum(FileType), nullable=False)
     uploaded_at = Column(DateTime, default=datetime.utcnow, nullable=False)
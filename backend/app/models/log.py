@@ -1,15 +1,19 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Index
 from datetime import datetime
 from app.db.session import Base
 
 
 class AccessLog(Base):
     __tablename__ = "access_logs"
+    __table_args__ = (
+        # Serves per-order log pages ordered by (timestamp, id); id is the rowid
+        Index("ix_access_logs_order_id_timestamp", "order_id", "timestamp"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     order_id = Column(Integer, ForeignKey("orders.id", ondelete="CASCADE"), nullable=False)
     ip_address = Column(String(45), nullable=False)  # IPv6 support
     user_agent = Column(String(500), nullable=True)
-    action_type = Column(String(50), nullable=False)  # e.g., "VISIT_PAGE", "DOWNLOAD_SUCCESS"
+    action_type = Column(String(50), nullable=False)  # e.g., "VISIT_PAGE", "DOWNLOAD_SUCCESS", "DOWNLOAD_BUNDLE"
     target_file = Column(String(255), nullable=True)  # Filename if action is download
     timestamp = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, String, BigInteger, DateTime, ForeignKey, Index
+from datetime import datetime
+from app.db.session import Base
+
+
+# One gzip member of a monthly access log archive: a run of one order's rows,
+# oldest first, moved out of access_logs by the archiver (see services/log_archive.py)
+class LogArchiveSegment(Base):
+    __tablename__ = "log_archive_segments"
+    __table_args__ = (
+        # Serves per-order reads newest first
+        Index("ix_log_archive_segments_order_id_last_timestamp", "order_id", "last_timestamp"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    order_id = Column(Integer, ForeignKey("orders.id", ondelete="CASCADE"), nullable=False)
+    month = Column(DateTime, nullable=False, index=True)  # UTC start of the partition month
+    storage_key = Column(String(255), nullable=False)  # Archive file holding the member
+    offset = Column(BigInteger, nullable=False)  # Byte range of the gzip member in the file
+    length = Column(Integer, nullable=False)
+    row_count = Column(Integer, nullable=False)
+    visit_count = Column(Integer, nullable=False, default=0)  # Per-action totals, so counters survive archival
+    download_count = Column(Integer, nullable=False, default=0)
+    first_timestamp = Column(DateTime, nullable=False)
+    first_id = Column(Integer, nullable=False)
+    last_timestamp = Column(DateTime, nullable=False)
+    last_id = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Enum as SQLEnum
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime, Index, Enum as SQLEnum
 from datetime import datetime
 import enum
 from app.db.session import Base
@@ -8,10 +8,18 @@ class OrderStatus(str, enum.Enum):
     pending = "pending"
     dev = "dev"
     delivered = "delivered"
+    expired = "expired"  # Set by the expiry sweeper once expires_at has passed
 
 
 class Order(Base):
     __tablename__ = "orders"
+    __table_args__ = (
+        # Serve order listings ordered by (created_at, id), with and without status filter
+        Index("ix_orders_created_at", "created_at"),
+        Index("ix_orders_status_created_at", "status", "created_at"),
+        # Lets the expiry sweeper find due orders without scanning the table
+        Index("ix_orders_status_expires_at", "status", "expires_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     access_key = Column(String(12), unique=True, nullable=False, index=True)
@@ -20,3 +28,11 @@ class Order(Base):
     status = Column(SQLEnum(OrderStatus), default=OrderStatus.pending, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     expires_at = Column(DateTime, nullable=True)
+    status_before_expiry = Column(SQLEnum(OrderStatus), nullable=True)  # Restored when an expired order is extended
+    
+    # Denormalized counters, maintained by the write paths (see services/order_stats.py)
+    file_count = Column(Integer, default=0, server_default="0", nullable=False)
+    total_bytes = Column(BigInteger, default=0, server_default="0", nullable=False)
+    visit_count = Column(Integer, default=0, server_default="0", nullable=False)
+    download_count = Column(Integer, default=0, server_default="0", nullable=False)
+    last_access_at = Column(DateTime, nullable=True)
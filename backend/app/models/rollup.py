@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, LargeBinary
+from app.db.session import Base
+
+
+# Access log counts per order, time bucket, action and file, kept current by
+# the access log writer (see services/rollups.py)
+class AccessRollup(Base):
+    __tablename__ = "access_rollups"
+    
+    order_id = Column(Integer, ForeignKey("orders.id", ondelete="CASCADE"), primary_key=True)
+    granularity = Column(String(8), primary_key=True)  # "hour" or "day"
+    bucket_start = Column(DateTime, primary_key=True)  # UTC, truncated to the granularity
+    action_type = Column(String(50), primary_key=True)
+    target_file = Column(String(255), primary_key=True, default="")  # "" when the action has no file
+    count = Column(Integer, nullable=False, default=0)
+
+
+# Unique-IP HyperLogLog sketch per order and time bucket
+class AccessIpSketch(Base):
+    __tablename__ = "access_ip_sketches"
+    
+    order_id = Column(Integer, ForeignKey("orders.id", ondelete="CASCADE"), primary_key=True)
+    granularity = Column(String(8), primary_key=True)  # "day" or "all" (bucket_start is then the epoch)
+    bucket_start = Column(DateTime, primary_key=True)
+    registers = Column(LargeBinary, nullable=False)  # zlib-compressed HLL registers
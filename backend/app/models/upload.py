@@ -0,0 +1,41 @@
+from sqlalchemy import Column, Integer, String, BigInteger, ForeignKey, DateTime, UniqueConstraint, Enum as SQLEnum
+from datetime import datetime
+import enum
+from app.db.session import Base
+from app.models.file import FileType
+
+
+class UploadSessionStatus(str, enum.Enum):
+    active = "active"
+    completing = "completing"  # Claimed by a /complete request that is assembling the parts
+    completed = "completed"
+    aborted = "aborted"
+
+
+class UploadSession(Base):
+    __tablename__ = "upload_sessions"
+    
+    id = Column(String(32), primary_key=True)  # uuid4 hex, used in URLs
+    order_id = Column(Integer, ForeignKey("orders.id", ondelete="CASCADE"), nullable=False, index=True)
+    filename_original = Column(String(255), nullable=False)
+    file_type = Column(SQLEnum(FileType), nullable=False)
+    total_size = Column(BigInteger, nullable=True)  # Declared by the client, optional
+    part_size = Column(BigInteger, nullable=False)
+    status = Column(SQLEnum(UploadSessionStatus), default=UploadSessionStatus.active, nullable=False)
+    file_id = Column(Integer, ForeignKey("files.id", ondelete="SET NULL"), nullable=True)  # Set on completion
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
+
+class UploadPart(Base):
+    __tablename__ = "upload_parts"
+    __table_args__ = (
+        UniqueConstraint("session_id", "part_number", name="uq_upload_parts_session_part"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    session_id = Column(String(32), ForeignKey("upload_sessions.id", ondelete="CASCADE"), nullable=False)
+    part_number = Column(Integer, nullable=False)  # 1-based
+    size = Column(BigInteger, nullable=False)
+    checksum = Column(String(64), nullable=False)  # SHA-256 hex digest of the part
+    uploaded_at = Column(DateTime, default=datetime.utcnow, nullable=False)
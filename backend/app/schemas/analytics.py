@@ -0,0 +1,30 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional, Literal
+
+
+class AnalyticsBucket(BaseModel):
+    bucket_start: datetime
+    counts: dict[str, int]  # action_type -> events in this bucket
+    unique_ips: Optional[int] = None  # HyperLogLog estimate, daily buckets only
+
+
+class AnalyticsTimeseriesResponse(BaseModel):
+    order_id: int
+    granularity: Literal["hour", "day"]
+    start: datetime
+    end: datetime
+    buckets: list[AnalyticsBucket]
+
+
+class FileActivity(BaseModel):
+    target_file: str
+    counts: dict[str, int]
+    total: int
+
+
+class AnalyticsSummaryResponse(BaseModel):
+    order_id: int
+    actions: dict[str, int]  # action_type -> all-time events
+    unique_ips: int  # HyperLogLog estimate, ~3% error
+    files: list[FileActivity]  # Most active first
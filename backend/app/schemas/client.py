@@ -0,0 +1,8 @@
+from pydantic import BaseModel
+from app.schemas.order import OrderResponse
+from app.schemas.file import FileResponse
+
+
+class ClientLandingResponse(BaseModel):
+    order: OrderResponse
+    files: list[FileResponse]
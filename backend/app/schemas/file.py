@@ -1,5 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
+from typing import Optional
 from app.models.file import FileType
 
 
@@ -19,6 +20,7 @@ class FileResponse(FileBase):
     order_id: int
     filename_saved: str
     file_size: int
+    content_hash: Optional[str] = None
     uploaded_at: datetime
     
     class Config:
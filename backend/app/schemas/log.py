@@ -24,5 +24,6 @@ class AccessLogResponse(AccessLogBase):
 
 
 class AccessLogListResponse(BaseModel):
-    total: int
+    total: Optional[int] = None  # Cached count, omitted when include_total=false
     logs: list[AccessLogResponse]
+    next_cursor: Optional[str] = None
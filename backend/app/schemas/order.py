@@ -31,6 +31,21 @@ class OrderResponse(OrderBase):
         from_attributes = True
 
 
+class OrderAdminResponse(OrderResponse):
+    """Order with its denormalized usage counters (admin views only)"""
+    file_count: int = 0
+    total_bytes: int = 0
+    visit_count: int = 0
+    download_count: int = 0
+    last_access_at: Optional[datetime] = None
+
+
+class OrderBulkCreateResponse(BaseModel):
+    created: int
+    items: list[OrderAdminResponse]  # In input order, each with its new access_key
+
+
 class OrderListResponse(BaseModel):
-    total: int
-    items: list[OrderResponse]
+    total: Optional[int] = None  # Cached count, omitted when include_total=false
+    items: list[OrderAdminResponse]
+    next_cursor: Optional[str] = None
@@ -0,0 +1,20 @@
+import re
+from pydantic import BaseModel, Field, field_validator
+from typing import Optional
+
+
+class ProfilingStart(BaseModel):
+    sample_rate: float = Field(0.01, ge=0, le=1)  # Fraction of matching requests to profile
+    path_pattern: Optional[str] = None  # Regex searched in the request path
+    header: Optional[str] = None  # Profile every matching request carrying this header instead
+    duration_seconds: int = Field(300, ge=1)
+    
+    @field_validator("path_pattern")
+    @classmethod
+    def valid_pattern(cls, value: Optional[str]) -> Optional[str]:
+        if value is not None:
+            try:
+                re.compile(value)
+            except re.error as e:
+                raise ValueError(f"Invalid regular expression: {e}")
+        return value
@@ -0,0 +1,37 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import Optional
+from app.models.file import FileType
+from app.models.upload import UploadSessionStatus
+
+
+class UploadSessionCreate(BaseModel):
+    access_key: str
+    filename: str
+    file_type: FileType
+    total_size: Optional[int] = Field(None, ge=0)
+    part_size: Optional[int] = Field(None, gt=0)
+
+
+class UploadPartResponse(BaseModel):
+    part_number: int
+    size: int
+    checksum: str
+    uploaded_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+
+class UploadSessionResponse(BaseModel):
+    id: str
+    order_id: int
+    filename_original: str
+    file_type: FileType
+    total_size: Optional[int] = None
+    part_size: int
+    status: UploadSessionStatus
+    file_id: Optional[int] = None
+    created_at: datetime
+    expires_at: datetime
+    parts: list[UploadPartResponse] = []
@@ -0,0 +1,200 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.log import AccessLog
+from app.models.order import Order
+from app.services.order_stats import apply_log_rows
+from app.services import rollups
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class AccessLogWriter:
+    """
+    Write-behind pipeline for AccessLog rows
+    - Request handlers enqueue rows and return immediately
+    - A single background flusher bulk-inserts them, one transaction per
+      `batch_size` rows or `flush_interval_ms`, whichever comes first
+    - The queue is bounded; when it is full, callers wait up to
+      `enqueue_timeout_ms` (back-pressure) and the row is dropped after that
+    """
+
+    def __init__(self, batch_size: int, flush_interval_ms: int, max_queue: int, enqueue_timeout_ms: int):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_queue = max_queue
+        self.enqueue_timeout = enqueue_timeout_ms / 1000
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+        # Counters
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.backpressure_waits = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def depth(self) -> int:
+        """Rows waiting to be written"""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._task = asyncio.create_task(self._run(), name="access-log-writer")
+
+    async def stop(self) -> None:
+        """Flush everything still queued and stop the flusher"""
+        if not self.running:
+            return
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+
+    async def record(
+        self,
+        order_id: int,
+        ip_address: str,
+        user_agent: str,
+        action_type: str,
+        target_file: str = None
+    ) -> bool:
+        """
+        Queue one access log row
+        Returns False if the row had to be dropped
+        """
+        row = {
+            "order_id": order_id,
+            "ip_address": ip_address,
+            "user_agent": user_agent,
+            "action_type": action_type,
+            "target_file": target_file,
+            "timestamp": datetime.utcnow(),
+        }
+
+        if not self.running:
+            # No lifespan (scripts, one-off tools): write straight through
+            await self._flush([row])
+            return True
+
+        try:
+            self._queue.put_nowait(row)
+        except asyncio.QueueFull:
+            self.backpressure_waits += 1
+            try:
+                await asyncio.wait_for(self._queue.put(row), self.enqueue_timeout)
+            except asyncio.TimeoutError:
+                self.dropped += 1
+                return False
+
+        self.enqueued += 1
+        return True
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+
+        while not stopping:
+            item = await self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = loop.time() + self.flush_interval
+
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            await self._flush(batch)
+
+        # Drain rows queued after the stop marker
+        remaining = []
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not _STOP:
+                remaining.append(item)
+        for start in range(0, len(remaining), self.batch_size):
+            await self._flush(remaining[start:start + self.batch_size])
+
+    async def _drop_orphans(self, rows: list) -> list:
+        """Remove rows whose order was deleted while they sat in the queue"""
+        order_ids = {row["order_id"] for row in rows}
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(select(Order.id).where(Order.id.in_(order_ids)))
+            existing = set(result.scalars().all())
+        kept = [row for row in rows if row["order_id"] in existing]
+        self.dropped += len(rows) - len(kept)
+        return kept
+
+    async def _flush(self, rows: list, attempts: int = 3) -> None:
+        for attempt in range(1, attempts + 1):
+            try:
+                async with AsyncSessionLocal() as db:
+                    await db.execute(insert(AccessLog), rows)
+                    # Order visit / download counters move in the same transaction
+                    await apply_log_rows(db, rows)
+                    if settings.ACCESS_ROLLUPS_ENABLED:
+                        await rollups.record(db, rows)
+                    await db.commit()
+                self.written += len(rows)
+                self.flushes += 1
+                return
+            except IntegrityError:
+                # Foreign keys are enforced: one deleted order must not sink the batch
+                rows = await self._drop_orphans(rows)
+                if not rows:
+                    return
+            except Exception:
+                logger.exception("Access log flush attempt %d/%d failed", attempt, attempts)
+                if attempt < attempts:
+                    await asyncio.sleep(0.1 * attempt)
+
+        self.failed_flushes += 1
+        self.dropped += len(rows)
+        logger.error("Dropped %d access log rows after %d attempts", len(rows), attempts)
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "queue_depth": self.depth(),
+            "queue_capacity": self.max_queue,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "backpressure_waits": self.backpressure_waits,
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes,
+        }
+
+
+access_log_writer = AccessLogWriter(
+    batch_size=settings.ACCESS_LOG_BATCH_SIZE,
+    flush_interval_ms=settings.ACCESS_LOG_FLUSH_INTERVAL_MS,
+    max_queue=settings.ACCESS_LOG_QUEUE_SIZE,
+    enqueue_timeout_ms=settings.ACCESS_LOG_ENQUEUE_TIMEOUT_MS,
+)
@@ -0,0 +1,50 @@
+from typing import Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.cache import CacheBackend, MISSING, cache
+from app.core.config import settings
+from app.models.admin import Admin
+
+
+class AdminCache:
+    """
+    TTL cache of username -> admin principal for authenticated requests
+    - Only id and username are cached; the password hash never leaves the DB
+    - Cached admins are detached copies without hashed_password
+    - Invalidate whenever an admin is created, changed or removed
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(username: str) -> str:
+        return f"admin:{username}"
+
+    async def get(self, db: AsyncSession, username: str) -> Optional[Admin]:
+        if settings.AUTH_CACHE_ENABLED:
+            cached = await self.backend.get(self._key(username))
+            if cached is not MISSING:
+                self.hits += 1
+                return Admin(id=cached["id"], username=cached["username"])
+
+        self.misses += 1
+        result = await db.execute(select(Admin).where(Admin.username == username))
+        admin = result.scalar_one_or_none()
+        if admin is not None and settings.AUTH_CACHE_ENABLED:
+            await self.backend.set(
+                self._key(username), {"id": admin.id, "username": admin.username}, self.ttl
+            )
+        return admin
+
+    async def invalidate(self, username: str) -> None:
+        await self.backend.delete(self._key(username))
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+admin_cache = AdminCache(cache, ttl=settings.ADMIN_CACHE_TTL_SECONDS)
@@ -0,0 +1,368 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Optional
+from sqlalchemy import select
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.blob import Blob, BlobVariant
+from app.models.file import File
+from app.models.log_archive import LogArchiveSegment
+from app.services import blob_store
+from app.services.storage import storage, StoredObject
+
+logger = logging.getLogger(__name__)
+
+QUARANTINE_PREFIX = ".quarantine"
+MISSING_SAMPLE_SIZE = 20
+
+_SUFFIX_ENCODINGS = {suffix: encoding for encoding, suffix in blob_store.VARIANT_SUFFIXES.items()}
+
+
+class DeletionWorker:
+    """
+    Removes the bytes of released blobs off the request path
+    - Delete handlers submit filenames after committing; `workers` tasks
+      unlink each blob and its variants unless a new reference appeared
+    - With the queue full (or the worker stopped) the caller unlinks inline,
+      so a burst of deletions slows down instead of leaking files
+    - Jobs still queued at shutdown get a few seconds to finish; anything
+      lost after that is found by the OrphanReconciler
+    """
+
+    def __init__(self, workers: int, max_queue: int, drain_seconds: float = 10.0):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.drain_seconds = drain_seconds
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: list = []
+
+        # Counters
+        self.enqueued = 0
+        self.inline = 0
+        self.completed = 0
+        self.failed = 0
+
+    @property
+    def running(self) -> bool:
+        return any(not task.done() for task in self._tasks)
+
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._tasks = [
+            asyncio.create_task(self._run(), name=f"deletion-worker-{n}") for n in range(self.workers)
+        ]
+
+    async def stop(self) -> None:
+        """Give queued jobs `drain_seconds` to finish, then stop"""
+        if not self.running:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), self.drain_seconds)
+        except asyncio.TimeoutError:
+            logger.warning("Stopping with %d blob deletions still queued", self.depth())
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, filename_saved: str) -> None:
+        """Remove a released file's bytes in the background (see blob_store.release)"""
+        if self.running:
+            try:
+                self._queue.put_nowait(filename_saved)
+                self.enqueued += 1
+                return
+            except asyncio.QueueFull:
+                pass
+        self.inline += 1
+        await self._unlink(filename_saved)
+
+    async def _unlink(self, filename_saved: str) -> None:
+        try:
+            async with AsyncSessionLocal() as db:
+                await blob_store.unlink_if_unreferenced(db, filename_saved)
+        except Exception:
+            self.failed += 1
+            logger.exception("Could not remove blob %s", filename_saved)
+            return
+        self.completed += 1
+
+    async def _run(self) -> None:
+        while True:
+            filename_saved = await self._queue.get()
+            try:
+                await self._unlink(filename_saved)
+            finally:
+                self._queue.task_done()
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "workers": self.workers,
+            "queue_depth": self.depth(),
+            "enqueued": self.enqueued,
+            "inline": self.inline,
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+
+
+async def _merge(stored: AsyncIterator[StoredObject], expected: AsyncIterator[str]) -> AsyncIterator[tuple]:
+    """
+    Join two key-ordered streams into (object, key) pairs: key is None for
+    stored objects nothing expects, object is None for keys not stored
+    """
+    item = await anext(stored, None)
+    key = await anext(expected, None)
+    while item is not None or key is not None:
+        if key is None or (item is not None and item.key < key):
+            yield item, None
+            item = await anext(stored, None)
+        elif item is None or key < item.key:
+            yield None, key
+            key = await anext(expected, None)
+        else:
+            yield item, key
+            item = await anext(stored, None)
+            key = await anext(expected, None)
+
+
+async def _expected_blob_keys() -> AsyncIterator[str]:
+    """Keys of every blob and variant row, in key order (digest, then .br < .gz < .zst)"""
+    query = (
+        select(Blob.digest, BlobVariant.encoding)
+        .outerjoin(BlobVariant, BlobVariant.digest == Blob.digest)
+        .order_by(Blob.digest, BlobVariant.encoding)
+        .execution_options(yield_per=10000)
+    )
+    previous = None
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query)
+        async for digest, encoding in result:
+            if digest != previous:
+                previous = digest
+                yield blob_store.storage_key(digest)
+            if encoding is not None:
+                yield blob_store.variant_key(digest, encoding)
+
+
+async def _expected_legacy_keys() -> AsyncIterator[str]:
+    """Keys of files stored before content addressing (top-level UUID names), in key order"""
+    query = (
+        select(File.filename_saved).distinct()
+        .order_by(File.filename_saved)
+        .execution_options(yield_per=10000)
+    )
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query)
+        async for filename_saved in result.scalars():
+            if not blob_store.is_digest(filename_saved):
+                yield blob_store.storage_key(filename_saved)
+
+
+async def _expected_archive_keys() -> AsyncIterator[str]:
+    query = (
+        select(LogArchiveSegment.storage_key).distinct()
+        .order_by(LogArchiveSegment.storage_key)
+        .execution_options(yield_per=10000)
+    )
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query)
+        async for key in result.scalars():
+            yield key
+
+
+async def _top_level(stored: AsyncIterator[StoredObject]) -> AsyncIterator[StoredObject]:
+    """Skip dot-files: uploads, variants and archives still being written"""
+    async for item in stored:
+        if not item.key.startswith("."):
+            yield item
+
+
+async def _is_referenced(namespace: str, key: str) -> bool:
+    """Fresh database check for one key, right before it is quarantined"""
+    async with AsyncSessionLocal() as db:
+        if namespace == "blobs":
+            name = key.rsplit("/", 1)[-1]
+            digest, suffix = name[:64], name[64:]
+            if not suffix:
+                query = select(Blob.digest).where(Blob.digest == digest)
+            elif suffix in _SUFFIX_ENCODINGS:
+                query = select(BlobVariant.digest).where(
+                    BlobVariant.digest == digest, BlobVariant.encoding == _SUFFIX_ENCODINGS[suffix]
+                )
+            else:
+                return False
+        elif namespace == "legacy":
+            query = select(File.id).where(File.filename_saved == key)
+        else:
+            query = select(LogArchiveSegment.id).where(LogArchiveSegment.storage_key == key)
+        return (await db.execute(query.limit(1))).first() is not None
+
+
+class OrphanReconciler:
+    """
+    Periodically diffs the storage backend against the database
+    - Each namespace (blobs/, the log archive, legacy top-level files) is
+      listed in key order and merge-joined against the keys its tables
+      expect, streamed in the same order: memory stays flat for any count
+    - Orphans (stored, unreferenced, untouched for `grace_seconds`) are
+      re-checked, then moved under .quarantine/<date>/ and deleted for good
+      after `quarantine_days`; restore one by moving it back
+    - Missing keys (referenced, not stored) are counted and sampled in
+      stats() and the log; they are not repaired automatically
+    """
+
+    def __init__(self, interval_seconds: int, grace_seconds: int, quarantine_days: int):
+        self.interval = interval_seconds
+        self.grace = timedelta(seconds=grace_seconds)
+        self.quarantine_days = quarantine_days
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+        # Counters
+        self.runs = 0
+        self.failed_runs = 0
+        self.objects_scanned = 0
+        self.orphans_quarantined = 0
+        self.bytes_quarantined = 0
+        self.quarantine_purged = 0
+        self.last_missing = 0
+        self.missing_sample: list = []
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        if self.running or self.interval <= 0:
+            return
+        self._task = asyncio.create_task(self._run(), name="orphan-reconciler")
+
+    async def stop(self) -> None:
+        if not self.running:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def _namespaces(self) -> list:
+        archive_prefix = settings.LOG_ARCHIVE_PREFIX.strip("/") + "/"
+        return [
+            ("blobs", storage.list_objects(blob_store.BLOB_PREFIX + "/"), _expected_blob_keys()),
+            ("archive", storage.list_objects(archive_prefix), _expected_archive_keys()),
+            ("legacy", _top_level(storage.list_objects("", recursive=False)), _expected_legacy_keys()),
+        ]
+
+    async def run_once(self, dry_run: bool = False) -> dict:
+        """One full pass; with dry_run nothing is moved or deleted"""
+        async with self._lock:
+            try:
+                result = await self._reconcile(dry_run)
+            except Exception:
+                self.failed_runs += 1
+                raise
+        self.runs += 1
+        return result
+
+    async def _reconcile(self, dry_run: bool) -> dict:
+        now = datetime.utcnow()
+        quarantine = f"{QUARANTINE_PREFIX}/{now:%Y-%m-%d}/"
+        result = {"scanned": 0, "orphans": 0, "orphan_bytes": 0, "recent": 0, "missing": 0, "purged": 0}
+        missing_sample = []
+
+        for namespace, stored, expected in self._namespaces():
+            async for item, key in _merge(stored, expected):
+                if item is None:
+                    result["missing"] += 1
+                    if len(missing_sample) < MISSING_SAMPLE_SIZE:
+                        missing_sample.append(key)
+                    continue
+                result["scanned"] += 1
+                if key is not None:
+                    continue
+                if item.modified > now - self.grace:
+                    # Possibly written just before its row commits (uploads, archiving)
+                    result["recent"] += 1
+                    continue
+                if await _is_referenced(namespace, item.key):
+                    continue
+                result["orphans"] += 1
+                result["orphan_bytes"] += item.size
+                if not dry_run:
+                    try:
+                        await storage.move(item.key, quarantine + item.key)
+                    except FileNotFoundError:
+                        continue  # Removed meanwhile, e.g. by another worker's pass
+                    self.orphans_quarantined += 1
+                    self.bytes_quarantined += item.size
+                    logger.info("Quarantined orphan %s (%d bytes)", item.key, item.size)
+
+        self.objects_scanned += result["scanned"]
+        result["purged"] = await self._purge(now, dry_run)
+
+        self.last_missing = result["missing"]
+        self.missing_sample = missing_sample
+        if result["missing"]:
+            logger.warning(
+                "%d stored files referenced by the database are missing, e.g. %s",
+                result["missing"], ", ".join(missing_sample[:3]),
+            )
+        return result
+
+    async def _purge(self, now: datetime, dry_run: bool) -> int:
+        """Delete quarantined objects older than quarantine_days, judged by their date directory"""
+        cutoff = f"{now - timedelta(days=self.quarantine_days):%Y-%m-%d}"
+        purged = 0
+        async for item in storage.list_objects(QUARANTINE_PREFIX + "/"):
+            day = item.key.split("/", 2)[1]
+            if day >= cutoff:
+                continue
+            if not dry_run:
+                await storage.delete(item.key)
+                self.quarantine_purged += 1
+            purged += 1
+        return purged
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_once()
+            except Exception:
+                logger.exception("Storage reconciliation failed")
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "interval_seconds": self.interval,
+            "runs": self.runs,
+            "failed_runs": self.failed_runs,
+            "objects_scanned": self.objects_scanned,
+            "orphans_quarantined": self.orphans_quarantined,
+            "bytes_quarantined": self.bytes_quarantined,
+            "quarantine_purged": self.quarantine_purged,
+            "missing": self.last_missing,
+            "missing_sample": self.missing_sample,
+        }
+
+
+deletion_worker = DeletionWorker(
+    workers=settings.DELETION_WORKERS,
+    max_queue=settings.DELETION_QUEUE_SIZE,
+)
+
+orphan_reconciler = OrphanReconciler(
+    interval_seconds=settings.ORPHAN_RECONCILE_INTERVAL_SECONDS,
+    grace_seconds=settings.ORPHAN_GRACE_SECONDS,
+    quarantine_days=settings.ORPHAN_QUARANTINE_DAYS,
+)
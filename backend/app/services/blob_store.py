@@ -0,0 +1,114 @@
+import re
+from sqlalchemy import select, update, delete
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.blob import Blob
+from app.services.storage import storage
+from app.services.uploads import SpooledUpload, discard_upload
+
+_DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+
+BLOB_PREFIX = "blobs"
+
+# Content-Encoding -> suffix of precompressed variants stored next to a blob
+VARIANT_SUFFIXES = {"gzip": ".gz", "br": ".br", "zstd": ".zst"}
+
+
+def is_digest(filename_saved: str) -> bool:
+    """New rows store a SHA-256 digest; legacy rows a UUID filename"""
+    return bool(_DIGEST_RE.match(filename_saved))
+
+
+def storage_key(filename_saved: str) -> str:
+    """
+    Storage backend key of a file's bytes (a path relative to UPLOAD_DIR when local)
+    Blobs are sharded two levels deep (blobs/ab/cd/abcd...) to keep directories small
+    """
+    if is_digest(filename_saved):
+        return f"{BLOB_PREFIX}/{filename_saved[:2]}/{filename_saved[2:4]}/{filename_saved}"
+    return filename_saved
+
+
+def variant_key(digest: str, encoding: str) -> str:
+    """Storage key of a blob's precompressed variant (blobs/ab/cd/abcd....gz)"""
+    return storage_key(digest) + VARIANT_SUFFIXES[encoding]
+
+
+async def store(db: AsyncSession, spooled: SpooledUpload) -> str:
+    """
+    Add one reference to the blob holding a spooled upload's content
+    - The bytes are stored first, outside any write transaction: a PUT (a
+      network round trip on S3) must not hold SQLite's write lock. Keys are
+      digests, so concurrent or repeated puts of the same content are harmless
+    - Only then is the reference counted; the caller commits the session
+    - A new blob row is checked against storage before returning: a deletion
+      queued for the previous blob of this digest may have removed the bytes
+      since. Deletions run under the write lock (see unlink_if_unreferenced),
+      which the upsert now holds, so none can remove them before the commit
+    - If the caller rolls back, the stored bytes are left unreferenced and
+      the orphan reconciler quarantines them
+    Returns the digest
+    """
+    digest = spooled.content_hash
+    key = storage_key(digest)
+    try:
+        if not await storage.exists(key):
+            await storage.put_file(key, spooled.temp_path, content_sha256=digest, move=False)
+
+        result = await db.execute(
+            insert(Blob)
+            .values(digest=digest, size=spooled.size, ref_count=1)
+            .on_conflict_do_update(index_elements=[Blob.digest], set_={"ref_count": Blob.ref_count + 1})
+            .returning(Blob.ref_count)
+        )
+        if result.scalar_one() == 1 and not await storage.exists(key):
+            await storage.put_file(key, spooled.temp_path, content_sha256=digest, move=False)
+    finally:
+        await discard_upload(spooled)
+    return digest
+
+
+async def release(db: AsyncSession, filename_saved: str) -> bool:
+    """
+    Drop one reference to a file's bytes
+    Returns True if nothing references them any more, in which case the
+    caller should call unlink_if_unreferenced() after committing
+    """
+    if not is_digest(filename_saved):
+        # Legacy UUID files are never shared
+        return True
+    result = await db.execute(
+        update(Blob)
+        .where(Blob.digest == filename_saved)
+        .values(ref_count=Blob.ref_count - 1)
+        .returning(Blob.ref_count)
+    )
+    remaining = result.scalar_one_or_none()
+    if remaining is None or remaining <= 0:
+        await db.execute(delete(Blob).where(Blob.digest == filename_saved, Blob.ref_count <= 0))
+        return True
+    return False
+
+
+async def unlink_if_unreferenced(db: AsyncSession, filename_saved: str) -> None:
+    """
+    Remove a released file's bytes, and any precompressed variants, unless a
+    new reference appeared meanwhile
+    """
+    if not is_digest(filename_saved):
+        # Legacy UUID files are never shared
+        await storage.delete(storage_key(filename_saved))
+        return
+    # Check and delete under the write lock: an upload that counts a new
+    # reference waits for it, then finds the bytes gone and stores them again
+    conn = await db.connection()
+    await conn.exec_driver_sql("BEGIN IMMEDIATE")
+    try:
+        result = await db.execute(select(Blob.digest).where(Blob.digest == filename_saved))
+        if result.scalar_one_or_none() is not None:
+            return
+        for encoding in VARIANT_SUFFIXES:
+            await storage.delete(variant_key(filename_saved, encoding))
+        await storage.delete(storage_key(filename_saved))
+    finally:
+        await db.rollback()
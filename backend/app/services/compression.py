@@ -0,0 +1,296 @@
+import asyncio
+import logging
+import mimetypes
+import os
+import tempfile
+import zlib
+from pathlib import Path, PurePosixPath
+from typing import AsyncIterator, Optional
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.blob import Blob, BlobVariant
+from app.services import blob_store
+from app.services.storage import storage
+
+try:
+    import brotli
+except ImportError:  # Optional: br variants are skipped without it
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # Optional: zstd variants are skipped without it
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Text deliverables worth compressing; everything else is sent as stored
+COMPRESSIBLE_EXTENSIONS = {'.py', '.js', '.html', '.css', '.json', '.md', '.txt'}
+
+# Precomputed variants, best ratio first; this is also the server's preference
+# when the client accepts several equally
+_CODECS = {"br": brotli, "zstd": zstandard, "gzip": zlib}
+PRECOMPRESSED_ENCODINGS = [e for e in ("br", "zstd", "gzip") if _CODECS[e] is not None]
+
+# Compressed while streaming when no variant exists yet: fast codecs only
+STREAMING_ENCODINGS = [e for e in ("zstd", "gzip") if e in PRECOMPRESSED_ENCODINGS]
+
+# Levels for precomputed variants (done once, off the request path) and for streaming
+PRECOMPRESS_LEVELS = {"br": 11, "zstd": 19, "gzip": 9}
+STREAMING_LEVELS = {"br": 4, "zstd": 3, "gzip": 6}
+
+_STOP = object()
+
+
+class _Brotli:
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.finish()
+
+
+def new_compressor(encoding: str, level: int):
+    """Streaming compressor with compress(bytes) -> bytes and flush() -> bytes"""
+    if encoding == "gzip":
+        return zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    if encoding == "br":
+        return _Brotli(level)
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=level).compressobj()
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+def media_type_for(filename: str) -> str:
+    """Content-Type guessed from the original filename"""
+    media_type, _ = mimetypes.guess_type(filename)
+    if media_type is None:
+        return "application/octet-stream"
+    if media_type.startswith("text/") or media_type in ("application/json", "application/javascript"):
+        return f"{media_type}; charset=utf-8"
+    return media_type
+
+
+def is_compressible(filename: str, size: int) -> bool:
+    """Whether a file is a text deliverable within the configured size bounds"""
+    return (
+        settings.COMPRESSION_ENABLED
+        and settings.COMPRESSION_MIN_SIZE <= size <= settings.COMPRESSION_MAX_SIZE
+        and PurePosixPath(filename).suffix.lower() in COMPRESSIBLE_EXTENSIONS
+    )
+
+
+def negotiate(accept_encoding: Optional[str], offered: list) -> Optional[str]:
+    """
+    Pick a content coding from an Accept-Encoding header
+    - Highest q-value wins; ties go to the earliest entry in `offered`
+    - "*" covers codings the header does not name; q=0 excludes
+    - Returns None for identity
+    """
+    if not accept_encoding or not offered:
+        return None
+    weights = {}
+    for item in accept_encoding.split(","):
+        token, _, params = item.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[token] = q
+    wildcard = weights.get("*", 0.0)
+
+    best, best_q = None, 0.0
+    for encoding in offered:
+        q = weights.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """Distinct strong ETag per representation, as caches require"""
+    return f'{etag[:-1]}-{encoding}"'
+
+
+async def load_variants(db, filename_saved: str) -> dict:
+    """Encoding -> size of the precomputed variants of a file's blob"""
+    if not blob_store.is_digest(filename_saved):
+        return {}
+    result = await db.execute(
+        select(BlobVariant.encoding, BlobVariant.size).where(BlobVariant.digest == filename_saved)
+    )
+    return {encoding: size for encoding, size in result.all()}
+
+
+async def compress_stream(chunks: AsyncIterator[bytes], encoding: str) -> AsyncIterator[bytes]:
+    """Compress a byte stream on the fly; compression runs in the threadpool"""
+    compressor = new_compressor(encoding, STREAMING_LEVELS[encoding])
+    async for chunk in chunks:
+        data = await run_in_threadpool(compressor.compress, chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+class CompressionWorker:
+    """
+    Builds precompressed variants of newly uploaded text blobs
+    - Upload handlers enqueue after commit and return immediately
+    - One background task reads each blob once and feeds every codec
+    - A variant is kept only if it saves at least COMPRESSION_MIN_SAVING
+    - Jobs still queued at shutdown are dropped; downloads then compress on the fly
+    """
+
+    def __init__(self, max_queue: int):
+        self.max_queue = max_queue
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+        # Counters
+        self.enqueued = 0
+        self.dropped = 0
+        self.completed = 0
+        self.failed = 0
+        self.variants_written = 0
+        self.variants_skipped = 0
+        self.bytes_in = 0
+        self.variant_bytes = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._task = asyncio.create_task(self._run(), name="compression-worker")
+
+    async def stop(self) -> None:
+        """Finish the current job and stop"""
+        if not self.running:
+            return
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+
+    def enqueue(self, filename_saved: str, filename_original: str, size: int) -> bool:
+        """Queue variant generation for a stored file; False if not applicable or dropped"""
+        if not self.running or not blob_store.is_digest(filename_saved):
+            return False
+        if not is_compressible(filename_original, size):
+            return False
+        try:
+            self._queue.put_nowait((filename_saved, size))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+        self.enqueued += 1
+        return True
+
+    async def _run(self) -> None:
+        while True:
+            item = await self._queue.get()
+            if item is _STOP:
+                break
+            digest, size = item
+            try:
+                await self._build_variants(digest, size)
+                self.completed += 1
+            except Exception:
+                self.failed += 1
+                logger.exception("Building compressed variants of %s failed", digest)
+
+    @staticmethod
+    def _feed(compressors: dict, files: dict, chunk: bytes, final: bool = False) -> None:
+        for encoding, compressor in compressors.items():
+            data = compressor.flush() if final else compressor.compress(chunk)
+            if data:
+                files[encoding].write(data)
+
+    @staticmethod
+    def _open_temp() -> tempfile.NamedTemporaryFile:
+        return tempfile.NamedTemporaryFile(
+            dir=settings.UPLOAD_DIR, prefix=".variant-", suffix=".part", delete=False
+        )
+
+    async def _build_variants(self, digest: str, size: int) -> None:
+        async with AsyncSessionLocal() as db:
+            existing = await db.execute(select(BlobVariant.encoding).where(BlobVariant.digest == digest))
+            encodings = [e for e in PRECOMPRESSED_ENCODINGS if e not in set(existing.scalars().all())]
+        if not encodings:
+            return
+
+        compressors = {e: new_compressor(e, PRECOMPRESS_LEVELS[e]) for e in encodings}
+        files = {e: await run_in_threadpool(self._open_temp) for e in encodings}
+        try:
+            async for chunk in storage.open_stream(blob_store.storage_key(digest), chunk_size=settings.UPLOAD_CHUNK_SIZE):
+                await run_in_threadpool(self._feed, compressors, files, chunk)
+            await run_in_threadpool(self._feed, compressors, files, b"", True)
+            for fh in files.values():
+                await run_in_threadpool(fh.close)
+
+            self.bytes_in += size
+            for encoding, fh in files.items():
+                path = Path(fh.name)
+                variant_size = path.stat().st_size
+                if variant_size > size * (1 - settings.COMPRESSION_MIN_SAVING):
+                    self.variants_skipped += 1
+                    continue
+                await storage.put_file(blob_store.variant_key(digest, encoding), path)
+                try:
+                    async with AsyncSessionLocal() as db:
+                        db.add(BlobVariant(digest=digest, encoding=encoding, size=variant_size))
+                        await db.commit()
+                except IntegrityError:
+                    # Built twice (keep the file), or the blob was deleted meanwhile
+                    async with AsyncSessionLocal() as db:
+                        blob = await db.execute(select(Blob.digest).where(Blob.digest == digest))
+                        if blob.scalar_one_or_none() is None:
+                            await storage.delete(blob_store.variant_key(digest, encoding))
+                    continue
+                self.variants_written += 1
+                self.variant_bytes += variant_size
+        finally:
+            for fh in files.values():
+                await run_in_threadpool(fh.close)
+                try:
+                    await run_in_threadpool(os.unlink, fh.name)
+                except FileNotFoundError:
+                    pass
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "encodings": PRECOMPRESSED_ENCODINGS,
+            "queue_depth": self.depth(),
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "completed": self.completed,
+            "failed": self.failed,
+            "variants_written": self.variants_written,
+            "variants_skipped": self.variants_skipped,
+            "bytes_in": self.bytes_in,
+            "variant_bytes": self.variant_bytes,
+        }
+
+
+compression_worker = CompressionWorker(max_queue=settings.COMPRESSION_QUEUE_SIZE)
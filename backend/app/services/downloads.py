@@ -0,0 +1,339 @@
+import hashlib
+import os
+import uuid
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from pathlib import Path
+from typing import Optional
+from urllib.parse import quote
+from fastapi import HTTPException, Request, status
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+# Requests asking for more (merged) ranges than this get the whole file instead
+MAX_RANGES = 16
+
+
+class RangeNotSatisfiable(HTTPException):
+    """416 with the Content-Range header required by RFC 9110"""
+
+    def __init__(self, size: int):
+        super().__init__(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+
+
+def make_etag(content_hash: Optional[str], filename_saved: str, file_size: int, uploaded_at: datetime) -> str:
+    """
+    Strong ETag derived from stored file metadata
+    Uses the content digest when known, otherwise the immutable storage name and size
+    """
+    if content_hash:
+        return f'"{content_hash[:32]}"'
+    basis = f"{filename_saved}:{file_size}:{uploaded_at.isoformat()}"
+    return f'"{hashlib.sha256(basis.encode()).hexdigest()[:32]}"'
+
+
+def http_date(value: datetime) -> str:
+    """Format a naive UTC datetime as an HTTP-date"""
+    return format_datetime(value.replace(tzinfo=timezone.utc, microsecond=0), usegmt=True)
+
+
+def content_disposition(filename: str) -> str:
+    """attachment header that survives non-ASCII filenames (RFC 6266)"""
+    fallback = filename.encode("ascii", "replace").decode("ascii").replace('"', "_")
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename)}"
+
+
+def _etag_matches(header: str, etag: str, weak: bool) -> bool:
+    if header.strip() == "*":
+        return True
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if weak and candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def if_none_match(request: Request, etag: str) -> bool:
+    """Whether If-None-Match matches `etag` (weak comparison, for 304s)"""
+    header = request.headers.get("if-none-match")
+    return header is not None and _etag_matches(header, etag, weak=True)
+
+
+def is_not_modified(request: Request, etag: str, last_modified: datetime) -> bool:
+    """
+    Evaluate If-None-Match / If-Modified-Since
+    If-None-Match takes precedence, as required by RFC 9110
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag, weak=True)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        modified = last_modified.replace(tzinfo=timezone.utc, microsecond=0)
+        return modified <= since
+
+    return False
+
+
+def parse_range_header(request: Request, size: int, etag: str, last_modified: datetime) -> Optional[list]:
+    """
+    Parse the Range header into a sorted list of inclusive (start, end) tuples
+    Returns None when the whole file should be sent
+    Raises RangeNotSatisfiable when no requested range overlaps the file
+    """
+    header = request.headers.get("range")
+    if not header or request.method not in ("GET", "HEAD"):
+        return None
+
+    # A stale If-Range means the client's partial copy is outdated: send everything
+    if_range = request.headers.get("if-range")
+    if if_range:
+        if if_range.startswith('"') or if_range.startswith("W/"):
+            if if_range != etag:
+                return None
+        elif if_range != http_date(last_modified):
+            return None
+
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or not spec:
+        return None
+
+    ranges = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        first, sep, last = part.partition("-")
+        if not sep:
+            return None
+        try:
+            if first == "":
+                # Suffix range: the last N bytes
+                length = int(last)
+                if length <= 0:
+                    continue
+                start, end = max(0, size - length), size - 1
+            else:
+                start = int(first)
+                end = int(last) if last else size - 1
+        except ValueError:
+            return None
+        if start >= size:
+            continue
+        if start < 0 or end < start:
+            return None
+        ranges.append((start, min(end, size - 1)))
+
+    if not ranges:
+        raise RangeNotSatisfiable(size)
+
+    # Merge overlapping and adjacent ranges
+    ranges.sort()
+    merged = [ranges[0]]
+    for start, end in ranges[1:]:
+        last_start, last_end = merged[-1]
+        if start <= last_end + 1:
+            merged[-1] = (last_start, max(last_end, end))
+        else:
+            merged.append((start, end))
+
+    if len(merged) > MAX_RANGES or merged == [(0, size - 1)]:
+        return None
+    return merged
+
+
+def covers_end(ranges: Optional[list], size: int) -> bool:
+    """
+    Whether a response delivers the final byte of the file
+    Used to log one download per logical transfer rather than per range request
+    """
+    if ranges is None:
+        return True
+    return ranges[-1][1] >= size - 1
+
+
+class FileRangeResponse(Response):
+    """
+    Serve a file, or byte ranges of it
+    - Uses the ASGI zerocopysend extension (sendfile) when the server offers it
+    - Otherwise sends fixed-size chunks read with pread in the threadpool
+    - No ranges: 200 with the full body
+    - One range: 206 with Content-Range
+    - Several ranges: 206 multipart/byteranges
+    Content-Length is always exact
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        size: int,
+        ranges: Optional[list] = None,
+        headers: Optional[dict] = None,
+        media_type: str = "application/octet-stream",
+        chunk_size: int = 1024 * 1024,
+    ):
+        self.path = path
+        self.size = size
+        self.ranges = ranges
+        self.chunk_size = chunk_size
+        self.background = None
+        self.part_media_type = media_type
+        self.status_code = status.HTTP_200_OK if ranges is None else status.HTTP_206_PARTIAL_CONTENT
+
+        headers = dict(headers or {})
+        headers["Accept-Ranges"] = "bytes"
+        self.boundary = None
+        self.part_headers = []
+
+        if ranges is None:
+            content_length = size
+        elif len(ranges) == 1:
+            start, end = ranges[0]
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+            content_length = end - start + 1
+        else:
+            self.boundary = uuid.uuid4().hex
+            media_type = f"multipart/byteranges; boundary={self.boundary}"
+            content_length = 0
+            for index, (start, end) in enumerate(ranges):
+                part_header = (
+                    ("" if index == 0 else "\r\n")
+                    + f"--{self.boundary}\r\n"
+                    + f"Content-Type: {self.part_media_type}\r\n"
+                    + f"Content-Range: bytes {start}-{end}/{size}\r\n\r\n"
+                ).encode("latin-1")
+                self.part_headers.append(part_header)
+                content_length += len(part_header) + end - start + 1
+            self.closing = f"\r\n--{self.boundary}--\r\n".encode("latin-1")
+            content_length += len(self.closing)
+
+        headers["Content-Length"] = str(content_length)
+        headers["Content-Type"] = media_type
+        self.media_type = media_type
+        self.init_headers(headers)
+
+    async def _send_segment(self, send: Send, fh, start: int, end: int, zerocopy: bool) -> None:
+        if end < start:
+            return
+        if zerocopy:
+            # The server pushes the bytes with sendfile(2); they never enter Python
+            await send({
+                "type": "http.response.zerocopysend",
+                "file": fh,
+                "offset": start,
+                "count": end - start + 1,
+                "more_body": True,
+            })
+            return
+        fd = fh.fileno()
+        offset = start
+        while offset <= end:
+            # pread keeps it to one threadpool hop per chunk (no separate seek)
+            chunk = await run_in_threadpool(os.pread, fd, min(self.chunk_size, end - offset + 1), offset)
+            if not chunk:
+                break
+            offset += len(chunk)
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+
+    async def _write_ranges(self, send: Send, send_segment) -> None:
+        """Emit the selected ranges, with multipart framing when there are several"""
+        if self.ranges is None:
+            await send_segment(0, self.size - 1)
+        elif self.boundary is None:
+            await send_segment(*self.ranges[0])
+        else:
+            for part_header, (start, end) in zip(self.part_headers, self.ranges):
+                await send({"type": "http.response.body", "body": part_header, "more_body": True})
+                await send_segment(start, end)
+            await send({"type": "http.response.body", "body": self.closing, "more_body": True})
+
+    async def send_body(self, scope: Scope, send: Send) -> None:
+        zerocopy = "http.response.zerocopysend" in scope.get("extensions", {})
+        fh = await run_in_threadpool(open, self.path, "rb")
+        try:
+            await self._write_ranges(
+                send, lambda start, end: self._send_segment(send, fh, start, end, zerocopy)
+            )
+        finally:
+            await run_in_threadpool(fh.close)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers,
+        })
+
+        if scope.get("method") == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        else:
+            await self.send_body(scope, send)
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+        if self.background is not None:
+            await self.background()
+
+
+class StorageRangeResponse(FileRangeResponse):
+    """
+    FileRangeResponse whose bytes come from a storage backend without a local path
+    Each range is one streamed read from the backend
+    """
+
+    def __init__(self, backend, key: str, size: int, **kwargs):
+        super().__init__(None, size, **kwargs)
+        self.backend = backend
+        self.key = key
+
+    async def send_body(self, scope: Scope, send: Send) -> None:
+        async def send_segment(start: int, end: int) -> None:
+            if end < start:
+                return
+            async for chunk in self.backend.open_stream(self.key, start, end, self.chunk_size):
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+
+        await self._write_ranges(send, send_segment)
+
+
+class OffloadResponse(Response):
+    """
+    Empty response whose body the reverse proxy supplies from the file
+    Starlette would add "Content-Length: 0", contradicting the entity the proxy
+    sends; the proxy sets the real length itself, so none is declared here
+    (a non-zero one with no body would make the ASGI server abort the response)
+    """
+
+    def init_headers(self, headers=None) -> None:
+        super().init_headers(headers)
+        self.raw_headers = [(name, value) for name, value in self.raw_headers if name != b"content-length"]
+
+
+def offload_response(mode: str, storage_name: str, prefix: str, directory: Path, headers: dict) -> Response:
+    """
+    Hand the transfer over to the reverse proxy
+    - x-accel-redirect: nginx internal location, `prefix` + storage name
+    - x-sendfile: Apache / lighttpd, absolute path on disk
+    The proxy handles Range and Content-Length itself; our ETag and
+    Content-Disposition pass through
+    """
+    headers = dict(headers)
+    if mode == "x-accel-redirect":
+        headers["X-Accel-Redirect"] = prefix.rstrip("/") + "/" + quote(storage_name)
+        headers["X-Accel-Buffering"] = "no"
+    else:
+        headers["X-Sendfile"] = str((directory / storage_name).resolve())
+    return OffloadResponse(status_code=status.HTTP_200_OK, headers=headers, media_type="application/octet-stream")
@@ -0,0 +1,228 @@
+import asyncio
+import logging
+import os
+import shutil
+import time
+from datetime import datetime
+from typing import Optional
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.core.security import password_hasher
+from app.db.session import engine
+from app.services.access_log import access_log_writer
+from app.services.compression import compression_worker
+from app.services.blob_gc import deletion_worker
+
+logger = logging.getLogger(__name__)
+
+
+class HealthMonitor:
+    """
+    Liveness and readiness for this worker process
+    - Liveness: the event loop answers; reports the measured loop lag
+    - Readiness: database round trip, write-lock availability, free space and
+      inodes in UPLOAD_DIR (plus a probe write), background queue backlog and
+      the worst loop lag since the previous check, each against a threshold
+    - Readiness results are cached for `cache_seconds`, and concurrent probes
+      share one evaluation, so frequent polling costs one check per period
+    """
+
+    def __init__(
+        self,
+        cache_seconds: float,
+        db_timeout_ms: int,
+        min_free_disk_mb: int,
+        min_free_inodes_percent: float,
+        max_queue_fill: float,
+        lag_interval_ms: int,
+        max_loop_lag_ms: int,
+    ):
+        self.cache_seconds = cache_seconds
+        self.db_timeout = db_timeout_ms / 1000
+        self.min_free_disk = min_free_disk_mb * 1024 * 1024
+        self.min_free_inodes_percent = min_free_inodes_percent
+        self.max_queue_fill = max_queue_fill
+        self.lag_interval = lag_interval_ms / 1000
+        self.max_loop_lag = max_loop_lag_ms / 1000
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self._cached: Optional[dict] = None
+        self._cached_at = 0.0
+
+        # Event loop lag, in seconds
+        self.loop_lag = 0.0
+        self._peak_lag = 0.0
+
+        # Counters
+        self.evaluations = 0
+        self.failed_evaluations = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        if self.running or self.lag_interval <= 0:
+            return
+        self._task = asyncio.create_task(self._run(), name="loop-lag-monitor")
+
+    async def stop(self) -> None:
+        if not self.running:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        # A sleep that wakes late means something held the loop that long
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.lag_interval)
+            self.loop_lag = max(0.0, time.perf_counter() - start - self.lag_interval)
+            self._peak_lag = max(self._peak_lag, self.loop_lag)
+
+    def liveness(self) -> dict:
+        return {
+            "status": "alive",
+            "loop_lag_ms": round(self.loop_lag * 1000, 1),
+        }
+
+    async def readiness(self) -> dict:
+        if self._cached is not None and time.monotonic() - self._cached_at < self.cache_seconds:
+            return self._cached
+        async with self._lock:
+            # Another probe may have refreshed the result while we waited
+            if self._cached is not None and time.monotonic() - self._cached_at < self.cache_seconds:
+                return self._cached
+            self._cached = await self._evaluate()
+            self._cached_at = time.monotonic()
+            return self._cached
+
+    async def _evaluate(self) -> dict:
+        names = ("database", "write_lock", "disk", "queues", "event_loop")
+        results = await asyncio.gather(
+            self._check(self._check_database, self.db_timeout * 2),
+            self._check(self._check_write_lock, self.db_timeout * 2),
+            self._check(self._check_disk, self.db_timeout * 5),
+            self._check(self._check_queues),
+            self._check(self._check_event_loop),
+        )
+        checks = dict(zip(names, results))
+        ready = all(check["ok"] for check in checks.values())
+        self.evaluations += 1
+        if not ready:
+            self.failed_evaluations += 1
+            logger.warning("Readiness check failed: %s", ", ".join(n for n, c in checks.items() if not c["ok"]))
+        return {
+            "status": "ready" if ready else "not_ready",
+            "checked_at": datetime.utcnow().isoformat(),
+            "checks": checks,
+        }
+
+    @staticmethod
+    async def _check(probe, timeout: Optional[float] = None) -> dict:
+        """Run one probe; a probe returns (ok, details) and may raise"""
+        start = time.perf_counter()
+        try:
+            ok, details = await asyncio.wait_for(probe(), timeout)
+        except asyncio.TimeoutError:
+            ok, details = False, {"error": f"timed out after {timeout:g}s"}
+        except Exception as exc:
+            first_line = str(exc).partition("\n")[0]  # SQLAlchemy appends the SQL and a docs link
+            ok, details = False, {"error": f"{type(exc).__name__}: {first_line}"}
+        return {"ok": ok, "latency_ms": round((time.perf_counter() - start) * 1000, 2), **details}
+
+    async def _check_database(self) -> tuple:
+        start = time.perf_counter()
+        async with engine.connect() as conn:
+            await conn.exec_driver_sql("SELECT 1")
+        elapsed = time.perf_counter() - start
+        return elapsed <= self.db_timeout, {"round_trip_ms": round(elapsed * 1000, 2)}
+
+    async def _check_write_lock(self) -> tuple:
+        """Take and release SQLite's write lock, waiting at most db_timeout"""
+        async with engine.connect() as conn:
+            await conn.exec_driver_sql(f"PRAGMA busy_timeout={int(self.db_timeout * 1000)}")
+            try:
+                start = time.perf_counter()
+                await conn.exec_driver_sql("BEGIN IMMEDIATE")
+                elapsed = time.perf_counter() - start
+                await conn.rollback()
+            finally:
+                await conn.exec_driver_sql(f"PRAGMA busy_timeout={int(settings.DB_BUSY_TIMEOUT_MS)}")
+        return True, {"wait_ms": round(elapsed * 1000, 2)}
+
+    async def _check_disk(self) -> tuple:
+        return await run_in_threadpool(self._disk_status, settings.UPLOAD_DIR)
+
+    def _disk_status(self, path: str) -> tuple:
+        usage = shutil.disk_usage(path)
+        details = {"free_bytes": usage.free, "free_percent": round(100 * usage.free / usage.total, 2)}
+        ok = usage.free >= self.min_free_disk
+
+        vfs = os.statvfs(path)
+        if vfs.f_files:  # 0 on filesystems without a fixed inode table
+            details["free_inodes_percent"] = round(100 * vfs.f_favail / vfs.f_files, 2)
+            ok = ok and details["free_inodes_percent"] >= self.min_free_inodes_percent
+
+        probe = os.path.join(path, f".health-{os.getpid()}")
+        try:
+            with open(probe, "wb") as fh:
+                fh.write(b"ok")
+            details["writable"] = True
+        except OSError as exc:
+            details["writable"] = False
+            details["error"] = str(exc)
+            ok = False
+        finally:
+            try:
+                os.unlink(probe)
+            except OSError:
+                pass
+        return ok, details
+
+    async def _check_queues(self) -> tuple:
+        queues = {
+            "access_log": (access_log_writer.depth(), access_log_writer.max_queue),
+            "compression": (compression_worker.depth(), compression_worker.max_queue),
+            "deletion": (deletion_worker.depth(), deletion_worker.max_queue),
+            "password_hash": (password_hasher.pending, password_hasher.queue_limit),
+        }
+        details = {}
+        ok = True
+        for name, (depth, capacity) in queues.items():
+            details[name] = {"depth": depth, "capacity": capacity}
+            if capacity and depth >= capacity * self.max_queue_fill:
+                ok = False
+        return ok, details
+
+    async def _check_event_loop(self) -> tuple:
+        peak, self._peak_lag = self._peak_lag, self.loop_lag
+        return peak <= self.max_loop_lag, {
+            "lag_ms": round(self.loop_lag * 1000, 1),
+            "peak_lag_ms": round(peak * 1000, 1),
+            "monitored": self.running,
+        }
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "loop_lag_ms": round(self.loop_lag * 1000, 1),
+            "evaluations": self.evaluations,
+            "failed_evaluations": self.failed_evaluations,
+            "last_status": self._cached["status"] if self._cached else None,
+        }
+
+
+health_monitor = HealthMonitor(
+    cache_seconds=settings.HEALTH_CACHE_SECONDS,
+    db_timeout_ms=settings.HEALTH_DB_TIMEOUT_MS,
+    min_free_disk_mb=settings.HEALTH_MIN_FREE_DISK_MB,
+    min_free_inodes_percent=settings.HEALTH_MIN_FREE_INODES_PERCENT,
+    max_queue_fill=settings.HEALTH_MAX_QUEUE_FILL,
+    lag_interval_ms=settings.HEALTH_LOOP_LAG_INTERVAL_MS,
+    max_loop_lag_ms=settings.HEALTH_MAX_LOOP_LAG_MS,
+)
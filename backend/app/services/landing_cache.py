@@ -0,0 +1,91 @@
+import hashlib
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.cache import CacheBackend, MISSING, cache
+from app.core.config import settings
+from app.models.order import Order
+from app.models.file import File
+from app.schemas.client import ClientLandingResponse
+from app.schemas.file import FileResponse
+from app.schemas.order import OrderResponse
+
+
+class LandingCache:
+    """
+    Serialized client landing payloads (order + file list) keyed by access key
+    - Built from one joined query, then served byte-for-byte with a fixed ETag
+    - Entries hold the order's id and expiry so callers can still check them
+    - Invalidate whenever the order or any of its files changes
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(access_key: str) -> str:
+        return f"landing:{access_key}"
+
+    async def _build(self, db: AsyncSession, access_key: str) -> Optional[dict]:
+        result = await db.execute(
+            select(Order, File)
+            .outerjoin(File, File.order_id == Order.id)
+            .where(Order.access_key == access_key)
+            .order_by(File.uploaded_at.desc(), File.id.desc())
+        )
+        rows = result.all()
+        if not rows:
+            return None
+
+        order = rows[0][0]
+        body = ClientLandingResponse(
+            order=OrderResponse.model_validate(order),
+            files=[FileResponse.model_validate(f) for _, f in rows if f is not None],
+        ).model_dump_json()
+        return {
+            "order_id": order.id,
+            "expires_at": order.expires_at.isoformat() if order.expires_at else None,
+            "etag": f'"{hashlib.sha256(body.encode()).hexdigest()[:32]}"',
+            "body": body,
+        }
+
+    async def get(self, db: AsyncSession, access_key: str) -> Optional[dict]:
+        """
+        Landing entry for an access key, or None if there is no such order
+        Keys: order_id, expires_at (datetime or None), etag, body (JSON text)
+        """
+        entry = await self.backend.get(self._key(access_key))
+        if entry is not MISSING:
+            self.hits += 1
+        else:
+            self.misses += 1
+            entry = await self._build(db, access_key)
+            if entry is None:
+                return None
+            await self.backend.set(self._key(access_key), entry, self.ttl)
+
+        entry = dict(entry)
+        if entry["expires_at"] is not None:
+            entry["expires_at"] = datetime.fromisoformat(entry["expires_at"])
+        return entry
+
+    async def invalidate(self, access_key: str) -> None:
+        await self.backend.delete(self._key(access_key))
+
+    async def invalidate_many(self, access_keys: list) -> None:
+        await self.backend.delete(*[self._key(access_key) for access_key in access_keys])
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+landing_cache = LandingCache(cache, ttl=settings.LANDING_CACHE_TTL_SECONDS)
@@ -0,0 +1,470 @@
+import asyncio
+import gzip
+import json
+import logging
+import os
+import tempfile
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import AsyncIterator, Optional
+from sqlalchemy import select, delete, func, tuple_, String, type_coerce
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from app.core.cache import cache
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal, engine
+from app.models.log import AccessLog
+from app.models.log_archive import LogArchiveSegment
+from app.services.order_stats import VISIT_ACTIONS, DOWNLOAD_ACTIONS
+from app.services.storage import storage
+
+logger = logging.getLogger(__name__)
+
+# Field order of archived NDJSON records (the same as log exports)
+FIELDS = ["id", "order_id", "timestamp", "action_type", "ip_address", "user_agent", "target_file"]
+
+AUTO_VACUUM_MODES = {0: "none", 1: "full", 2: "incremental"}
+
+
+def month_start(timestamp: datetime) -> datetime:
+    """Start of the UTC month a timestamp falls into; archives are partitioned by it"""
+    return timestamp.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def next_month(month: datetime) -> datetime:
+    return (month + timedelta(days=32)).replace(day=1)
+
+
+def _encode_segment(rows: list) -> tuple:
+    """
+    One gzip member holding `rows` (oldest first, timestamps as stored text) as
+    NDJSON, plus the catalog fields describing it
+    """
+    lines = []
+    visits = downloads = 0
+    for row in rows:
+        record = dict(zip(FIELDS, row))
+        record["timestamp"] = record["timestamp"].replace(" ", "T", 1)
+        if record["action_type"] in VISIT_ACTIONS:
+            visits += 1
+        elif record["action_type"] in DOWNLOAD_ACTIONS:
+            downloads += 1
+        lines.append(json.dumps(record, ensure_ascii=False))
+    member = gzip.compress(("\n".join(lines) + "\n").encode("utf-8"), compresslevel=6, mtime=0)
+    first, last = rows[0], rows[-1]
+    return member, {
+        "row_count": len(rows),
+        "visit_count": visits,
+        "download_count": downloads,
+        "first_timestamp": datetime.fromisoformat(first[2]),
+        "first_id": first[0],
+        "last_timestamp": datetime.fromisoformat(last[2]),
+        "last_id": last[0],
+        "max_id": max(row[0] for row in rows),
+    }
+
+
+def _decode_segment(data: bytes) -> list:
+    records = []
+    for line in gzip.decompress(data).splitlines():
+        record = json.loads(line)
+        record["timestamp"] = datetime.fromisoformat(record["timestamp"])
+        records.append(record)
+    return records
+
+
+async def read_segment(segment: LogArchiveSegment) -> list:
+    """Rows of one archive segment as dicts, oldest first; a single ranged read"""
+    chunks = [
+        chunk async for chunk in storage.open_stream(
+            segment.storage_key, start=segment.offset, end=segment.offset + segment.length - 1
+        )
+    ]
+    return await run_in_threadpool(_decode_segment, b"".join(chunks))
+
+
+def _position(record: dict) -> tuple:
+    return record["timestamp"], record["id"]
+
+
+async def read_page(db: AsyncSession, order_id: int, before: Optional[tuple], skip: int, limit: int) -> list:
+    """
+    One page of an order's archived logs, newest first, as detached AccessLog objects
+    - `before` is a (timestamp, id) keyset position, as in get_order_logs
+    - Segments entirely past `skip` are skipped by their catalog row counts;
+      only the segments the page overlaps are fetched and decompressed
+    """
+    query = (
+        select(LogArchiveSegment)
+        .where(LogArchiveSegment.order_id == order_id)
+        .order_by(LogArchiveSegment.last_timestamp.desc(), LogArchiveSegment.last_id.desc())
+    )
+    if before:
+        query = query.where(tuple_(LogArchiveSegment.first_timestamp, LogArchiveSegment.first_id) < before)
+    segments = (await db.execute(query)).scalars().all()
+
+    # Segments normally do not overlap; late rows archived in a later run can
+    # make them, and such segments are merged instead of skipped
+    index = 0
+    while (
+        index < len(segments) and skip >= segments[index].row_count
+        and (index + 1 == len(segments) or (segments[index].first_timestamp, segments[index].first_id)
+             > (segments[index + 1].last_timestamp, segments[index + 1].last_id))
+    ):
+        skip -= segments[index].row_count
+        index += 1
+
+    wanted = skip + limit
+    records = []
+    for segment in segments[index:]:
+        if len(records) >= wanted and _position(records[wanted - 1]) > (segment.last_timestamp, segment.last_id):
+            break
+        for record in await read_segment(segment):
+            if before is None or _position(record) < before:
+                records.append(record)
+        records.sort(key=_position, reverse=True)
+
+    return [AccessLog(**record) for record in records[skip:wanted]]
+
+
+async def archived_count(db: AsyncSession, order_id: int) -> int:
+    result = await db.execute(
+        select(func.coalesce(func.sum(LogArchiveSegment.row_count), 0))
+        .where(LogArchiveSegment.order_id == order_id)
+    )
+    return result.scalar_one()
+
+
+async def list_segments(
+    db: AsyncSession, order_id: int, start: Optional[datetime] = None, end: Optional[datetime] = None
+) -> list:
+    """An order's archive segments overlapping [start, end), oldest first"""
+    query = select(LogArchiveSegment).where(LogArchiveSegment.order_id == order_id)
+    if start:
+        query = query.where(LogArchiveSegment.last_timestamp >= start)
+    if end:
+        query = query.where(LogArchiveSegment.first_timestamp < end)
+    query = query.order_by(LogArchiveSegment.first_timestamp, LogArchiveSegment.first_id)
+    return (await db.execute(query)).scalars().all()
+
+
+async def iter_segment_rows(
+    segments: list, start: Optional[datetime] = None, end: Optional[datetime] = None
+) -> AsyncIterator[list]:
+    """
+    Rows of the given segments (as from list_segments), oldest first, filtered
+    to [start, end); one list per segment, or per run of overlapping segments
+    """
+    index = 0
+    while index < len(segments):
+        group = [segments[index]]
+        last = (segments[index].last_timestamp, segments[index].last_id)
+        index += 1
+        while index < len(segments) and (segments[index].first_timestamp, segments[index].first_id) < last:
+            group.append(segments[index])
+            last = max(last, (segments[index].last_timestamp, segments[index].last_id))
+            index += 1
+
+        records = []
+        for segment in group:
+            records += await read_segment(segment)
+        if len(group) > 1:
+            records.sort(key=_position)
+        if start or end:
+            records = [
+                record for record in records
+                if (start is None or record["timestamp"] >= start) and (end is None or record["timestamp"] < end)
+            ]
+        if records:
+            yield records
+
+
+async def database_stats() -> dict:
+    """Size of the SQLite file, its free pages and WAL, and what has been archived out of it"""
+    async with engine.connect() as conn:
+        page_size = (await conn.exec_driver_sql("PRAGMA page_size")).scalar()
+        page_count = (await conn.exec_driver_sql("PRAGMA page_count")).scalar()
+        freelist_count = (await conn.exec_driver_sql("PRAGMA freelist_count")).scalar()
+        auto_vacuum = (await conn.exec_driver_sql("PRAGMA auto_vacuum")).scalar()
+        oldest_log = (await conn.execute(select(func.min(AccessLog.timestamp)))).scalar()
+        segments, rows, size = (await conn.execute(
+            select(
+                func.count(),
+                func.coalesce(func.sum(LogArchiveSegment.row_count), 0),
+                func.coalesce(func.sum(LogArchiveSegment.length), 0),
+            )
+        )).one()
+
+    wal_bytes = None
+    database = make_url(settings.SQLITE_URL).database
+    if database and database != ":memory:":
+        try:
+            wal_bytes = os.path.getsize(f"{database}-wal")
+        except FileNotFoundError:
+            wal_bytes = 0
+
+    return {
+        "file_bytes": page_size * page_count,
+        "free_bytes": page_size * freelist_count,
+        "wal_bytes": wal_bytes,
+        "auto_vacuum": AUTO_VACUUM_MODES.get(auto_vacuum, auto_vacuum),
+        "oldest_hot_log": oldest_log,
+        "archive": {"segments": segments, "rows": rows, "bytes": size},
+    }
+
+
+class LogArchiver:
+    """
+    Moves access_logs rows older than the retention period into archive files
+    - Partitioned by UTC month: each run archives every whole month older than
+      `retention_days` into one gzip NDJSON file in the storage backend, one
+      gzip member per `segment_rows` rows of an order, catalogued in
+      log_archive_segments
+    - Each segment is committed (catalog row in, its rows out) in its own short
+      transaction, so log flushes are never blocked for long and a failure
+      leaves every row either hot or archived, never both
+    - Afterwards the freed pages are returned to the filesystem with
+      incremental vacuum, a step at a time
+    """
+
+    def __init__(self, retention_days: int, interval_seconds: int, segment_rows: int, vacuum_step_pages: int):
+        self.retention_days = retention_days
+        self.interval = interval_seconds
+        self.segment_rows = segment_rows
+        self.vacuum_step_pages = vacuum_step_pages
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self._warned_auto_vacuum = False
+
+        # Counters
+        self.runs = 0
+        self.failed_runs = 0
+        self.months_archived = 0
+        self.segments_written = 0
+        self.segments_skipped = 0
+        self.rows_archived = 0
+        self.bytes_written = 0
+        self.pages_vacuumed = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.retention_days > 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        if self.running or not self.enabled or self.interval <= 0:
+            return
+        self._task = asyncio.create_task(self._run(), name="log-archiver")
+
+    async def stop(self) -> None:
+        if not self.running:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def cutoff(self, now: Optional[datetime] = None) -> datetime:
+        """Months starting before this are archived: rows stay hot for at least retention_days"""
+        return month_start((now or datetime.utcnow()) - timedelta(days=self.retention_days))
+
+    async def run_once(self) -> dict:
+        """Archive every month past retention, then vacuum the space it freed"""
+        async with self._lock:
+            try:
+                result = {"months": [], "rows": 0, "segments": 0}
+                if self.enabled:
+                    cutoff = self.cutoff()
+                    async with AsyncSessionLocal() as db:
+                        oldest = (await db.execute(select(func.min(AccessLog.timestamp)))).scalar()
+                    month = month_start(oldest) if oldest else cutoff
+                    while month < cutoff:
+                        archived = await self.archive_month(month)
+                        if archived["rows"]:
+                            result["months"].append(f"{month:%Y-%m}")
+                            result["rows"] += archived["rows"]
+                            result["segments"] += archived["segments"]
+                        month = next_month(month)
+                result["pages_vacuumed"] = await self.vacuum()
+            except Exception:
+                self.failed_runs += 1
+                raise
+        self.runs += 1
+        if result["rows"]:
+            logger.info("Archived %d access log rows from %s", result["rows"], ", ".join(result["months"]))
+        return result
+
+    @staticmethod
+    def _open_temp() -> tempfile.NamedTemporaryFile:
+        return tempfile.NamedTemporaryFile(
+            dir=settings.UPLOAD_DIR, prefix=".log-archive-", suffix=".part", delete=False
+        )
+
+    def _month_query(self, order_id: int, month: datetime):
+        # Timestamps stay stored text: the archive writes them as-is, and parsing
+        # happens in the threadpool rather than in SQLAlchemy on the event loop
+        columns = [getattr(AccessLog, name) for name in FIELDS]
+        columns[2] = type_coerce(AccessLog.timestamp, String)
+        return (
+            select(*columns)
+            .where(
+                AccessLog.order_id == order_id,
+                AccessLog.timestamp >= month,
+                AccessLog.timestamp < next_month(month),
+            )
+            .order_by(AccessLog.timestamp, AccessLog.id)
+            .execution_options(yield_per=self.segment_rows)
+        )
+
+    async def archive_month(self, month: datetime) -> dict:
+        """
+        Move one month of access logs into a new archive file
+        Rows logged for the month after it was archived (clock skew) stay hot
+        and go into another file on the next run
+        """
+        async with AsyncSessionLocal() as db:
+            order_ids = (await db.execute(
+                select(AccessLog.order_id.distinct())
+                .where(AccessLog.timestamp >= month, AccessLog.timestamp < next_month(month))
+            )).scalars().all()
+        if not order_ids:
+            return {"rows": 0, "segments": 0}
+
+        key = f"{settings.LOG_ARCHIVE_PREFIX}/{month:%Y-%m}/{uuid.uuid4().hex}.ndjson.gz"
+        segments = []
+        fh = await run_in_threadpool(self._open_temp)
+        try:
+            offset = 0
+            for order_id in sorted(order_ids):
+                async with AsyncSessionLocal() as db:
+                    result = await db.stream(self._month_query(order_id, month))
+                    async for rows in result.partitions():
+                        member, segment = await run_in_threadpool(_encode_segment, rows)
+                        await run_in_threadpool(fh.write, member)
+                        segment.update(order_id=order_id, month=month, storage_key=key, offset=offset, length=len(member))
+                        segments.append(segment)
+                        offset += len(member)
+            await run_in_threadpool(fh.close)
+            await storage.put_file(key, Path(fh.name))
+        finally:
+            await run_in_threadpool(fh.close)
+            try:
+                await run_in_threadpool(os.unlink, fh.name)
+            except FileNotFoundError:
+                pass
+        self.bytes_written += offset
+
+        rows = 0
+        committed = 0
+        archived_orders = set()
+        for segment in segments:
+            max_id = segment.pop("max_id")
+            async with AsyncSessionLocal() as db:
+                result = await db.execute(
+                    delete(AccessLog)
+                    .where(
+                        AccessLog.order_id == segment["order_id"],
+                        AccessLog.timestamp.between(segment["first_timestamp"], segment["last_timestamp"]),
+                        tuple_(AccessLog.timestamp, AccessLog.id) >= (segment["first_timestamp"], segment["first_id"]),
+                        tuple_(AccessLog.timestamp, AccessLog.id) <= (segment["last_timestamp"], segment["last_id"]),
+                        AccessLog.id <= max_id,
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+                if result.rowcount != segment["row_count"]:
+                    # Rows changed since they were read; leave them hot for the next run
+                    await db.rollback()
+                    self.segments_skipped += 1
+                    logger.warning(
+                        "Skipped archiving %d log rows of order %d: %d matched",
+                        segment["row_count"], segment["order_id"], result.rowcount,
+                    )
+                    continue
+                db.add(LogArchiveSegment(**segment))
+                await db.commit()
+            rows += segment["row_count"]
+            committed += 1
+            archived_orders.add(segment["order_id"])
+
+        # Cached log totals count the moved rows as hot; get_order_logs adds the archive's
+        await cache.delete(*[f"count:logs:{order_id}" for order_id in archived_orders])
+
+        self.months_archived += 1
+        self.segments_written += committed
+        self.rows_archived += rows
+        return {"rows": rows, "segments": committed}
+
+    async def vacuum(self) -> int:
+        """
+        Return free pages to the filesystem, `vacuum_step_pages` per write transaction
+        Needs auto_vacuum=INCREMENTAL; a database created before that was the
+        default keeps its free pages (reused by new rows) until
+        `archive_logs.py --full-vacuum` rewrites it, and this is a no-op
+        """
+        freed = 0
+        while True:
+            async with engine.connect() as conn:
+                if (await conn.exec_driver_sql("PRAGMA auto_vacuum")).scalar() != 2:
+                    if settings.DB_AUTO_VACUUM == "INCREMENTAL" and not self._warned_auto_vacuum:
+                        self._warned_auto_vacuum = True
+                        logger.warning(
+                            "Database is not in auto_vacuum=INCREMENTAL mode, so archived log space is "
+                            "not returned to the filesystem; run `python archive_logs.py --full-vacuum` "
+                            "with the API stopped to convert it"
+                        )
+                    break
+                before = (await conn.exec_driver_sql("PRAGMA freelist_count")).scalar()
+                if not before:
+                    break
+                await conn.exec_driver_sql(f"PRAGMA incremental_vacuum({int(self.vacuum_step_pages)})")
+                await conn.commit()
+                after = (await conn.exec_driver_sql("PRAGMA freelist_count")).scalar()
+            if after >= before:
+                break
+            freed += before - after
+            await asyncio.sleep(0.1)  # Let queued log flushes take the write lock
+
+        if freed:
+            async with engine.connect() as conn:
+                # The vacuum went through the WAL; fold it back so the WAL shrinks too
+                await conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+        self.pages_vacuumed += freed
+        return freed
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception:
+                logger.exception("Access log archival failed")
+            await asyncio.sleep(self.interval)
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "retention_days": self.retention_days,
+            "interval_seconds": self.interval,
+            "runs": self.runs,
+            "failed_runs": self.failed_runs,
+            "months_archived": self.months_archived,
+            "segments_written": self.segments_written,
+            "segments_skipped": self.segments_skipped,
+            "rows_archived": self.rows_archived,
+            "bytes_written": self.bytes_written,
+            "pages_vacuumed": self.pages_vacuumed,
+        }
+
+
+log_archiver = LogArchiver(
+    retention_days=settings.LOG_RETENTION_DAYS,
+    interval_seconds=settings.LOG_ARCHIVE_INTERVAL_SECONDS,
+    segment_rows=settings.LOG_ARCHIVE_SEGMENT_ROWS,
+    vacuum_step_pages=settings.DB_VACUUM_STEP_PAGES,
+)
@@ -0,0 +1,288 @@
+import csv
+import hashlib
+import hmac
+import io
+import json
+from datetime import datetime
+from typing import AsyncIterator, Optional
+from sqlalchemy import select, tuple_, String, type_coerce
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.log import AccessLog
+from app.services import log_archive
+from app.services.zipstream import ZipEntry, METHOD_DEFLATED, METHOD_STORED, stream_zip
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Optional: parquet export is unavailable without it
+    pyarrow = None
+
+COLUMNS = ["id", "order_id", "timestamp", "action_type", "ip_address", "user_agent", "target_file"]
+
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+MANIFEST_ALGORITHM = "HMAC-SHA256"
+
+
+def available_formats() -> list:
+    return [fmt for fmt in MEDIA_TYPES if fmt != "parquet" or pyarrow is not None]
+
+
+class _CsvEncoder:
+    @staticmethod
+    def _format(rows: list) -> bytes:
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator="\n").writerows(rows)
+        return buffer.getvalue().encode("utf-8")
+
+    def header(self) -> bytes:
+        return self._format([COLUMNS])
+
+    def encode(self, rows: list) -> bytes:
+        return self._format([row[:2] + (row[2].isoformat(),) + row[3:] for row in rows])
+
+    def finish(self) -> bytes:
+        return b""
+
+
+class _NdjsonEncoder:
+    def header(self) -> bytes:
+        return b""
+
+    def encode(self, rows: list) -> bytes:
+        lines = []
+        for row in rows:
+            record = dict(zip(COLUMNS, row))
+            record["timestamp"] = record["timestamp"].isoformat()
+            lines.append(json.dumps(record, ensure_ascii=False))
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+    def finish(self) -> bytes:
+        return b""
+
+
+class _Sink(io.RawIOBase):
+    """Write-only file object whose contents are drained as they are produced"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class _ParquetEncoder:
+    """One row group per fetched batch; only the current batch is held in memory"""
+
+    def __init__(self):
+        self._schema = pyarrow.schema([
+            ("id", pyarrow.int64()),
+            ("order_id", pyarrow.int64()),
+            ("timestamp", pyarrow.timestamp("us")),
+            ("action_type", pyarrow.string()),
+            ("ip_address", pyarrow.string()),
+            ("user_agent", pyarrow.string()),
+            ("target_file", pyarrow.string()),
+        ])
+        self._sink = _Sink()
+        self._writer = pyarrow.parquet.ParquetWriter(self._sink, self._schema, compression="zstd")
+
+    def header(self) -> bytes:
+        return self._sink.drain()
+
+    def encode(self, rows: list) -> bytes:
+        columns = list(zip(*rows))
+        self._writer.write_table(pyarrow.table(
+            [pyarrow.array(values, type=field.type) for values, field in zip(columns, self._schema)],
+            schema=self._schema,
+        ))
+        return self._sink.drain()
+
+    def finish(self) -> bytes:
+        self._writer.close()
+        return self._sink.drain()
+
+
+ENCODERS = {"csv": _CsvEncoder, "ndjson": _NdjsonEncoder, "parquet": _ParquetEncoder}
+
+
+def _parse_timestamps(rows: list) -> list:
+    return [row[:2] + (datetime.fromisoformat(row[2]),) + row[3:] for row in rows]
+
+
+class LogExport:
+    """
+    Streams one order's access logs, archived then hot, oldest first
+    - Hot rows are read in keyset pages of `batch_size`, each on its own
+      short-lived connection, so a slow download neither pins a pool
+      connection nor holds a read snapshot that blocks WAL checkpoints
+    - Rows archived between pages are picked up from their new segments, so
+      every row is sent exactly once; encoding runs in the threadpool
+    - Tracks row count, byte count and SHA-256 of the bytes sent, for the manifest
+    """
+
+    def __init__(self, order_id: int, fmt: str, start: Optional[datetime], end: Optional[datetime], batch_size: int):
+        self.order_id = order_id
+        self.format = fmt
+        self.start = start
+        self.end = end
+        self.batch_size = batch_size
+        self.rows = 0
+        self.bytes = 0
+        self.first_timestamp: Optional[datetime] = None
+        self.last_timestamp: Optional[datetime] = None
+        self._digest = hashlib.sha256()
+
+    @property
+    def filename(self) -> str:
+        return f"order-{self.order_id}-access-logs.{self.format}"
+
+    @property
+    def sha256(self) -> str:
+        return self._digest.hexdigest()
+
+    def _emit(self, data: bytes) -> bytes:
+        self._digest.update(data)
+        self.bytes += len(data)
+        return data
+
+    async def _encode(self, encoder, rows: list) -> bytes:
+        if self.first_timestamp is None:
+            self.first_timestamp = rows[0][2]
+        self.last_timestamp = rows[-1][2]
+        self.rows += len(rows)
+        return self._emit(await run_in_threadpool(encoder.encode, rows))
+
+    def _hot_page(self, after: Optional[tuple]):
+        # Timestamps come back as stored text and are parsed by the encoder, off the
+        # event loop; SQLAlchemy's own DateTime conversion would run on it
+        columns = [getattr(AccessLog, name) for name in COLUMNS]
+        columns[2] = type_coerce(AccessLog.timestamp, String)
+        query = select(*columns).where(AccessLog.order_id == self.order_id)
+        if self.start:
+            query = query.where(AccessLog.timestamp >= self.start)
+        if self.end:
+            query = query.where(AccessLog.timestamp < self.end)
+        if after:
+            query = query.where(tuple_(AccessLog.timestamp, AccessLog.id) > after)
+        return query.order_by(AccessLog.timestamp, AccessLog.id).limit(self.batch_size)
+
+    async def stream(self) -> AsyncIterator[bytes]:
+        encoder = await run_in_threadpool(ENCODERS[self.format])
+        header = self._emit(encoder.header())
+        if header:
+            yield header
+
+        position = None  # (timestamp, id) of the last row sent
+        seen_segments = set()
+        while True:
+            async with AsyncSessionLocal() as db:
+                # Opening the cursor first pins the read snapshot, so the archive
+                # catalog read next on the same connection matches it: a row is
+                # either in this page's hot rows or in a segment, never both
+                result = await db.stream(self._hot_page(position))
+                segments = [
+                    segment for segment in await log_archive.list_segments(db, self.order_id, self.start, self.end)
+                    if segment.id not in seen_segments
+                ]
+                rows = [tuple(row) for row in await result.all()]
+
+            # New segments (all of them on the first page) hold rows older than the hot ones
+            seen_segments.update(segment.id for segment in segments)
+            async for records in log_archive.iter_segment_rows(segments, self.start, self.end):
+                if position is not None:
+                    records = [record for record in records if (record["timestamp"], record["id"]) > position]
+                for offset in range(0, len(records), self.batch_size):
+                    batch = [tuple(record[name] for name in COLUMNS) for record in records[offset:offset + self.batch_size]]
+                    yield await self._encode(encoder, batch)
+                    position = (batch[-1][2], batch[-1][0])
+
+            if not rows:
+                break
+            rows = await run_in_threadpool(_parse_timestamps, rows)
+            yield await self._encode(encoder, rows)
+            position = (rows[-1][2], rows[-1][0])
+            if len(rows) < self.batch_size:
+                break
+
+        tail = self._emit(await run_in_threadpool(encoder.finish))
+        if tail:
+            yield tail
+
+    def manifest(self, exported_by: str) -> dict:
+        """Description of the finished export, signed with the server's SECRET_KEY"""
+        manifest = {
+            "order_id": self.order_id,
+            "file": self.filename,
+            "format": self.format,
+            "rows": self.rows,
+            "bytes": self.bytes,
+            "sha256": self.sha256,
+            "first_timestamp": self.first_timestamp.isoformat() if self.first_timestamp else None,
+            "last_timestamp": self.last_timestamp.isoformat() if self.last_timestamp else None,
+            "filter_start": self.start.isoformat() if self.start else None,
+            "filter_end": self.end.isoformat() if self.end else None,
+            "exported_at": datetime.utcnow().isoformat(),
+            "exported_by": exported_by,
+            "algorithm": MANIFEST_ALGORITHM,
+        }
+        manifest["signature"] = sign_manifest(manifest)
+        return manifest
+
+    def signed_archive(self, exported_by: str) -> AsyncIterator[bytes]:
+        """ZIP of the export plus manifest.json, written once the export is complete"""
+        now = datetime.utcnow()
+
+        async def manifest_bytes():
+            yield json.dumps(self.manifest(exported_by), indent=2).encode("utf-8")
+
+        return stream_zip([
+            ZipEntry(
+                name=self.filename, size=None, modified=now, open=self.stream,
+                method=METHOD_STORED if self.format == "parquet" else METHOD_DEFLATED,
+            ),
+            ZipEntry(name="manifest.json", size=None, modified=now, open=manifest_bytes, method=METHOD_STORED),
+        ])
+
+
+def sign_manifest(manifest: dict) -> str:
+    """HMAC-SHA256 over the manifest's canonical JSON, without its signature field"""
+    payload = json.dumps(
+        {key: value for key, value in manifest.items() if key != "signature"},
+        sort_keys=True, separators=(",", ":"),
+    )
+    return hmac.new(settings.SECRET_KEY.encode(), payload.encode(), hashlib.sha256).hexdigest()
+
+
+def verify_manifest(manifest: dict, sha256: str, size: int) -> list:
+    """Problems found checking an export's digest and size against its manifest; empty if intact"""
+    problems = []
+    if manifest.get("algorithm") != MANIFEST_ALGORITHM:
+        problems.append(f"unsupported algorithm {manifest.get('algorithm')!r}")
+    elif not hmac.compare_digest(manifest.get("signature", ""), sign_manifest(manifest)):
+        problems.append("manifest signature does not match (manifest edited, or signed with another key)")
+    if sha256 != manifest.get("sha256"):
+        problems.append("data SHA-256 does not match the manifest")
+    if size != manifest.get("bytes"):
+        problems.append("data size does not match the manifest")
+    return problems
@@ -0,0 +1,140 @@
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import select, DateTime
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.cache import CacheBackend, MISSING, cache
+from app.core.config import settings
+from app.models.order import Order, OrderStatus
+
+
+def _serialize(order: Order) -> dict:
+    data = {}
+    for column in Order.__table__.columns:
+        value = getattr(order, column.name)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        elif isinstance(value, OrderStatus):
+            value = value.value
+        data[column.name] = value
+    return data
+
+
+def _deserialize(data: dict) -> Order:
+    """Rebuild a detached, read-only Order from its cached form"""
+    values = {}
+    for column in Order.__table__.columns:
+        value = data.get(column.name)
+        if value is not None and isinstance(column.type, DateTime):
+            value = datetime.fromisoformat(value)
+        elif value is not None and column.name == "status":
+            value = OrderStatus(value)
+        values[column.name] = value
+    return Order(**values)
+
+
+class OrderCache:
+    """
+    TTL cache of access_key / id -> Order lookups
+    - Unknown access keys are cached too (negative caching), for a shorter TTL
+    - Cached orders are detached copies: read them, never modify or delete them
+    - Expiry (Order.expires_at) is not baked in; callers still check it
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: float, negative_ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(access_key: str) -> str:
+        return f"order:key:{access_key}"
+
+    @staticmethod
+    def _id_key(order_id: int) -> str:
+        return f"order:id:{order_id}"
+
+    async def _store(self, order: Order) -> None:
+        data = _serialize(order)
+        await self.backend.set(self._key(order.access_key), data, self.ttl)
+        await self.backend.set(self._id_key(order.id), data, self.ttl)
+
+    async def get_by_key(self, db: AsyncSession, access_key: str) -> Optional[Order]:
+        """Order for an access key, or None if there is no such order"""
+        cached = await self.backend.get(self._key(access_key))
+        if cached is not MISSING:
+            if cached is None:
+                self.negative_hits += 1
+                return None
+            self.hits += 1
+            return _deserialize(cached)
+
+        self.misses += 1
+        result = await db.execute(select(Order).where(Order.access_key == access_key))
+        order = result.scalar_one_or_none()
+        if order is None:
+            await self.backend.set(self._key(access_key), None, self.negative_ttl)
+        else:
+            await self._store(order)
+        return order
+
+    async def get_by_id(self, db: AsyncSession, order_id: int) -> Optional[Order]:
+        """Order by primary key, or None"""
+        cached = await self.backend.get(self._id_key(order_id))
+        if cached is not MISSING and cached is not None:
+            self.hits += 1
+            return _deserialize(cached)
+
+        self.misses += 1
+        result = await db.execute(select(Order).where(Order.id == order_id))
+        order = result.scalar_one_or_none()
+        if order is not None:
+            await self._store(order)
+        return order
+
+    async def invalidate(self, access_key: Optional[str] = None, order_id: Optional[int] = None) -> None:
+        """Drop cached entries for an order that was created, changed or deleted"""
+        keys = []
+        if access_key is not None:
+            keys.append(self._key(access_key))
+        if order_id is not None:
+            keys.append(self._id_key(order_id))
+        await self.backend.delete(*keys)
+
+    async def invalidate_many(self, orders: list) -> None:
+        """invalidate() for a batch of orders, in one backend call"""
+        keys = []
+        for order in orders:
+            keys += [self._key(order.access_key), self._id_key(order.id)]
+        await self.backend.delete(*keys)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.negative_hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.hits + self.negative_hits) / lookups, 4) if lookups else None,
+        }
+
+
+def order_count_key(status_filter: Optional[OrderStatus], include_expired: bool = True) -> str:
+    """Cache key of an order listing total (see core.pagination.cached_count)"""
+    scope = "all" if include_expired else "live"
+    return f"count:orders:{status_filter.value if status_filter else 'all'}:{scope}"
+
+
+async def invalidate_order_counts() -> None:
+    """Drop cached order totals after orders are added, removed or change status"""
+    statuses = [None, *OrderStatus]
+    await cache.delete(*[order_count_key(s, scope) for s in statuses for scope in (True, False)])
+
+
+order_cache = OrderCache(
+    cache,
+    ttl=settings.ORDER_CACHE_TTL_SECONDS,
+    negative_ttl=settings.ORDER_CACHE_NEGATIVE_TTL_SECONDS,
+)
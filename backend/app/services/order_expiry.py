@@ -0,0 +1,209 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import select, update, delete, or_
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.order import Order, OrderStatus
+from app.models.file import File
+from app.services import blob_store
+from app.services.blob_gc import deletion_worker
+from app.services.order_cache import order_cache, invalidate_order_counts
+from app.services.landing_cache import landing_cache
+
+logger = logging.getLogger(__name__)
+
+LIVE_STATUSES = [s for s in OrderStatus if s is not OrderStatus.expired]
+
+
+def live_order_filter(now: Optional[datetime] = None) -> tuple:
+    """
+    WHERE criteria for orders that have not expired, including ones past
+    expires_at that the sweeper has not marked yet
+    The status IN list (rather than != expired) lets SQLite use
+    ix_orders_status_expires_at
+    """
+    now = now or datetime.utcnow()
+    return (
+        Order.status.in_(LIVE_STATUSES),
+        or_(Order.expires_at.is_(None), Order.expires_at >= now),
+    )
+
+
+class ExpirySweeper:
+    """
+    Marks orders past expires_at as expired, in batches
+    - Due orders are found through ix_orders_status_expires_at: one index
+      range per live status, so each pass reads only what it changes
+    - action "purge_files" also deletes the files of orders expired for
+      `purge_after_days`; "delete" removes those orders outright (files,
+      logs, rollups). Bytes are released through the deletion worker
+    - Extending an expired order (a new expires_at) restores the status it
+      had before, kept in status_before_expiry
+    """
+
+    def __init__(self, interval_seconds: int, batch_size: int, action: str, purge_after_days: int):
+        self.interval = interval_seconds
+        self.batch_size = batch_size
+        self.action = action
+        self.purge_after = timedelta(days=purge_after_days)
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+        # Counters
+        self.runs = 0
+        self.failed_runs = 0
+        self.orders_expired = 0
+        self.orders_purged = 0
+        self.files_purged = 0
+        self.orders_deleted = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        if self.running or self.interval <= 0:
+            return
+        self._task = asyncio.create_task(self._run(), name="order-expiry-sweeper")
+
+    async def stop(self) -> None:
+        if not self.running:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def run_once(self) -> dict:
+        async with self._lock:
+            try:
+                now = datetime.utcnow()
+                result = {"expired": await self._mark_expired(now), "purged": 0, "deleted": 0}
+                if self.action == "purge_files":
+                    result["purged"] = await self._purge_files(now - self.purge_after)
+                elif self.action == "delete":
+                    result["deleted"] = await self._delete_orders(now - self.purge_after)
+            except Exception:
+                self.failed_runs += 1
+                raise
+        self.runs += 1
+        return result
+
+    async def _mark_expired(self, now: datetime) -> int:
+        marked = 0
+        while True:
+            async with AsyncSessionLocal() as db:
+                due = await db.execute(
+                    select(Order.id, Order.access_key)
+                    .where(Order.status.in_(LIVE_STATUSES), Order.expires_at < now)
+                    .limit(self.batch_size)
+                )
+                orders = due.all()
+                if not orders:
+                    break
+                # Re-check expires_at: an admin may have extended the order meanwhile
+                result = await db.execute(
+                    update(Order)
+                    .where(Order.id.in_([o.id for o in orders]), Order.expires_at < now)
+                    .values(status=OrderStatus.expired, status_before_expiry=Order.status)
+                )
+                await db.commit()
+            await self._invalidate(orders)
+            marked += result.rowcount
+            self.orders_expired += result.rowcount
+        if marked:
+            await invalidate_order_counts()
+            logger.info("Marked %d orders expired", marked)
+        return marked
+
+    async def _due(self, db, cutoff: datetime, with_files: bool) -> list:
+        query = select(Order.id, Order.access_key).where(
+            Order.status == OrderStatus.expired, Order.expires_at < cutoff
+        )
+        if with_files:
+            query = query.where(Order.file_count > 0)
+        return (await db.execute(query.limit(self.batch_size))).all()
+
+    async def _release_files(self, db, order_ids: list) -> list:
+        """Drop the orders' blob references; returns names whose bytes can go"""
+        result = await db.execute(select(File.filename_saved).where(File.order_id.in_(order_ids)))
+        return [name for name in result.scalars().all() if await blob_store.release(db, name)]
+
+    async def _purge_files(self, cutoff: datetime) -> int:
+        purged = 0
+        while True:
+            async with AsyncSessionLocal() as db:
+                orders = await self._due(db, cutoff, with_files=True)
+                if not orders:
+                    break
+                ids = [o.id for o in orders]
+                unreferenced = await self._release_files(db, ids)
+                files = await db.execute(delete(File).where(File.order_id.in_(ids)))
+                await db.execute(update(Order).where(Order.id.in_(ids)).values(file_count=0, total_bytes=0))
+                await db.commit()
+            for name in unreferenced:
+                await deletion_worker.submit(name)
+            await self._invalidate(orders)
+            purged += len(orders)
+            self.orders_purged += len(orders)
+            self.files_purged += files.rowcount
+        return purged
+
+    async def _delete_orders(self, cutoff: datetime) -> int:
+        deleted = 0
+        while True:
+            async with AsyncSessionLocal() as db:
+                orders = await self._due(db, cutoff, with_files=False)
+                if not orders:
+                    break
+                ids = [o.id for o in orders]
+                unreferenced = await self._release_files(db, ids)
+                # Files, logs, archive catalog and rollups go by ON DELETE CASCADE
+                await db.execute(delete(Order).where(Order.id.in_(ids)))
+                await db.commit()
+            for name in unreferenced:
+                await deletion_worker.submit(name)
+            await self._invalidate(orders)
+            deleted += len(orders)
+            self.orders_deleted += len(orders)
+        if deleted:
+            await invalidate_order_counts()
+        return deleted
+
+    @staticmethod
+    async def _invalidate(orders: list) -> None:
+        await order_cache.invalidate_many(orders)
+        await landing_cache.invalidate_many([o.access_key for o in orders])
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception:
+                logger.exception("Order expiry sweep failed")
+            await asyncio.sleep(self.interval)
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "interval_seconds": self.interval,
+            "action": self.action,
+            "runs": self.runs,
+            "failed_runs": self.failed_runs,
+            "orders_expired": self.orders_expired,
+            "orders_purged": self.orders_purged,
+            "files_purged": self.files_purged,
+            "orders_deleted": self.orders_deleted,
+        }
+
+
+expiry_sweeper = ExpirySweeper(
+    interval_seconds=settings.ORDER_EXPIRY_SWEEP_INTERVAL_SECONDS,
+    batch_size=settings.ORDER_EXPIRY_BATCH_SIZE,
+    action=settings.ORDER_EXPIRY_ACTION,
+    purge_after_days=settings.ORDER_EXPIRY_PURGE_AFTER_DAYS,
+)
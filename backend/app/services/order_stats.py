@@ -0,0 +1,261 @@
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Optional
+from sqlalchemy import select, update, func, case, bindparam, DateTime
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.order import Order
+from app.models.file import File
+from app.models.log import AccessLog
+from app.models.log_archive import LogArchiveSegment
+
+logger = logging.getLogger(__name__)
+
+VISIT_ACTIONS = ("VISIT_PAGE",)
+DOWNLOAD_ACTIONS = ("DOWNLOAD_SUCCESS", "DOWNLOAD_BUNDLE")
+
+orders = Order.__table__
+
+
+async def adjust_file_totals(db: AsyncSession, order_id: int, files: int, size: int) -> None:
+    """
+    Add `files` / `size` bytes to an order's file counters
+    Runs in the caller's transaction, so it commits or rolls back with the File row
+    """
+    await db.execute(
+        update(orders)
+        .where(orders.c.id == order_id)
+        .values(
+            file_count=orders.c.file_count + files,
+            total_bytes=orders.c.total_bytes + size,
+        )
+    )
+
+
+async def apply_log_rows(db: AsyncSession, rows: list) -> None:
+    """
+    Fold a batch of access log rows into the orders' visit / download counters
+    One UPDATE per distinct order, executed as a single executemany
+    """
+    deltas = defaultdict(lambda: {"visits": 0, "downloads": 0, "last": None})
+    for row in rows:
+        delta = deltas[row["order_id"]]
+        if row["action_type"] in VISIT_ACTIONS:
+            delta["visits"] += 1
+        elif row["action_type"] in DOWNLOAD_ACTIONS:
+            delta["downloads"] += 1
+        if delta["last"] is None or row["timestamp"] > delta["last"]:
+            delta["last"] = row["timestamp"]
+    if not deltas:
+        return
+
+    last = bindparam("b_last", type_=DateTime)
+    await db.execute(
+        update(orders)
+        .where(orders.c.id == bindparam("b_id"))
+        .values(
+            visit_count=orders.c.visit_count + bindparam("b_visits"),
+            download_count=orders.c.download_count + bindparam("b_downloads"),
+            # Two-argument max() is SQLite's scalar max; DateTime text sorts chronologically
+            last_access_at=func.max(func.coalesce(orders.c.last_access_at, last), last),
+        ),
+        [
+            {"b_id": order_id, "b_visits": d["visits"], "b_downloads": d["downloads"], "b_last": d["last"]}
+            for order_id, d in deltas.items()
+        ],
+    )
+
+
+COUNTERS = ("file_count", "total_bytes", "visit_count", "download_count", "last_access_at")
+
+
+async def _true_counters(db: AsyncSession, first_id: int, last_id: int) -> dict:
+    """
+    order id -> true counter values for orders in [first_id, last_id]
+    One GROUP BY per source table, each reading only the id range through its
+    order_id index; log counters add the archived segments' totals
+    """
+    counters = defaultdict(lambda: {
+        "file_count": 0, "total_bytes": 0, "visit_count": 0, "download_count": 0, "last_access_at": None,
+    })
+
+    def note_access(order_id: int, timestamp) -> None:
+        last = counters[order_id]["last_access_at"]
+        if timestamp is not None and (last is None or timestamp > last):
+            counters[order_id]["last_access_at"] = timestamp
+
+    files = await db.execute(
+        select(File.order_id, func.count(), func.coalesce(func.sum(File.file_size), 0))
+        .where(File.order_id.between(first_id, last_id))
+        .group_by(File.order_id)
+    )
+    for order_id, count, size in files:
+        counters[order_id]["file_count"] = count
+        counters[order_id]["total_bytes"] = size
+
+    logs = await db.execute(
+        select(
+            AccessLog.order_id,
+            func.count(case((AccessLog.action_type.in_(VISIT_ACTIONS), 1))),
+            func.count(case((AccessLog.action_type.in_(DOWNLOAD_ACTIONS), 1))),
+            func.max(AccessLog.timestamp),
+        )
+        .where(AccessLog.order_id.between(first_id, last_id))
+        .group_by(AccessLog.order_id)
+    )
+    for order_id, visits, downloads, last in logs:
+        counters[order_id]["visit_count"] += visits
+        counters[order_id]["download_count"] += downloads
+        note_access(order_id, last)
+
+    archived = await db.execute(
+        select(
+            LogArchiveSegment.order_id,
+            func.coalesce(func.sum(LogArchiveSegment.visit_count), 0),
+            func.coalesce(func.sum(LogArchiveSegment.download_count), 0),
+            func.max(LogArchiveSegment.last_timestamp),
+        )
+        .where(LogArchiveSegment.order_id.between(first_id, last_id))
+        .group_by(LogArchiveSegment.order_id)
+    )
+    for order_id, visits, downloads, last in archived:
+        counters[order_id]["visit_count"] += visits
+        counters[order_id]["download_count"] += downloads
+        note_access(order_id, last)
+    return counters
+
+
+async def reconcile(batch_size: int = 500) -> dict:
+    """
+    Recompute every order's counters from `files`, `access_logs` and the log archive
+    - Orders are processed in id ranges of `batch_size`; the stored counters
+      and the aggregates are read in one read-only snapshot, bounded by the
+      range, so no write lock is held while scanning
+    - Only drifted rows are written, in one short transaction per range, and
+      only if their stored counters are still the ones compared: a row that
+      an upload or log flush changed meanwhile is left for the next run
+    """
+    stored_columns = [orders.c[name] for name in COUNTERS]
+    guarded_update = (
+        update(orders)
+        .where(
+            orders.c.id == bindparam("b_id"),
+            *[column.is_not_distinct_from(bindparam(f"b_old_{column.name}", type_=column.type)) for column in stored_columns],
+        )
+        .values(**{column.name: bindparam(f"b_new_{column.name}", type_=column.type) for column in stored_columns})
+    )
+
+    checked = 0
+    drifted = 0
+    last_id = 0
+    while True:
+        async with AsyncSessionLocal() as db:
+            # pysqlite runs SELECTs outside a transaction, each seeing the latest
+            # commit; an explicit BEGIN pins one snapshot for all four reads, so
+            # a log segment archived meanwhile is not counted in both tables
+            conn = await db.connection()
+            await conn.exec_driver_sql("BEGIN")
+            stored = (await db.execute(
+                select(orders.c.id, *stored_columns).where(orders.c.id > last_id).order_by(orders.c.id).limit(batch_size)
+            )).all()
+            if not stored:
+                break
+            true_values = await _true_counters(db, stored[0].id, stored[-1].id)
+
+        params = []
+        for row in stored:
+            new = true_values[row.id]
+            if any(getattr(row, name) != new[name] for name in COUNTERS):
+                params.append({
+                    "b_id": row.id,
+                    **{f"b_old_{name}": getattr(row, name) for name in COUNTERS},
+                    **{f"b_new_{name}": new[name] for name in COUNTERS},
+                })
+        if params:
+            async with AsyncSessionLocal() as db:
+                result = await db.execute(guarded_update, params)
+                await db.commit()
+            drifted += result.rowcount
+
+        checked += len(stored)
+        last_id = stored[-1].id
+    return {"checked": checked, "drifted": drifted}
+
+
+class CounterReconciler:
+    """
+    Periodically re-derives the denormalized Order counters
+    The write paths keep them exact; this repairs drift from rows written
+    by older versions, manual SQL, or log rows dropped after a failed flush
+    """
+
+    def __init__(self, interval_seconds: int, batch_size: int):
+        self.interval = interval_seconds
+        self.batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+
+        # Counters
+        self.runs = 0
+        self.failed_runs = 0
+        self.orders_checked = 0
+        self.orders_repaired = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        if self.running or self.interval <= 0:
+            return
+        self._task = asyncio.create_task(self._run(), name="order-counter-reconciler")
+
+    async def stop(self) -> None:
+        if not self.running:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def run_once(self) -> dict:
+        try:
+            result = await reconcile(self.batch_size)
+        except Exception:
+            self.failed_runs += 1
+            raise
+        self.runs += 1
+        self.orders_checked += result["checked"]
+        self.orders_repaired += result["drifted"]
+        if result["drifted"]:
+            logger.warning("Repaired counters of %d orders", result["drifted"])
+        return result
+
+    async def _run(self) -> None:
+        # First pass after one interval, not at startup: a full pass scans every
+        # log row, and restarts should not pay for it (reconcile_counters.py does it on demand)
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_once()
+            except Exception:
+                logger.exception("Order counter reconciliation failed")
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "interval_seconds": self.interval,
+            "runs": self.runs,
+            "failed_runs": self.failed_runs,
+            "orders_checked": self.orders_checked,
+            "orders_repaired": self.orders_repaired,
+        }
+
+
+counter_reconciler = CounterReconciler(
+    interval_seconds=settings.ORDER_COUNTERS_RECONCILE_INTERVAL_SECONDS,
+    batch_size=settings.ORDER_COUNTERS_RECONCILE_BATCH_SIZE,
+)
@@ -0,0 +1,218 @@
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import select, delete, func
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.session import AsyncSessionLocal
+from app.models.log import AccessLog
+from app.models.rollup import AccessRollup, AccessIpSketch
+from app.services.hyperloglog import HyperLogLog
+from app.services import log_archive
+
+COUNT_GRANULARITIES = ("hour", "day")
+SKETCH_GRANULARITIES = ("day", "all")
+BUCKET_SIZES = {"hour": timedelta(hours=1), "day": timedelta(days=1)}
+EPOCH = datetime(1970, 1, 1)
+
+rollups = AccessRollup.__table__
+sketches = AccessIpSketch.__table__
+
+
+def bucket_start(timestamp: datetime, granularity: str) -> datetime:
+    """Start of the UTC bucket a timestamp falls into"""
+    if granularity == "hour":
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    if granularity == "day":
+        return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+    if granularity == "all":
+        return EPOCH
+    raise ValueError(f"Unknown granularity: {granularity}")
+
+
+class _Accumulator:
+    """Counts and unique-IP sketches for a set of log rows, before they are written"""
+
+    def __init__(self):
+        self.counts = Counter()
+        self.ranks = {}  # sketch key -> {register index: rank}, merged into the stored sketch on write
+
+    def add(self, order_id: int, ip_address: str, action_type: str, target_file: Optional[str], timestamp: datetime):
+        for granularity in COUNT_GRANULARITIES:
+            key = (order_id, granularity, bucket_start(timestamp, granularity), action_type, target_file or "")
+            self.counts[key] += 1
+        index, rank = HyperLogLog.position(ip_address)
+        for granularity in SKETCH_GRANULARITIES:
+            key = (order_id, granularity, bucket_start(timestamp, granularity))
+            ranks = self.ranks.get(key)
+            if ranks is None:
+                ranks = self.ranks[key] = {}
+            if rank > ranks.get(index, 0):
+                ranks[index] = rank
+
+    async def write(self, db: AsyncSession) -> None:
+        """Add the counts to the stored rollups and merge the sketches into the stored ones"""
+        if self.counts:
+            stmt = insert(rollups)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[c.name for c in rollups.primary_key],
+                set_={"count": rollups.c.count + stmt.excluded["count"]},
+            )
+            await db.execute(stmt, [
+                {"order_id": o, "granularity": g, "bucket_start": b, "action_type": a, "target_file": f, "count": n}
+                for (o, g, b, a, f), n in self.counts.items()
+            ])
+
+        if self.ranks:
+            # Separate IN lists seek the primary key; a batch spans few buckets
+            existing = await db.execute(
+                select(sketches.c.order_id, sketches.c.granularity, sketches.c.bucket_start, sketches.c.registers)
+                .where(
+                    sketches.c.order_id.in_({key[0] for key in self.ranks}),
+                    sketches.c.granularity.in_({key[1] for key in self.ranks}),
+                    sketches.c.bucket_start.in_({key[2] for key in self.ranks}),
+                )
+            )
+            stored = {(o, g, b): registers for o, g, b, registers in existing.all()}
+            merged = {}
+            for key, ranks in self.ranks.items():
+                sketch = HyperLogLog.from_bytes(stored[key]) if key in stored else HyperLogLog()
+                sketch.apply(ranks)
+                merged[key] = sketch
+
+            stmt = insert(sketches)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[c.name for c in sketches.primary_key],
+                set_={"registers": stmt.excluded.registers},
+            )
+            await db.execute(stmt, [
+                {"order_id": o, "granularity": g, "bucket_start": b, "registers": sketch.to_bytes()}
+                for (o, g, b), sketch in merged.items()
+            ])
+
+
+async def record(db: AsyncSession, rows: list) -> None:
+    """
+    Fold a batch of access log rows into the rollups, in the caller's transaction
+    Call after inserting the rows: the insert takes SQLite's write lock, so the
+    sketch read-merge-write below cannot interleave with another worker's flush
+    """
+    accumulator = _Accumulator()
+    for row in rows:
+        accumulator.add(row["order_id"], row["ip_address"], row["action_type"], row["target_file"], row["timestamp"])
+    await accumulator.write(db)
+
+
+async def _accumulate(db: AsyncSession, accumulator: _Accumulator, order_id: int, after_id: int, upto_id: Optional[int],
+                      include_archive: bool = False):
+    query = select(
+        AccessLog.ip_address, AccessLog.action_type, AccessLog.target_file, AccessLog.timestamp
+    ).where(AccessLog.order_id == order_id, AccessLog.id > after_id)
+    if upto_id is not None:
+        query = query.where(AccessLog.id <= upto_id)
+    result = await db.stream(query.execution_options(yield_per=10000))
+    if include_archive:
+        # Read after the cursor opened, on its connection and snapshot, so rows
+        # archived meanwhile are counted exactly once
+        segments = await log_archive.list_segments(db, order_id)
+        async for records in log_archive.iter_segment_rows(segments):
+            for record in records:
+                accumulator.add(
+                    order_id, record["ip_address"], record["action_type"], record["target_file"], record["timestamp"]
+                )
+    async for ip_address, action_type, target_file, timestamp in result:
+        accumulator.add(order_id, ip_address, action_type, target_file, timestamp)
+
+
+async def rebuild(order_id: int) -> None:
+    """
+    Recompute one order's rollups from its access_logs rows and archived logs
+    - Rows up to the current max id are read without holding the write lock
+    - The replace itself, plus rows logged meanwhile, is one short write transaction
+    """
+    accumulator = _Accumulator()
+    async with AsyncSessionLocal() as db:
+        cutoff = (await db.execute(
+            select(func.max(AccessLog.id)).where(AccessLog.order_id == order_id)
+        )).scalar_one_or_none() or 0
+        await _accumulate(db, accumulator, order_id, 0, cutoff, include_archive=True)
+
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(AccessRollup).where(AccessRollup.order_id == order_id))
+        await db.execute(delete(AccessIpSketch).where(AccessIpSketch.order_id == order_id))
+        await _accumulate(db, accumulator, order_id, cutoff, None)
+        await accumulator.write(db)
+        await db.commit()
+
+
+async def timeseries(db: AsyncSession, order_id: int, granularity: str, start: datetime, end: datetime) -> list:
+    """
+    Per-bucket action counts for [start, end), oldest first, with empty buckets filled in
+    Daily buckets also carry a unique-IP estimate
+    """
+    first = bucket_start(start, granularity)
+    buckets = {}
+    current = first
+    while current < end:
+        buckets[current] = {"bucket_start": current, "counts": {}, "unique_ips": 0 if granularity == "day" else None}
+        current += BUCKET_SIZES[granularity]
+
+    result = await db.execute(
+        select(AccessRollup.bucket_start, AccessRollup.action_type, func.sum(AccessRollup.count))
+        .where(
+            AccessRollup.order_id == order_id,
+            AccessRollup.granularity == granularity,
+            AccessRollup.bucket_start >= first,
+            AccessRollup.bucket_start < end,
+        )
+        .group_by(AccessRollup.bucket_start, AccessRollup.action_type)
+    )
+    for start_at, action_type, count in result.all():
+        buckets[start_at]["counts"][action_type] = count
+
+    if granularity == "day":
+        result = await db.execute(
+            select(AccessIpSketch.bucket_start, AccessIpSketch.registers).where(
+                AccessIpSketch.order_id == order_id,
+                AccessIpSketch.granularity == "day",
+                AccessIpSketch.bucket_start >= first,
+                AccessIpSketch.bucket_start < end,
+            )
+        )
+        for start_at, registers in result.all():
+            buckets[start_at]["unique_ips"] = HyperLogLog.from_bytes(registers).count()
+
+    return list(buckets.values())
+
+
+async def summary(db: AsyncSession, order_id: int) -> dict:
+    """All-time totals per action and per file, and the unique-IP estimate"""
+    result = await db.execute(
+        select(AccessRollup.action_type, AccessRollup.target_file, func.sum(AccessRollup.count))
+        .where(AccessRollup.order_id == order_id, AccessRollup.granularity == "day")
+        .group_by(AccessRollup.action_type, AccessRollup.target_file)
+    )
+    actions = Counter()
+    files = {}
+    for action_type, target_file, count in result.all():
+        actions[action_type] += count
+        if target_file:
+            files.setdefault(target_file, {})[action_type] = count
+
+    result = await db.execute(
+        select(AccessIpSketch.registers).where(
+            AccessIpSketch.order_id == order_id,
+            AccessIpSketch.granularity == "all",
+            AccessIpSketch.bucket_start == EPOCH,
+        )
+    )
+    registers = result.scalar_one_or_none()
+
+    return {
+        "actions": dict(actions),
+        "unique_ips": HyperLogLog.from_bytes(registers).count() if registers is not None else 0,
+        "files": [
+            {"target_file": name, "counts": counts, "total": sum(counts.values())}
+            for name, counts in sorted(files.items(), key=lambda item: -sum(item[1].values()))
+        ],
+    }
@@ -0,0 +1,421 @@
+import hashlib
+import hmac
+import itertools
+import os
+import shutil
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import AsyncIterator, Iterator, Optional
+from urllib.parse import quote, urlsplit
+from xml.etree import ElementTree
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.services.downloads import content_disposition
+
+UNSIGNED_PAYLOAD = "UNSIGNED-PAYLOAD"
+
+
+class StorageError(OSError):
+    """A storage backend could not complete an operation"""
+
+
+@dataclass
+class StoredObject:
+    key: str
+    size: int
+    modified: datetime  # Naive UTC
+
+
+class StorageBackend(ABC):
+    """
+    Where file bytes live, addressed by key (see blob_store.storage_key)
+    Keys use "/" separators and never start with one
+    """
+
+    @abstractmethod
+    async def put_file(self, key: str, source: Path, content_sha256: Optional[str] = None, move: bool = True) -> None:
+        """
+        Store the content of a local file under `key`
+        With move=True the source file is consumed
+        """
+
+    @abstractmethod
+    def open_stream(self, key: str, start: int = 0, end: Optional[int] = None, chunk_size: int = 1024 * 1024) -> AsyncIterator[bytes]:
+        """Yield the bytes of `key` from `start` to `end` inclusive"""
+
+    @abstractmethod
+    async def exists(self, key: str) -> bool:
+        """Whether `key` is stored"""
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        """Remove `key`, ignoring it if absent"""
+
+    @abstractmethod
+    def list_objects(self, prefix: str = "", recursive: bool = True) -> AsyncIterator[StoredObject]:
+        """
+        Yield the objects under `prefix` ("" or ending in "/") in key order,
+        a page at a time; recursive=False stops at the next "/"
+        """
+
+    @abstractmethod
+    async def move(self, key: str, new_key: str) -> None:
+        """Store `key`'s bytes under `new_key` and remove `key`"""
+
+    def local_path(self, key: str) -> Optional[Path]:
+        """Path on this host's disk, when the backend has one (enables sendfile / proxy offload)"""
+        return None
+
+    async def presigned_url(
+        self,
+        key: str,
+        filename: str,
+        expires: int,
+        content_type: Optional[str] = None,
+        content_encoding: Optional[str] = None,
+    ) -> Optional[str]:
+        """Time-limited URL clients can download `key` from directly, when supported"""
+        return None
+
+    async def close(self) -> None:
+        """Release pooled resources"""
+
+
+class LocalStorageBackend(StorageBackend):
+    """Files under a directory on local (or shared) disk"""
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+
+    def local_path(self, key: str) -> Path:
+        return self.root / key
+
+    @staticmethod
+    def _put(source: Path, destination: Path, move: bool) -> None:
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        if move:
+            os.replace(source, destination)
+            return
+        try:
+            os.link(source, destination)
+        except FileExistsError:
+            pass
+        except OSError:
+            shutil.copyfile(source, destination)
+
+    async def put_file(self, key: str, source: Path, content_sha256: Optional[str] = None, move: bool = True) -> None:
+        await run_in_threadpool(self._put, source, self.local_path(key), move)
+
+    async def open_stream(self, key: str, start: int = 0, end: Optional[int] = None, chunk_size: int = 1024 * 1024) -> AsyncIterator[bytes]:
+        fh = await run_in_threadpool(open, self.local_path(key), "rb")
+        try:
+            fd = fh.fileno()
+            offset = start
+            while end is None or offset <= end:
+                length = chunk_size if end is None else min(chunk_size, end - offset + 1)
+                chunk = await run_in_threadpool(os.pread, fd, length, offset)
+                if not chunk:
+                    break
+                offset += len(chunk)
+                yield chunk
+        finally:
+            await run_in_threadpool(fh.close)
+
+    async def exists(self, key: str) -> bool:
+        return await run_in_threadpool(self.local_path(key).exists)
+
+    @staticmethod
+    def _unlink(path: Path) -> None:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+    async def delete(self, key: str) -> None:
+        await run_in_threadpool(self._unlink, self.local_path(key))
+
+    def _walk(self, directory: Path, prefix: str, recursive: bool) -> Iterator[StoredObject]:
+        """Files under `directory` in key order, holding one directory listing per level"""
+        try:
+            with os.scandir(directory) as it:
+                # A directory's keys continue with "/", which decides where they sort
+                entries = sorted(it, key=lambda entry: entry.name + "/" if entry.is_dir() else entry.name)
+        except FileNotFoundError:
+            return
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if recursive:
+                    yield from self._walk(Path(entry.path), f"{prefix}{entry.name}/", recursive)
+            elif entry.is_file(follow_symlinks=False):
+                stat = entry.stat(follow_symlinks=False)
+                modified = datetime.fromtimestamp(stat.st_mtime, timezone.utc).replace(tzinfo=None)
+                yield StoredObject(f"{prefix}{entry.name}", stat.st_size, modified)
+
+    async def list_objects(self, prefix: str = "", recursive: bool = True) -> AsyncIterator[StoredObject]:
+        walk = self._walk(self.root / prefix, prefix, recursive)
+        while True:
+            page = await run_in_threadpool(list, itertools.islice(walk, 1000))
+            if not page:
+                break
+            for item in page:
+                yield item
+
+    @staticmethod
+    def _move(source: Path, destination: Path) -> None:
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(source, destination)
+
+    async def move(self, key: str, new_key: str) -> None:
+        await run_in_threadpool(self._move, self.local_path(key), self.local_path(new_key))
+
+
+def _hmac(key: bytes, message: str) -> bytes:
+    return hmac.new(key, message.encode(), hashlib.sha256).digest()
+
+
+class S3StorageBackend(StorageBackend):
+    """
+    Objects in an S3-compatible bucket (AWS S3, MinIO, Ceph RGW, ...)
+    - Requests are signed with AWS Signature V4, path-style addressing
+    - One pooled keep-alive HTTP client per worker
+    - Uploads and downloads stream; nothing is held in memory whole
+    """
+
+    def __init__(
+        self,
+        endpoint_url: str,
+        bucket: str,
+        region: str,
+        access_key_id: str,
+        secret_access_key: str,
+        key_prefix: str = "",
+        public_url: str = "",
+        max_connections: int = 32,
+        timeout: float = 30.0,
+    ):
+        self.endpoint_url = endpoint_url.rstrip("/")
+        self.public_url = (public_url or endpoint_url).rstrip("/")
+        self.bucket = bucket
+        self.region = region
+        self.access_key_id = access_key_id
+        self.secret_access_key = secret_access_key
+        self.key_prefix = key_prefix.strip("/")
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self._client = None
+
+    def _get_client(self):
+        if self._client is None:
+            # Imported lazily: only deployments using S3 need httpx
+            import httpx
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+                timeout=self.timeout,
+            )
+        return self._client
+
+    def _object_path(self, key: str) -> str:
+        name = f"{self.key_prefix}/{key}" if self.key_prefix else key
+        return "/" + quote(self.bucket, safe="") + "/" + quote(name, safe="/~")
+
+    def _signature(self, method: str, path: str, query: dict, headers: dict, payload_hash: str, amz_date: str) -> tuple:
+        """Return (credential scope, signed header list, signature)"""
+        scope = f"{amz_date[:8]}/{self.region}/s3/aws4_request"
+        canonical_query = "&".join(
+            f"{quote(k, safe='~')}={quote(str(v), safe='~')}" for k, v in sorted(query.items())
+        )
+        names = sorted(name.lower() for name in headers)
+        canonical_headers = "".join(f"{name}:{str(headers[name]).strip()}\n" for name in names)
+        signed_headers = ";".join(names)
+        canonical_request = "\n".join([
+            method, path, canonical_query, canonical_headers, signed_headers, payload_hash,
+        ])
+        string_to_sign = "\n".join([
+            "AWS4-HMAC-SHA256", amz_date, scope,
+            hashlib.sha256(canonical_request.encode()).hexdigest(),
+        ])
+        signing_key = _hmac(("AWS4" + self.secret_access_key).encode(), amz_date[:8])
+        for part in (self.region, "s3", "aws4_request"):
+            signing_key = _hmac(signing_key, part)
+        signature = hmac.new(signing_key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+        return scope, signed_headers, signature
+
+    def _signed_headers(
+        self,
+        method: str,
+        key: str,
+        payload_hash: str = UNSIGNED_PAYLOAD,
+        extra: Optional[dict] = None,
+        amz_headers: Optional[dict] = None,
+        path: Optional[str] = None,
+        query: Optional[dict] = None,
+    ) -> dict:
+        """Headers for a signed request; `amz_headers` (x-amz-*) are covered by the signature"""
+        amz_date = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        headers = {
+            "host": urlsplit(self.endpoint_url).netloc,
+            "x-amz-content-sha256": payload_hash,
+            "x-amz-date": amz_date,
+            **(amz_headers or {}),
+        }
+        scope, signed_headers, signature = self._signature(
+            method, path or self._object_path(key), query or {}, headers, payload_hash, amz_date
+        )
+        headers["authorization"] = (
+            f"AWS4-HMAC-SHA256 Credential={self.access_key_id}/{scope}, "
+            f"SignedHeaders={signed_headers}, Signature={signature}"
+        )
+        headers.update(extra or {})
+        return headers
+
+    def _url(self, key: str) -> str:
+        return self.endpoint_url + self._object_path(key)
+
+    async def put_file(self, key: str, source: Path, content_sha256: Optional[str] = None, move: bool = True) -> None:
+        size = await run_in_threadpool(os.path.getsize, source)
+
+        async def body() -> AsyncIterator[bytes]:
+            fh = await run_in_threadpool(open, source, "rb")
+            try:
+                while True:
+                    chunk = await run_in_threadpool(fh.read, settings.UPLOAD_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    yield chunk
+            finally:
+                await run_in_threadpool(fh.close)
+
+        # An explicit Content-Length keeps the body un-chunked, which S3 requires
+        headers = self._signed_headers(
+            "PUT", key, content_sha256 or UNSIGNED_PAYLOAD, {"content-length": str(size)}
+        )
+        response = await self._get_client().put(self._url(key), content=body(), headers=headers)
+        if response.status_code >= 300:
+            raise StorageError(f"S3 PUT {key} failed with {response.status_code}: {response.text[:200]}")
+        if move:
+            await run_in_threadpool(os.unlink, source)
+
+    async def open_stream(self, key: str, start: int = 0, end: Optional[int] = None, chunk_size: int = 1024 * 1024) -> AsyncIterator[bytes]:
+        extra = {}
+        if start or end is not None:
+            extra["range"] = f"bytes={start}-{'' if end is None else end}"
+        headers = self._signed_headers("GET", key, extra=extra)
+        async with self._get_client().stream("GET", self._url(key), headers=headers) as response:
+            if response.status_code == 404:
+                raise FileNotFoundError(key)
+            if response.status_code >= 300:
+                raise StorageError(f"S3 GET {key} failed with {response.status_code}")
+            async for chunk in response.aiter_bytes(chunk_size):
+                yield chunk
+
+    async def exists(self, key: str) -> bool:
+        response = await self._get_client().head(self._url(key), headers=self._signed_headers("HEAD", key))
+        if response.status_code == 404:
+            return False
+        if response.status_code >= 300:
+            raise StorageError(f"S3 HEAD {key} failed with {response.status_code}")
+        return True
+
+    async def delete(self, key: str) -> None:
+        response = await self._get_client().delete(self._url(key), headers=self._signed_headers("DELETE", key))
+        if response.status_code >= 300 and response.status_code != 404:
+            raise StorageError(f"S3 DELETE {key} failed with {response.status_code}")
+
+    async def list_objects(self, prefix: str = "", recursive: bool = True) -> AsyncIterator[StoredObject]:
+        """ListObjectsV2, 1000 keys per page; S3 returns keys in UTF-8 binary order"""
+        base = f"{self.key_prefix}/" if self.key_prefix else ""
+        path = "/" + quote(self.bucket, safe="")
+        query = {"list-type": "2", "prefix": base + prefix}
+        if not recursive:
+            query["delimiter"] = "/"
+        namespace = "{http://s3.amazonaws.com/doc/2006-03-01/}"
+        while True:
+            headers = self._signed_headers("GET", "", path=path, query=query)
+            query_string = "&".join(f"{quote(k, safe='~')}={quote(v, safe='~')}" for k, v in sorted(query.items()))
+            response = await self._get_client().get(f"{self.endpoint_url}{path}?{query_string}", headers=headers)
+            if response.status_code >= 300:
+                raise StorageError(f"S3 LIST {prefix!r} failed with {response.status_code}")
+            root = ElementTree.fromstring(response.content)
+            for item in root.iter(f"{namespace}Contents"):
+                modified = datetime.fromisoformat(item.findtext(f"{namespace}LastModified").replace("Z", "+00:00"))
+                yield StoredObject(
+                    key=item.findtext(f"{namespace}Key")[len(base):],
+                    size=int(item.findtext(f"{namespace}Size")),
+                    modified=modified.astimezone(timezone.utc).replace(tzinfo=None),
+                )
+            token = root.findtext(f"{namespace}NextContinuationToken")
+            if root.findtext(f"{namespace}IsTruncated") != "true" or not token:
+                break
+            query["continuation-token"] = token
+
+    async def move(self, key: str, new_key: str) -> None:
+        """Server-side CopyObject, then DELETE; the bytes never pass through the API"""
+        source = self._object_path(key)
+        headers = self._signed_headers("PUT", new_key, amz_headers={"x-amz-copy-source": source})
+        response = await self._get_client().put(self._url(new_key), headers=headers)
+        if response.status_code == 404:
+            raise FileNotFoundError(key)
+        if response.status_code >= 300:
+            raise StorageError(f"S3 COPY {key} failed with {response.status_code}")
+        await self.delete(key)
+
+    async def presigned_url(
+        self,
+        key: str,
+        filename: str,
+        expires: int,
+        content_type: Optional[str] = None,
+        content_encoding: Optional[str] = None,
+    ) -> str:
+        """Query-string signed GET; the bucket takes response headers from the response-* parameters"""
+        amz_date = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        scope = f"{amz_date[:8]}/{self.region}/s3/aws4_request"
+        query = {
+            "X-Amz-Algorithm": "AWS4-HMAC-SHA256",
+            "X-Amz-Credential": f"{self.access_key_id}/{scope}",
+            "X-Amz-Date": amz_date,
+            "X-Amz-Expires": str(expires),
+            "X-Amz-SignedHeaders": "host",
+            "response-content-disposition": content_disposition(filename),
+        }
+        if content_type:
+            query["response-content-type"] = content_type
+        if content_encoding:
+            query["response-content-encoding"] = content_encoding
+        path = self._object_path(key)
+        _, _, signature = self._signature(
+            "GET", path, query, {"host": urlsplit(self.public_url).netloc}, UNSIGNED_PAYLOAD, amz_date
+        )
+        query["X-Amz-Signature"] = signature
+        query_string = "&".join(f"{quote(k, safe='~')}={quote(v, safe='~')}" for k, v in sorted(query.items()))
+        return f"{self.public_url}{path}?{query_string}"
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+def create_storage_backend() -> StorageBackend:
+    """Build the storage backend selected by STORAGE_BACKEND"""
+    if settings.STORAGE_BACKEND == "s3":
+        return S3StorageBackend(
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            bucket=settings.S3_BUCKET,
+            region=settings.S3_REGION,
+            access_key_id=settings.S3_ACCESS_KEY_ID,
+            secret_access_key=settings.S3_SECRET_ACCESS_KEY,
+            key_prefix=settings.S3_KEY_PREFIX,
+            public_url=settings.S3_PUBLIC_URL,
+            max_connections=settings.S3_MAX_CONNECTIONS,
+            timeout=settings.S3_TIMEOUT_SECONDS,
+        )
+    return LocalStorageBackend(settings.UPLOAD_DIR)
+
+
+storage = create_storage_backend()
@@ -0,0 +1,177 @@
+import asyncio
+import logging
+import os
+import shutil
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional
+from sqlalchemy import select, update, or_, and_
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.upload import UploadSession, UploadSessionStatus
+
+logger = logging.getLogger(__name__)
+
+SESSIONS_DIR = ".sessions"
+
+# A session stuck in "completing" this long past expiry lost its request (crash, restart)
+COMPLETING_GRACE = timedelta(hours=1)
+# Directories without a session row may belong to a session being created
+UNKNOWN_DIR_GRACE_SECONDS = 3600
+
+
+def sessions_root() -> Path:
+    return Path(settings.UPLOAD_DIR) / SESSIONS_DIR
+
+
+def session_dir(session_id: str) -> Path:
+    """Directory holding the uploaded parts of a session"""
+    return sessions_root() / session_id
+
+
+def part_path(session_id: str, part_number: int) -> Path:
+    return session_dir(session_id) / f"{part_number:06d}.part"
+
+
+class UploadSessionSweeper:
+    """
+    Cleans up resumable uploads nobody finished
+    - Sessions past expires_at are marked aborted, in batches, and their
+      part directories removed
+    - Part directories left behind by finished sessions (a crash between
+      commit and cleanup) or without any session row are removed too
+    """
+
+    def __init__(self, interval_seconds: int, batch_size: int = 500):
+        self.interval = interval_seconds
+        self.batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+        # Counters
+        self.runs = 0
+        self.failed_runs = 0
+        self.sessions_expired = 0
+        self.directories_removed = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        if self.running or self.interval <= 0:
+            return
+        self._task = asyncio.create_task(self._run(), name="upload-session-sweeper")
+
+    async def stop(self) -> None:
+        if not self.running:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def run_once(self) -> dict:
+        async with self._lock:
+            try:
+                result = {
+                    "expired": await self._expire(datetime.utcnow()),
+                    "directories_removed": await self._remove_stale_dirs(),
+                }
+            except Exception:
+                self.failed_runs += 1
+                raise
+        self.runs += 1
+        return result
+
+    async def _expire(self, now: datetime) -> int:
+        expired = 0
+        while True:
+            async with AsyncSessionLocal() as db:
+                due = await db.execute(
+                    select(UploadSession.id)
+                    .where(or_(
+                        and_(UploadSession.status == UploadSessionStatus.active, UploadSession.expires_at < now),
+                        and_(
+                            UploadSession.status == UploadSessionStatus.completing,
+                            UploadSession.expires_at < now - COMPLETING_GRACE,
+                        ),
+                    ))
+                    .limit(self.batch_size)
+                )
+                ids = due.scalars().all()
+                if not ids:
+                    break
+                # Only sessions still in the state we saw; a completion may have won meanwhile
+                await db.execute(
+                    update(UploadSession)
+                    .where(
+                        UploadSession.id.in_(ids),
+                        UploadSession.status.in_([UploadSessionStatus.active, UploadSessionStatus.completing]),
+                    )
+                    .values(status=UploadSessionStatus.aborted)
+                )
+                await db.commit()
+            for session_id in ids:
+                await run_in_threadpool(shutil.rmtree, session_dir(session_id), True)
+            expired += len(ids)
+            self.sessions_expired += len(ids)
+        if expired:
+            logger.info("Aborted %d expired upload sessions", expired)
+        return expired
+
+    async def _remove_stale_dirs(self) -> int:
+        names = await run_in_threadpool(self._list_dirs)
+        if not names:
+            return 0
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(UploadSession.id, UploadSession.status).where(UploadSession.id.in_(list(names)))
+            )
+            statuses = dict(result.all())
+        removed = 0
+        cutoff = time.time() - UNKNOWN_DIR_GRACE_SECONDS
+        for name, mtime in names.items():
+            state = statuses.get(name)
+            if state in (UploadSessionStatus.active, UploadSessionStatus.completing):
+                continue
+            if state is None and mtime > cutoff:
+                continue
+            await run_in_threadpool(shutil.rmtree, session_dir(name), True)
+            removed += 1
+        self.directories_removed += removed
+        return removed
+
+    @staticmethod
+    def _list_dirs() -> dict:
+        """Session directory name -> mtime"""
+        try:
+            with os.scandir(sessions_root()) as entries:
+                return {e.name: e.stat().st_mtime for e in entries if e.is_dir(follow_symlinks=False)}
+        except FileNotFoundError:
+            return {}
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception:
+                logger.exception("Upload session sweep failed")
+            await asyncio.sleep(self.interval)
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "interval_seconds": self.interval,
+            "runs": self.runs,
+            "failed_runs": self.failed_runs,
+            "sessions_expired": self.sessions_expired,
+            "directories_removed": self.directories_removed,
+        }
+
+
+upload_session_sweeper = UploadSessionSweeper(interval_seconds=settings.UPLOAD_SESSION_SWEEP_INTERVAL_SECONDS)
@@ -0,0 +1,278 @@
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncIterator, BinaryIO, Optional
+from fastapi import HTTPException, Request, status
+from multipart.multipart import MultipartParser, parse_options_header
+from multipart.exceptions import MultipartParseError
+from starlette.concurrency import run_in_threadpool
+
+# Allowance for multipart framing (boundaries, part headers) on top of the file itself
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class UploadTooLarge(Exception):
+    """Raised when an upload stream exceeds the configured maximum size"""
+
+    def __init__(self, max_size: int):
+        super().__init__(f"Upload exceeds maximum size of {max_size} bytes")
+        self.max_size = max_size
+
+
+class MultipartError(Exception):
+    """Raised when a multipart/form-data body is malformed or lacks the expected file"""
+
+
+@dataclass
+class SpooledUpload:
+    """A fully received upload sitting in a temp file next to its final location"""
+    temp_path: Path
+    size: int
+    content_hash: str
+
+
+def _open_temp(directory: Path) -> BinaryIO:
+    return tempfile.NamedTemporaryFile(
+        dir=directory, prefix=".upload-", suffix=".part", delete=False
+    )
+
+
+def _write_chunk(fh: BinaryIO, hasher, chunk: bytes) -> None:
+    # hashlib releases the GIL for large buffers, so hashing here is effectively free
+    hasher.update(chunk)
+    fh.write(chunk)
+
+
+def _discard(path: Path) -> None:
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+async def spool_stream(
+    chunks: AsyncIterator[bytes],
+    directory: Path,
+    max_size: int,
+    chunk_size: int,
+) -> SpooledUpload:
+    """
+    Copy an async byte stream into a temp file inside `directory`
+    - Incoming chunks are coalesced into `chunk_size` writes
+    - Reads and writes run in the threadpool, never on the event loop
+    - Size and SHA-256 are computed incrementally
+    - Aborts as soon as the stream grows past `max_size`
+    """
+    fh = await run_in_threadpool(_open_temp, directory)
+    temp_path = Path(fh.name)
+    hasher = hashlib.sha256()
+    buffer = bytearray()
+    size = 0
+
+    try:
+        async for chunk in chunks:
+            if not chunk:
+                continue
+            size += len(chunk)
+            if size > max_size:
+                raise UploadTooLarge(max_size)
+            buffer += chunk
+            if len(buffer) >= chunk_size:
+                await run_in_threadpool(_write_chunk, fh, hasher, bytes(buffer))
+                buffer.clear()
+        if buffer:
+            await run_in_threadpool(_write_chunk, fh, hasher, bytes(buffer))
+        await run_in_threadpool(fh.flush)
+        await run_in_threadpool(os.fsync, fh.fileno())
+    except BaseException:
+        await run_in_threadpool(fh.close)
+        await run_in_threadpool(_discard, temp_path)
+        raise
+
+    await run_in_threadpool(fh.close)
+    return SpooledUpload(temp_path=temp_path, size=size, content_hash=hasher.hexdigest())
+
+
+async def commit_upload(spooled: SpooledUpload, destination: Path) -> None:
+    """Atomically move a spooled upload to its final path"""
+    await run_in_threadpool(os.replace, spooled.temp_path, destination)
+
+
+async def discard_upload(spooled: SpooledUpload) -> None:
+    """Remove a spooled upload that will not be committed"""
+    await run_in_threadpool(_discard, spooled.temp_path)
+
+
+def check_content_length(request: Request, max_size: int, overhead: int = 0) -> None:
+    """
+    Refuse a body whose declared length is over `max_size` (plus `overhead`
+    for framing around the content) before reading any of it
+    """
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > max_size + overhead:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Upload exceeds maximum size of {max_size} bytes"
+        )
+
+
+class MultipartFileStream:
+    """
+    One file field of a multipart/form-data request, parsed off the raw request stream
+    An UploadFile parameter makes Starlette write the whole body to a temp file
+    before the endpoint runs; this hands the field's bytes over as they arrive,
+    so size limits apply mid-stream and the content hits the disk once
+    - start() reads up to the field's part headers and returns its filename
+    - chunks() then yields the field's content; other fields are skipped
+    """
+
+    def __init__(self, request: Request, field_name: str):
+        content_type, params = parse_options_header(request.headers.get("content-type", ""))
+        if content_type != b"multipart/form-data" or b"boundary" not in params:
+            raise MultipartError("Expected a multipart/form-data body")
+        self.field_name = field_name
+        self.filename: Optional[str] = None
+        self._stream = request.stream()
+        self._parser = MultipartParser(params[b"boundary"], {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        })
+        self._header_name = b""
+        self._header_value = b""
+        self._disposition = b""
+        self._in_field = False
+        self._field_ended = False
+        self._pending: list = []  # Field content parsed from the current request chunk
+
+    def _on_part_begin(self) -> None:
+        self._disposition = b""
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_name += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        if self._header_name.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_name = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._disposition)
+        name = options.get(b"name", b"").decode("latin-1")
+        if name == self.field_name and b"filename" in options and self.filename is None:
+            self.filename = _decode_header(options[b"filename"])
+            self._in_field = True
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._in_field:
+            self._pending.append(data[start:end])
+
+    def _on_part_end(self) -> None:
+        if self._in_field:
+            self._in_field = False
+            self._field_ended = True
+
+    async def _feed(self) -> bool:
+        """Parse the next chunk of the request body; False once it is exhausted"""
+        chunk = await anext(self._stream, None)
+        if chunk is None:
+            return False
+        try:
+            self._parser.write(chunk)
+        except MultipartParseError as e:
+            raise MultipartError(f"Malformed multipart body: {e}")
+        return True
+
+    async def start(self) -> str:
+        while self.filename is None:
+            if not await self._feed():
+                raise MultipartError(f"Missing file field '{self.field_name}'")
+        return self.filename
+
+    async def chunks(self) -> AsyncIterator[bytes]:
+        while True:
+            if self._pending:
+                data = b"".join(self._pending)
+                self._pending.clear()
+                yield data
+            if self._field_ended:
+                return
+            if not await self._feed():
+                raise MultipartError("Request body ended inside the file")
+
+
+def _decode_header(value: bytes) -> str:
+    try:
+        return value.decode("utf-8")
+    except UnicodeDecodeError:
+        return value.decode("latin-1")
+
+
+async def receive_upload(
+    chunks: AsyncIterator[bytes],
+    directory: Path,
+    max_size: int,
+    chunk_size: int,
+) -> SpooledUpload:
+    """
+    Stream an upload body into a temp file inside `directory` (see spool_stream)
+    Translates failures into HTTP errors suitable for the upload endpoints
+    """
+    try:
+        return await spool_stream(chunks, directory, max_size, chunk_size)
+    except UploadTooLarge as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e)
+        )
+    except MultipartError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except OSError as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to save file: {str(e)}"
+        )
+
+
+def _assemble(part_paths: list, directory: Path, chunk_size: int) -> SpooledUpload:
+    fh = _open_temp(directory)
+    temp_path = Path(fh.name)
+    hasher = hashlib.sha256()
+    size = 0
+    try:
+        with fh:
+            for part_path in part_paths:
+                with open(part_path, "rb") as part:
+                    while True:
+                        chunk = part.read(chunk_size)
+                        if not chunk:
+                            break
+                        size += len(chunk)
+                        _write_chunk(fh, hasher, chunk)
+            fh.flush()
+            os.fsync(fh.fileno())
+    except BaseException:
+        _discard(temp_path)
+        raise
+    return SpooledUpload(temp_path=temp_path, size=size, content_hash=hasher.hexdigest())
+
+
+async def assemble_parts(part_paths: list, directory: Path, chunk_size: int) -> SpooledUpload:
+    """
+    Concatenate uploaded parts, in the given order, into a temp file inside `directory`
+    Runs entirely in the threadpool and hashes the assembled content on the way
+    """
+    return await run_in_threadpool(_assemble, part_paths, directory, chunk_size)
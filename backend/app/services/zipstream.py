@@ -0,0 +1,221 @@
+import struct
+import zlib
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import PurePosixPath
+from typing import AsyncIterator, Callable, Optional
+from starlette.concurrency import run_in_threadpool
+
+# Formats that are already compressed: deflating them again costs CPU for nothing
+STORED_EXTENSIONS = {
+    '.zip', '.rar', '.7z', '.gz', '.bz2', '.xz',
+    '.jpg', '.jpeg', '.png', '.gif', '.webp',
+    '.mp4', '.avi', '.mov', '.mp3',
+    '.pdf', '.docx', '.xlsx', '.pptx',
+}
+
+METHOD_STORED = 0
+METHOD_DEFLATED = 8
+
+FLAG_DATA_DESCRIPTOR = 0x08
+FLAG_UTF8 = 0x800
+
+# Entries at least this large get ZIP64 sizes. Kept well below 4 GiB so
+# deflate expanding incompressible data cannot overflow a 32-bit field.
+ZIP64_ENTRY_LIMIT = (1 << 31) - 1
+ZIP32_MAX = 0xFFFFFFFF
+
+LOCAL_HEADER = struct.Struct("<4sHHHHHIIIHH")
+CENTRAL_HEADER = struct.Struct("<4sHHHHHHIIIHHHHHII")
+DATA_DESCRIPTOR = struct.Struct("<4sIII")
+DATA_DESCRIPTOR64 = struct.Struct("<4sIQQ")
+END_RECORD = struct.Struct("<4sHHHHIIH")
+END_RECORD64 = struct.Struct("<4sQHHIIQQQQ")
+END_LOCATOR64 = struct.Struct("<4sIQI")
+
+
+@dataclass
+class ZipEntry:
+    """
+    One archive member; `open` returns an async iterator over its bytes
+    `size` may be None for generated content; such members always get ZIP64 sizes
+    """
+    name: str
+    size: Optional[int]
+    modified: datetime
+    open: Callable[[], AsyncIterator[bytes]]
+    method: int = METHOD_STORED
+
+    @property
+    def zip64(self) -> bool:
+        return self.size is None or self.size >= ZIP64_ENTRY_LIMIT
+
+
+def compression_for(filename: str) -> int:
+    """Store already-compressed formats, deflate everything else"""
+    if PurePosixPath(filename).suffix.lower() in STORED_EXTENSIONS:
+        return METHOD_STORED
+    return METHOD_DEFLATED
+
+
+def unique_names(names: list) -> list:
+    """
+    Archive-safe member names: no directories, no duplicates
+    A repeated name becomes "name (2).ext", "name (3).ext", ...
+    """
+    seen = set()
+    result = []
+    for name in names:
+        base = PurePosixPath(name.replace("\\", "/")).name.strip() or "file"
+        if base in (".", ".."):
+            base = "file"
+        candidate = base
+        counter = 2
+        while candidate.lower() in seen:
+            stem = PurePosixPath(base)
+            candidate = f"{stem.stem} ({counter}){stem.suffix}"
+            counter += 1
+        seen.add(candidate.lower())
+        result.append(candidate)
+    return result
+
+
+def _dos_datetime(value: datetime) -> tuple:
+    if value.year < 1980:
+        value = datetime(1980, 1, 1)
+    dos_time = (value.hour << 11) | (value.minute << 5) | (value.second // 2)
+    dos_date = ((value.year - 1980) << 9) | (value.month << 5) | value.day
+    return dos_time, dos_date
+
+
+def _version(zip64: bool) -> int:
+    return 45 if zip64 else 20
+
+
+def _local_header(entry: ZipEntry) -> bytes:
+    """Local header; CRC and sizes follow the data in a data descriptor"""
+    name = entry.name.encode("utf-8")
+    dos_time, dos_date = _dos_datetime(entry.modified)
+    extra = b""
+    sizes = 0
+    if entry.zip64:
+        extra = struct.pack("<HHQQ", 0x0001, 16, 0, 0)
+        sizes = ZIP32_MAX
+    return LOCAL_HEADER.pack(
+        b"PK\x03\x04", _version(entry.zip64), FLAG_DATA_DESCRIPTOR | FLAG_UTF8,
+        entry.method, dos_time, dos_date, 0, sizes, sizes, len(name), len(extra),
+    ) + name + extra
+
+
+def _data_descriptor(entry: ZipEntry, crc: int, compressed_size: int, size: int) -> bytes:
+    if entry.zip64:
+        return DATA_DESCRIPTOR64.pack(b"PK\x07\x08", crc, compressed_size, size)
+    return DATA_DESCRIPTOR.pack(b"PK\x07\x08", crc, compressed_size, size)
+
+
+def _central_header(entry: ZipEntry, crc: int, compressed_size: int, size: int, offset: int) -> bytes:
+    name = entry.name.encode("utf-8")
+    dos_time, dos_date = _dos_datetime(entry.modified)
+    zip64_fields = []
+    size_field, compressed_field, offset_field = size, compressed_size, offset
+    if entry.zip64:
+        zip64_fields += [size, compressed_size]
+        size_field = compressed_field = ZIP32_MAX
+    if offset >= ZIP32_MAX:
+        zip64_fields.append(offset)
+        offset_field = ZIP32_MAX
+    extra = b""
+    if zip64_fields:
+        extra = struct.pack(f"<HH{len(zip64_fields)}Q", 0x0001, 8 * len(zip64_fields), *zip64_fields)
+    version = _version(bool(zip64_fields))
+    return CENTRAL_HEADER.pack(
+        b"PK\x01\x02", (3 << 8) | version, version, FLAG_DATA_DESCRIPTOR | FLAG_UTF8,
+        entry.method, dos_time, dos_date, crc, compressed_field, size_field,
+        len(name), len(extra), 0, 0, 0, 0o100644 << 16, offset_field,
+    ) + name + extra
+
+
+def _end_records(count: int, directory_size: int, directory_offset: int) -> bytes:
+    records = b""
+    if count >= 0xFFFF or directory_size >= ZIP32_MAX or directory_offset >= ZIP32_MAX:
+        end64_offset = directory_offset + directory_size
+        records += END_RECORD64.pack(
+            b"PK\x06\x06", END_RECORD64.size - 12, 45, 45, 0, 0,
+            count, count, directory_size, directory_offset,
+        )
+        records += END_LOCATOR64.pack(b"PK\x06\x07", 0, end64_offset, 1)
+        count = min(count, 0xFFFF)
+        directory_size = min(directory_size, ZIP32_MAX)
+        directory_offset = min(directory_offset, ZIP32_MAX)
+    return records + END_RECORD.pack(b"PK\x05\x06", 0, 0, count, count, directory_size, directory_offset, 0)
+
+
+def archive_size(entries: list) -> Optional[int]:
+    """
+    Exact size of the archive stream_zip() will produce, or None when any
+    entry is deflated (its compressed size is only known afterwards) or of
+    unknown size
+    """
+    if any(entry.method != METHOD_STORED or entry.size is None for entry in entries):
+        return None
+    offset = 0
+    directory_size = 0
+    for entry in entries:
+        directory_size += len(_central_header(entry, 0, entry.size, entry.size, offset))
+        offset += len(_local_header(entry)) + entry.size + len(_data_descriptor(entry, 0, entry.size, entry.size))
+    return offset + directory_size + len(_end_records(len(entries), directory_size, offset))
+
+
+def _deflate(compressor, crc: int, chunk: bytes) -> tuple:
+    return zlib.crc32(chunk, crc), compressor.compress(chunk)
+
+
+async def stream_zip(entries: list, compress_level: int = 6) -> AsyncIterator[bytes]:
+    """
+    Yield a ZIP archive of `entries` as it is built
+    - Member data is read and emitted chunk by chunk; memory stays bounded
+      by the source chunk size, never by file or archive size
+    - Deflate runs in the threadpool; stored members are only CRC'd
+    - Raises ValueError if a member's byte count differs from its declared size
+    """
+    offset = 0
+    directory = []
+
+    for entry in entries:
+        header = _local_header(entry)
+        yield header
+
+        crc = 0
+        read = 0
+        compressed_size = 0
+        compressor = None
+        if entry.method == METHOD_DEFLATED:
+            compressor = zlib.compressobj(compress_level, zlib.DEFLATED, -15)
+
+        async for chunk in entry.open():
+            read += len(chunk)
+            if compressor is None:
+                crc = zlib.crc32(chunk, crc)
+            else:
+                crc, chunk = await run_in_threadpool(_deflate, compressor, crc, chunk)
+            if chunk:
+                compressed_size += len(chunk)
+                yield chunk
+        if compressor is not None:
+            tail = compressor.flush()
+            compressed_size += len(tail)
+            yield tail
+
+        if entry.size is not None and read != entry.size:
+            raise ValueError(f"{entry.name}: expected {entry.size} bytes, read {read}")
+
+        descriptor = _data_descriptor(entry, crc, compressed_size, read)
+        yield descriptor
+        directory.append(_central_header(entry, crc, compressed_size, read, offset))
+        offset += len(header) + compressed_size + len(descriptor)
+
+    directory_size = 0
+    for record in directory:
+        directory_size += len(record)
+        yield record
+    yield _end_records(len(entries), directory_size, offset)
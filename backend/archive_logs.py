@@ -0,0 +1,69 @@
+"""
+Script to archive old access logs and reclaim database space
+Usage: python archive_logs.py [--full-vacuum]
+
+Moves access_logs rows older than LOG_RETENTION_DAYS into monthly gzip NDJSON
+archives in the storage backend, then returns the freed pages to the
+filesystem with incremental vacuum. The API does this periodically
+(LOG_ARCHIVE_INTERVAL_SECONDS); both are safe while the API is serving.
+
+--full-vacuum rewrites the whole database with VACUUM afterwards. Run it once,
+with the API stopped, on databases created before DB_AUTO_VACUUM existed:
+that is what switches them to incremental auto-vacuum.
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.core.config import settings
+from app.db.session import engine, init_db
+from app.services.log_archive import log_archiver, database_stats
+
+
+def megabytes(size: int) -> str:
+    return f"{size / (1024 * 1024):,.1f} MiB"
+
+
+async def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Archive old access logs")
+    parser.add_argument("--full-vacuum", action="store_true", help="VACUUM the whole database afterwards")
+    args = parser.parse_args()
+
+    print("=" * 50)
+    print("  Xianyu Order API - Archive Access Logs")
+    print("=" * 50)
+    print()
+
+    await init_db()
+    before = await database_stats()
+
+    if log_archiver.enabled:
+        print(f"📦 Archiving logs of months before {log_archiver.cutoff():%Y-%m} ...")
+    else:
+        print("⏭️  LOG_RETENTION_DAYS is 0: nothing is archived")
+    result = await log_archiver.run_once()
+
+    if args.full_vacuum:
+        print("🧹 Running VACUUM (rewrites the whole database) ...")
+        async with engine.connect() as conn:
+            await conn.exec_driver_sql(f"PRAGMA auto_vacuum={settings.DB_AUTO_VACUUM}")
+            await conn.exec_driver_sql("VACUUM")
+            await conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    after = await database_stats()
+    print("✅ Archival complete")
+    print(f"   Months archived: {', '.join(result['months']) or 'none'}")
+    print(f"   Rows archived:   {result['rows']}")
+    print(f"   Pages vacuumed:  {result['pages_vacuumed']}")
+    print(f"   Database size:   {megabytes(before['file_bytes'])} -> {megabytes(after['file_bytes'])}")
+    print(f"   Auto-vacuum:     {after['auto_vacuum']}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
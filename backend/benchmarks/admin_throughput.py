@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Admin endpoint throughput with and without the auth caches
+
+Replays the dashboard's small authenticated calls (order detail and list)
+with --concurrency workers for --seconds. Run once against a server started
+with AUTH_CACHE_ENABLED=true and once with AUTH_CACHE_ENABLED=false.
+
+Usage: python benchmarks/admin_throughput.py --concurrency 32
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from common import API, base_parser, client, login, create_order, summarize, timer
+
+
+async def worker(http, headers: dict, urls: list, until: float, latencies: list, errors: list):
+    i = 0
+    while timer() < until:
+        start = timer()
+        resp = await http.get(urls[i % len(urls)], headers=headers)
+        if resp.status_code != 200:
+            errors.append(resp.status_code)
+        latencies.append(timer() - start)
+        i += 1
+
+
+async def main():
+    parser = base_parser(__doc__)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=15)
+    args = parser.parse_args()
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with client(args, limits=limits) as http:
+        headers = await login(http, args)
+        order = await create_order(http, headers)
+        urls = [f"{API}/admin/orders/{order['id']}", f"{API}/admin/orders/?limit=10"]
+
+        latencies, errors = [], []
+        until = timer() + args.seconds
+        start = timer()
+        await asyncio.gather(*[
+            worker(http, headers, urls, until, latencies, errors) for _ in range(args.concurrency)
+        ])
+        elapsed = timer() - start
+        stats = (await http.get(f"{API}/admin/system/stats", headers=headers)).json()
+
+    print(f"🚀 {len(latencies) / elapsed:.0f} req/s over {elapsed:.1f}s, {len(errors)} errors")
+    print("📊 " + summarize("admin calls", latencies))
+    print(f"🔑 token cache: {stats.get('token_cache')}, admin cache: {stats.get('admin_cache')}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
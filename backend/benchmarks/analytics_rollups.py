@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Access-log analytics: raw GROUP BY on access_logs vs. rollup reads
+
+Seeds a standalone SQLite database with the app's schema and --rows access
+log rows (spread over --days and --orders orders, the first order getting
+--hot-share of them), builds the rollups with the same code the API uses
+(rollups.rebuild), then times, for the hot order:
+
+- summary: events per action, per file and distinct IPs, as GROUP BY /
+  COUNT(DISTINCT) over access_logs vs. rollups.summary()
+- daily series over 30 and 365 days vs. rollups.timeseries()
+
+and finally the cost of one 500-row access log flush with and without
+rollup maintenance. No server needed.
+
+Usage: python benchmarks/analytics_rollups.py --rows 10000000 --db /tmp/analytics_bench.db
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument("--db", default="/tmp/analytics_bench.db")
+parser.add_argument("--rows", type=int, default=10_000_000)
+parser.add_argument("--orders", type=int, default=1000)
+parser.add_argument("--days", type=int, default=365)
+parser.add_argument("--hot-share", type=float, default=0.3)
+parser.add_argument("--repeat", type=int, default=5)
+parser.add_argument("--reuse", action="store_true", help="Skip seeding if the DB exists")
+args = parser.parse_args()
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+os.environ["SQLITE_URL"] = f"sqlite+aiosqlite:///{args.db}"
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("UPLOAD_DIR", "/tmp")
+
+from sqlalchemy import text
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal, init_db, engine
+from app.services import rollups
+from app.services.access_log import AccessLogWriter
+
+FILES = [f"deliverable-{i}.zip" for i in range(10)]
+HOT_ORDER = 1
+
+
+def random_row(n: int, start: datetime, step: timedelta, orders: int, hot_share: float) -> tuple:
+    order_id = HOT_ORDER if random.random() < hot_share else random.randint(2, orders)
+    roll = random.random()
+    if roll < 0.8:
+        action, target = "VISIT_PAGE", None
+    elif roll < 0.98:
+        action, target = "DOWNLOAD_SUCCESS", random.choice(FILES)
+    else:
+        action, target = "DOWNLOAD_BUNDLE", "bundle.zip"
+    ip = f"10.{random.randint(0, 3)}.{random.randint(0, 255)}.{random.randint(0, 255)}"
+    return order_id, ip, "bench-agent", action, target, (start + step * n).isoformat(" ", "microseconds")
+
+
+def seed_logs(path: str, rows: int, orders: int, days: int, hot_share: float):
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA synchronous=OFF")
+    now = datetime.utcnow()
+    conn.executemany(
+        "INSERT INTO orders (id, access_key, client_name, status, created_at) VALUES (?, ?, ?, 'pending', ?)",
+        [(i, f"key{i:09d}", f"client {i}", now.isoformat(" ")) for i in range(1, orders + 1)],
+    )
+    start = now - timedelta(days=days)
+    step = timedelta(days=days) / rows
+    sql = ("INSERT INTO access_logs (order_id, ip_address, user_agent, action_type, target_file, timestamp)"
+           " VALUES (?, ?, ?, ?, ?, ?)")
+    batch = []
+    for n in range(rows):
+        batch.append(random_row(n, start, step, orders, hot_share))
+        if len(batch) == 100000:
+            conn.executemany(sql, batch)
+            conn.commit()
+            batch.clear()
+            print(f"  seeded {n + 1:,} rows", end="\r")
+    if batch:
+        conn.executemany(sql, batch)
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+    print()
+
+
+async def timed(label: str, fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - start)
+    best = min(samples)
+    print(f"  {label:<40}{1000 * best:>12.2f}ms")
+    return best
+
+
+async def raw_summary():
+    async with AsyncSessionLocal() as db:
+        await db.execute(text(
+            "SELECT action_type, COUNT(*) FROM access_logs WHERE order_id = :o GROUP BY action_type"
+        ), {"o": HOT_ORDER})
+        await db.execute(text(
+            "SELECT target_file, action_type, COUNT(*) FROM access_logs"
+            " WHERE order_id = :o AND target_file IS NOT NULL GROUP BY target_file, action_type"
+        ), {"o": HOT_ORDER})
+        await db.execute(text(
+            "SELECT COUNT(DISTINCT ip_address) FROM access_logs WHERE order_id = :o"
+        ), {"o": HOT_ORDER})
+
+
+async def rollup_summary():
+    async with AsyncSessionLocal() as db:
+        await rollups.summary(db, HOT_ORDER)
+
+
+def raw_series(days: int):
+    async def run():
+        since = datetime.utcnow() - timedelta(days=days)
+        async with AsyncSessionLocal() as db:
+            await db.execute(text(
+                "SELECT date(timestamp), action_type, COUNT(*), COUNT(DISTINCT ip_address) FROM access_logs"
+                " WHERE order_id = :o AND timestamp >= :since GROUP BY 1, 2"
+            ), {"o": HOT_ORDER, "since": since.isoformat(" ")})
+    return run
+
+
+def rollup_series(days: int):
+    async def run():
+        end = datetime.utcnow()
+        async with AsyncSessionLocal() as db:
+            await rollups.timeseries(db, HOT_ORDER, "day", end - timedelta(days=days), end)
+    return run
+
+
+async def flush_cost(enabled: bool, batches: int = 20) -> float:
+    settings.ACCESS_ROLLUPS_ENABLED = enabled
+    writer = AccessLogWriter(batch_size=500, flush_interval_ms=200, max_queue=1000, enqueue_timeout_ms=50)
+    now = datetime.utcnow()
+    total = 0.0
+    for _ in range(batches):
+        rows = []
+        for n in range(500):
+            order_id, ip, agent, action, target, _ = random_row(n, now, timedelta(0), args.orders, args.hot_share)
+            rows.append({"order_id": order_id, "ip_address": ip, "user_agent": agent,
+                         "action_type": action, "target_file": target, "timestamp": datetime.utcnow()})
+        start = time.perf_counter()
+        await writer._flush(rows)
+        total += time.perf_counter() - start
+    return total / batches
+
+
+async def main():
+    if not (args.reuse and os.path.exists(args.db)):
+        if os.path.exists(args.db):
+            os.remove(args.db)
+        await init_db()
+        print(f"🌱 Seeding {args.rows:,} rows into {args.db} ...")
+        seed_logs(args.db, args.rows, args.orders, args.days, args.hot_share)
+
+        print("🧮 Building rollups with rollups.rebuild() ...")
+        start = time.perf_counter()
+        async with AsyncSessionLocal() as db:
+            order_ids = (await db.execute(text("SELECT id FROM orders ORDER BY id"))).scalars().all()
+        for order_id in order_ids:
+            await rollups.rebuild(order_id)
+        print(f"   {args.rows:,} rows in {time.perf_counter() - start:.1f}s "
+              f"({args.rows / (time.perf_counter() - start):,.0f} rows/s)")
+
+    async with AsyncSessionLocal() as db:
+        hot_rows = (await db.execute(text(
+            "SELECT COUNT(*) FROM access_logs WHERE order_id = :o"), {"o": HOT_ORDER})).scalar_one()
+        rollup_rows = (await db.execute(text(
+            "SELECT COUNT(*) FROM access_rollups WHERE order_id = :o"), {"o": HOT_ORDER})).scalar_one()
+    print(f"📦 order {HOT_ORDER}: {hot_rows:,} log rows, {rollup_rows:,} rollup rows\n")
+
+    print(f"  {'query (best of ' + str(args.repeat) + ')':<40}{'latency':>14}")
+    raw = await timed("summary: raw GROUP BY + COUNT(DISTINCT)", raw_summary, args.repeat)
+    rolled = await timed("summary: rollups", rollup_summary, args.repeat)
+    print(f"  {'':<40}{raw / rolled:>12.0f}x\n")
+    for days in (30, 365):
+        raw = await timed(f"{days}-day series: raw GROUP BY", raw_series(days), args.repeat)
+        rolled = await timed(f"{days}-day series: rollups", rollup_series(days), args.repeat)
+        print(f"  {'':<40}{raw / rolled:>12.0f}x\n")
+
+    without = await flush_cost(False)
+    with_rollups = await flush_cost(True)
+    print(f"✍️  500-row log flush: {1000 * without:.1f}ms without rollups, "
+          f"{1000 * with_rollups:.1f}ms with (+{1000 * (with_rollups - without):.1f}ms)")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Order onboarding: one POST per order vs. the bulk create endpoints
+
+Creates --count orders three ways and reports orders/second for each:
+
+- single: POST /admin/orders/ once per order, --concurrency at a time
+- bulk JSON: POST /admin/orders/bulk with --batch orders per request
+- bulk CSV: POST /admin/orders/bulk/csv with --batch rows per upload
+
+Every created order is kept; run it against a scratch database.
+
+Usage: python benchmarks/bulk_orders.py --count 1000 --batch 1000
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from common import API, base_parser, client, login, summarize, timer
+
+
+async def single(http, headers: dict, count: int, concurrency: int) -> tuple:
+    latencies = []
+    queue = asyncio.Queue()
+    for i in range(count):
+        queue.put_nowait(i)
+
+    async def worker():
+        while not queue.empty():
+            i = queue.get_nowait()
+            start = timer()
+            resp = await http.post(f"{API}/admin/orders/", json={"client_name": f"single {i}"}, headers=headers)
+            resp.raise_for_status()
+            latencies.append(timer() - start)
+
+    start = timer()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return timer() - start, latencies
+
+
+async def bulk_json(http, headers: dict, count: int, batch: int) -> tuple:
+    latencies = []
+    start = timer()
+    for offset in range(0, count, batch):
+        orders = [{"client_name": f"bulk {i}", "status": "pending"} for i in range(offset, min(count, offset + batch))]
+        request_start = timer()
+        resp = await http.post(f"{API}/admin/orders/bulk", json=orders, headers=headers)
+        resp.raise_for_status()
+        assert resp.json()["created"] == len(orders)
+        latencies.append(timer() - request_start)
+    return timer() - start, latencies
+
+
+async def bulk_csv(http, headers: dict, count: int, batch: int) -> tuple:
+    latencies = []
+    start = timer()
+    for offset in range(0, count, batch):
+        rows = [f"csv {i},imported,pending" for i in range(offset, min(count, offset + batch))]
+        body = ("client_name,description,status\n" + "\n".join(rows) + "\n").encode()
+        request_start = timer()
+        resp = await http.post(
+            f"{API}/admin/orders/bulk/csv", files={"file": ("orders.csv", body, "text/csv")}, headers=headers
+        )
+        resp.raise_for_status()
+        assert resp.json()["created"] == len(rows)
+        latencies.append(timer() - request_start)
+    return timer() - start, latencies
+
+
+async def main():
+    parser = base_parser(__doc__)
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--batch", type=int, default=1000, help="Orders per bulk request")
+    parser.add_argument("--concurrency", type=int, default=1, help="Parallel single-create requests")
+    args = parser.parse_args()
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with client(args, limits=limits) as http:
+        headers = await login(http, args)
+
+        results = {}
+        results["single"] = await single(http, headers, args.count, args.concurrency)
+        results["bulk JSON"] = await bulk_json(http, headers, args.count, args.batch)
+        results["bulk CSV"] = await bulk_csv(http, headers, args.count, args.batch)
+
+    baseline = args.count / results["single"][0]
+    print(f"🏭 {args.count} orders per method, bulk batches of {args.batch}\n")
+    for name, (elapsed, latencies) in results.items():
+        rate = args.count / elapsed
+        print(f"  {name:<10}{rate:>10,.0f} orders/s  {elapsed:>7.2f}s  {rate / baseline:>6.1f}x")
+        print(f"  {'':<10}{summarize('requests', latencies)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+ZIP bundle download: throughput and server memory
+
+Creates an order with --files files totalling --total-mb (default 300 files,
+2 GiB), then downloads /client/{key}/bundle.zip --downloads times and reports
+MiB/s, server peak RSS and CPU (needs --server-pid). --text-share is the
+fraction of files uploaded as .txt, which are deflated; the rest are .zip and
+stored, so with the default of 0 the response carries a Content-Length.
+
+Usage: python benchmarks/bundle_download.py --server-pid <uvicorn pid>
+"""
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from common import API, base_parser, client, login, create_order, read_cpu_seconds, RssSampler, timer
+
+TEXT_LINE = b"The quick brown fox jumps over the lazy dog 0123456789\n"
+
+
+def payload(index: int, size: int, text: bool) -> bytes:
+    if text:
+        return (TEXT_LINE * (size // len(TEXT_LINE) + 1))[:size]
+    # Distinct per file so the blob store does not deduplicate them
+    block = os.urandom(min(size, 1024 * 1024))
+    return (block * (size // len(block) + 1))[:size]
+
+
+async def main():
+    parser = base_parser(__doc__)
+    parser.add_argument("--files", type=int, default=300)
+    parser.add_argument("--total-mb", type=int, default=2048)
+    parser.add_argument("--text-share", type=float, default=0.0)
+    parser.add_argument("--downloads", type=int, default=3)
+    parser.add_argument("--upload-concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    size = args.total_mb * 1024 * 1024 // args.files
+    text_files = int(args.files * args.text_share)
+
+    async with client(args) as http:
+        headers = await login(http, args)
+        order = await create_order(http, headers, "bundle-bench")
+        key = order["access_key"]
+
+        semaphore = asyncio.Semaphore(args.upload_concurrency)
+
+        async def upload(index: int):
+            text = index < text_files
+            name = f"file-{index:04d}.{'txt' if text else 'zip'}"
+            async with semaphore:
+                resp = await http.post(
+                    f"{API}/files/upload",
+                    params={"access_key": key, "file_type": "source"},
+                    files={"file": (name, payload(index, size, text))},
+                    headers=headers,
+                )
+                resp.raise_for_status()
+
+        print(f"📤 Uploading {args.files} files of {size / (1024 * 1024):.1f}MiB ({text_files} text)...")
+        await asyncio.gather(*[upload(i) for i in range(args.files)])
+
+        received = []
+        content_length = None
+        cpu_before = read_cpu_seconds(args.server_pid) if args.server_pid else None
+        with RssSampler(args.server_pid) as rss:
+            start = timer()
+            for _ in range(args.downloads):
+                total = 0
+                async with http.stream("GET", f"{API}/client/{key}/bundle.zip") as resp:
+                    resp.raise_for_status()
+                    content_length = resp.headers.get("content-length")
+                    async for chunk in resp.aiter_raw():
+                        total += len(chunk)
+                received.append(total)
+            elapsed = timer() - start
+        cpu_after = read_cpu_seconds(args.server_pid) if args.server_pid else None
+
+    total_mb = sum(received) / (1024 * 1024)
+    print(f"📦 {args.downloads} x {received[0] / (1024 * 1024):.1f}MiB bundle in {elapsed:.2f}s: "
+          f"{total_mb / elapsed:.1f} MiB/s")
+    print(f"📏 Content-Length: {content_length or 'not sent (deflated members)'}")
+    print(f"🧠 {rss.report()}")
+    if cpu_before is not None and cpu_after is not None:
+        cpu = cpu_after - cpu_before
+        print(f"🔥 server CPU: {cpu:.2f}s total, {1000 * cpu / args.downloads:.0f}ms per bundle")
+    else:
+        print("🔥 server CPU: pass --server-pid to measure")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,131 @@
+"""
+Shared helpers for the benchmark scripts
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from typing import Optional
+
+try:
+    import httpx
+except ImportError:
+    raise SystemExit("❌ Benchmarks require httpx: pip install httpx")
+
+
+API = "/api/v1"
+
+
+def base_parser(description: str) -> argparse.ArgumentParser:
+    """Argument parser with the options shared by every benchmark"""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="admin123")
+    parser.add_argument("--server-pid", type=int, default=None)
+    return parser
+
+
+def client(args, **kwargs) -> httpx.AsyncClient:
+    kwargs.setdefault("timeout", httpx.Timeout(600.0))
+    return httpx.AsyncClient(base_url=args.base_url, **kwargs)
+
+
+async def login(http: httpx.AsyncClient, args) -> dict:
+    """Log in and return Authorization headers"""
+    resp = await http.post(
+        f"{API}/auth/login",
+        data={"username": args.username, "password": args.password},
+    )
+    resp.raise_for_status()
+    return {"Authorization": f"Bearer {resp.json()['access_token']}"}
+
+
+async def create_order(http: httpx.AsyncClient, headers: dict, name: str = "bench") -> dict:
+    resp = await http.post(f"{API}/admin/orders/", json={"client_name": name}, headers=headers)
+    resp.raise_for_status()
+    return resp.json()
+
+
+def percentile(samples: list, pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(name: str, latencies: list) -> str:
+    """One-line latency summary in milliseconds"""
+    ms = [x * 1000 for x in latencies]
+    if not ms:
+        return f"{name}: no samples"
+    return (
+        f"{name}: n={len(ms)} mean={statistics.mean(ms):.1f}ms "
+        f"p50={percentile(ms, 50):.1f}ms p99={percentile(ms, 99):.1f}ms max={max(ms):.1f}ms"
+    )
+
+
+def read_rss_kb(pid: int) -> Optional[int]:
+    """Current resident set size of a process in KiB (Linux only)"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def read_cpu_seconds(pid: int) -> Optional[float]:
+    """User + system CPU time consumed by a process (Linux only)"""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+    except OSError:
+        return None
+    ticks = os.sysconf("SC_CLK_TCK")
+    return (int(fields[11]) + int(fields[12])) / ticks
+
+
+class RssSampler:
+    """Samples a process's RSS in the background and keeps the peak"""
+
+    def __init__(self, pid: Optional[int], interval: float = 0.05):
+        self.pid = pid
+        self.interval = interval
+        self.peak_kb = 0
+        self.baseline_kb = 0
+        self._task = None
+
+    async def _run(self):
+        while True:
+            rss = read_rss_kb(self.pid)
+            if rss is not None:
+                self.peak_kb = max(self.peak_kb, rss)
+            await asyncio.sleep(self.interval)
+
+    def __enter__(self):
+        if self.pid:
+            self.baseline_kb = read_rss_kb(self.pid) or 0
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return self
+
+    def __exit__(self, *exc):
+        if self._task:
+            self._task.cancel()
+
+    def report(self) -> str:
+        if not self.pid:
+            return "RSS: pass --server-pid to sample server memory"
+        return (
+            f"RSS: baseline={self.baseline_kb / 1024:.1f}MiB "
+            f"peak={self.peak_kb / 1024:.1f}MiB "
+            f"delta={(self.peak_kb - self.baseline_kb) / 1024:.1f}MiB"
+        )
+
+
+def timer() -> float:
+    return time.perf_counter()
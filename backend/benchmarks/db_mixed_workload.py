@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Mixed read/write throughput on the existing endpoints
+
+--concurrency workers run a mix of reads (client info/files, admin order
+list and logs) and writes (order create/update) for --seconds. Compare a
+server started with the default engine profile against one started with
+the old behaviour, e.g.:
+
+    DB_ECHO=true DB_JOURNAL_MODE=DELETE DB_SYNCHRONOUS=FULL python main.py
+
+Usage: python benchmarks/db_mixed_workload.py --write-ratio 0.2
+"""
+import asyncio
+import random
+import sys
+from collections import Counter
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from common import API, base_parser, client, login, create_order, summarize, timer
+
+
+async def worker(http, headers, orders, write_ratio, until, latencies, outcomes):
+    while timer() < until:
+        order = random.choice(orders)
+        start = timer()
+        if random.random() < write_ratio:
+            if random.random() < 0.5:
+                resp = await http.post(f"{API}/admin/orders/", json={"client_name": "mixed"}, headers=headers)
+                kind = "write:create"
+            else:
+                resp = await http.patch(
+                    f"{API}/admin/orders/{order['id']}",
+                    json={"description": f"touched {random.random()}"},
+                    headers=headers,
+                )
+                kind = "write:update"
+        else:
+            choice = random.randrange(4)
+            if choice == 0:
+                resp = await http.get(f"{API}/client/{order['access_key']}/info")
+                kind = "read:info"
+            elif choice == 1:
+                resp = await http.get(f"{API}/client/{order['access_key']}/files")
+                kind = "read:files"
+            elif choice == 2:
+                resp = await http.get(f"{API}/admin/orders/", params={"limit": 20}, headers=headers)
+                kind = "read:list"
+            else:
+                resp = await http.get(f"{API}/admin/orders/{order['id']}/logs", headers=headers)
+                kind = "read:logs"
+        latencies.setdefault(kind, []).append(timer() - start)
+        outcomes[resp.status_code] += 1
+
+
+async def main():
+    parser = base_parser(__doc__)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--orders", type=int, default=50)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    args = parser.parse_args()
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with client(args, limits=limits) as http:
+        headers = await login(http, args)
+        orders = [await create_order(http, headers, f"mixed {i}") for i in range(args.orders)]
+
+        latencies, outcomes = {}, Counter()
+        until = timer() + args.seconds
+        start = timer()
+        await asyncio.gather(*[
+            worker(http, headers, orders, args.write_ratio, until, latencies, outcomes)
+            for _ in range(args.concurrency)
+        ])
+        elapsed = timer() - start
+
+    total = sum(len(v) for v in latencies.values())
+    print(f"🚀 {total / elapsed:.0f} req/s over {elapsed:.1f}s, status codes {dict(outcomes)}")
+    for kind in sorted(latencies):
+        print("📊 " + summarize(kind, latencies[kind]))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
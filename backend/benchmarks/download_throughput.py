@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Download throughput and server CPU cost per download
+
+Uploads one --size-mb file, then downloads it --downloads times with
+--concurrency parallel clients and reports MB/s plus server CPU% (needs
+--server-pid). Start the server with FILE_SERVE_MODE=inline or, behind
+nginx, FILE_SERVE_MODE=x-accel-redirect and point --base-url at nginx to
+compare the modes; run against the previous revision for the old
+line-iterating generator.
+
+Usage: python benchmarks/download_throughput.py --server-pid <uvicorn pid>
+"""
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from common import API, base_parser, client, login, create_order, read_cpu_seconds, timer
+
+
+async def download(http, url: str, params: dict) -> int:
+    received = 0
+    async with http.stream("GET", url, params=params) as resp:
+        resp.raise_for_status()
+        async for chunk in resp.aiter_raw():
+            received += len(chunk)
+    return received
+
+
+async def main():
+    parser = base_parser(__doc__)
+    parser.add_argument("--size-mb", type=int, default=200)
+    parser.add_argument("--downloads", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    async with client(args) as http:
+        headers = await login(http, args)
+        order = await create_order(http, headers)
+        key = order["access_key"]
+
+        payload = os.urandom(1024 * 1024) * args.size_mb
+        resp = await http.post(
+            f"{API}/files/upload",
+            params={"access_key": key, "file_type": "source"},
+            files={"file": ("bench.zip", payload, "application/zip")},
+            headers=headers,
+        )
+        resp.raise_for_status()
+        file_id = resp.json()["id"]
+        del payload
+
+        url = f"{API}/files/download/{file_id}"
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def one():
+            async with semaphore:
+                return await download(http, url, {"access_key": key})
+
+        cpu_before = read_cpu_seconds(args.server_pid) if args.server_pid else None
+        start = timer()
+        sizes = await asyncio.gather(*[one() for _ in range(args.downloads)])
+        elapsed = timer() - start
+        cpu_after = read_cpu_seconds(args.server_pid) if args.server_pid else None
+
+    total_mb = sum(sizes) / (1024 * 1024)
+    print(f"📥 {args.downloads} x {args.size_mb}MiB in {elapsed:.2f}s: {total_mb / elapsed:.1f} MiB/s")
+    if cpu_before is not None and cpu_after is not None:
+        cpu = cpu_after - cpu_before
+        print(f"🔥 server CPU: {cpu:.2f}s total, {100 * cpu / elapsed:.1f}% avg, "
+              f"{1000 * cpu / args.downloads:.1f}ms per download")
+    else:
+        print("🔥 server CPU: pass --server-pid to measure")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+OFFSET vs. keyset pagination on a large access_logs table
+
+Seeds a standalone SQLite database with the app's schema and --rows access
+log rows (spread over --orders orders, the first order getting --hot-share
+of them), then times one page of 100 rows at increasing depths with
+OFFSET/LIMIT + COUNT(*) (old get_order_logs) and with a (timestamp, id)
+keyset cursor (new get_order_logs). No server needed.
+
+Usage: python benchmarks/log_pagination.py --rows 5000000 --db /tmp/logs_bench.db
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("UPLOAD_DIR", "/tmp")
+
+from sqlalchemy import create_engine
+from app.db.session import Base, _create_missing_indexes
+import app.models.order, app.models.log, app.models.file  # noqa: F401  (register tables)
+
+PAGE = 100
+COLUMNS = "id, order_id, ip_address, user_agent, action_type, target_file, timestamp"
+
+
+def seed(path: str, rows: int, orders: int, hot_share: float):
+    if os.path.exists(path):
+        os.remove(path)
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        Base.metadata.create_all(conn)
+        _create_missing_indexes(conn)
+    engine.dispose()
+
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+    now = datetime.utcnow()
+    conn.executemany(
+        "INSERT INTO orders (id, access_key, client_name, status, created_at) VALUES (?, ?, ?, 'pending', ?)",
+        [(i, f"key{i:09d}", f"client {i}", now) for i in range(1, orders + 1)],
+    )
+    start = now - timedelta(days=365)
+    step = timedelta(days=365) / rows
+    batch = []
+    for n in range(rows):
+        order_id = 1 if random.random() < hot_share else random.randint(2, orders)
+        batch.append((order_id, f"10.0.{n % 256}.{n % 200}", "bench-agent", "VISIT_PAGE", None,
+                      (start + step * n).isoformat(" ")))
+        if len(batch) == 100000:
+            conn.executemany(
+                "INSERT INTO access_logs (order_id, ip_address, user_agent, action_type, target_file, timestamp)"
+                " VALUES (?, ?, ?, ?, ?, ?)", batch)
+            conn.commit()
+            batch.clear()
+            print(f"  seeded {n + 1:,} rows", end="\r")
+    if batch:
+        conn.executemany(
+            "INSERT INTO access_logs (order_id, ip_address, user_agent, action_type, target_file, timestamp)"
+            " VALUES (?, ?, ?, ?, ?, ?)", batch)
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+    print()
+
+
+def timed(conn, sql, params):
+    start = time.perf_counter()
+    rows = conn.execute(sql, params).fetchall()
+    return time.perf_counter() - start, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--db", default="/tmp/logs_bench.db")
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--orders", type=int, default=1000)
+    parser.add_argument("--hot-share", type=float, default=0.5)
+    parser.add_argument("--reuse", action="store_true", help="Skip seeding if the DB exists")
+    args = parser.parse_args()
+
+    if not (args.reuse and os.path.exists(args.db)):
+        print(f"🌱 Seeding {args.rows:,} rows into {args.db} ...")
+        seed(args.db, args.rows, args.orders, args.hot_share)
+
+    conn = sqlite3.connect(args.db)
+    order_id = 1
+    (hot_rows,) = conn.execute("SELECT COUNT(*) FROM access_logs WHERE order_id = ?", (order_id,)).fetchone()
+    print(f"📦 order {order_id} has {hot_rows:,} log rows\n")
+
+    offset_sql = (f"SELECT {COLUMNS} FROM access_logs WHERE order_id = ? "
+                  "ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?")
+    count_sql = "SELECT COUNT(id) FROM access_logs WHERE order_id = ?"
+    keyset_sql = (f"SELECT {COLUMNS} FROM access_logs WHERE order_id = ? AND (timestamp, id) < (?, ?) "
+                  "ORDER BY timestamp DESC, id DESC LIMIT ?")
+
+    print(f"{'depth':>10} {'offset+count':>14} {'keyset':>10}")
+    for depth in (0, 1_000, 10_000, 100_000, 1_000_000, hot_rows - PAGE):
+        if depth < 0 or depth >= hot_rows:
+            continue
+        t_offset, rows = timed(conn, offset_sql, (order_id, PAGE, depth))
+        t_count, _ = timed(conn, count_sql, (order_id,))
+        if depth == 0:
+            t_keyset, _ = timed(conn, offset_sql, (order_id, PAGE, 0))
+        else:
+            # Cursor = last row of the previous page
+            prev = conn.execute(offset_sql, (order_id, 1, depth - 1)).fetchone()
+            t_keyset, _ = timed(conn, keyset_sql, (order_id, prev[6], prev[0], PAGE))
+        print(f"{depth:>10,} {1000 * (t_offset + t_count):>12.1f}ms {1000 * t_keyset:>8.2f}ms")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Client latency during a login storm
+
+Runs --attackers workers sending wrong passwords (spread over fake
+X-Forwarded-For addresses and usernames so the rate limiter does not stop
+them all) while --pollers workers call /client/{key}/info, then reports
+the client p99 and how the login attempts were answered (401/429/503).
+
+Usage: python benchmarks/login_storm.py --attackers 50 --seconds 20
+"""
+import asyncio
+import sys
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from common import API, base_parser, client, login, create_order, summarize, timer
+
+
+async def attacker(http, index: int, until: float, outcomes: Counter):
+    n = 0
+    while timer() < until:
+        resp = await http.post(
+            f"{API}/auth/login",
+            data={"username": f"user{index}-{n % 50}", "password": "wrong"},
+            headers={"X-Forwarded-For": f"10.{index % 256}.{n % 256}.1"},
+        )
+        outcomes[resp.status_code] += 1
+        n += 1
+
+
+async def poller(http, url: str, until: float, latencies: list):
+    while timer() < until:
+        start = timer()
+        resp = await http.get(url)
+        resp.raise_for_status()
+        latencies.append(timer() - start)
+        await asyncio.sleep(0.01)
+
+
+async def main():
+    parser = base_parser(__doc__)
+    parser.add_argument("--attackers", type=int, default=50)
+    parser.add_argument("--pollers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=20)
+    args = parser.parse_args()
+
+    async with client(args) as http:
+        headers = await login(http, args)
+        order = await create_order(http, headers)
+        url = f"{API}/client/{order['access_key']}/info"
+
+        # Baseline without the storm
+        baseline = []
+        await poller(http, url, timer() + 3, baseline)
+
+        latencies, outcomes = [], Counter()
+        until = timer() + args.seconds
+        await asyncio.gather(
+            *[attacker(http, i, until, outcomes) for i in range(args.attackers)],
+            *[poller(http, url, until, latencies) for _ in range(args.pollers)],
+        )
+
+    print("📊 " + summarize("info (idle)", baseline))
+    print("📊 " + summarize("info (login storm)", latencies))
+    print(f"🔐 login responses: {dict(outcomes)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
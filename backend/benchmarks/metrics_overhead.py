@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Cost of the metrics instrumentation on the client page path
+
+Hammers /client/{key}/info with --concurrency workers for --seconds and
+reports req/s, latency and, with --server-pid, server CPU per request (the
+steadiest of the three when client and server share cores). Run once against
+a server started with METRICS_ENABLED=true and once with
+METRICS_ENABLED=false; with metrics on it also checks that the server counted
+every request.
+
+Usage: python benchmarks/metrics_overhead.py --concurrency 32 --seconds 20
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from common import API, base_parser, client, login, create_order, read_cpu_seconds, summarize, timer
+
+ROUTE = 'route="/api/v1/client/{access_key}/info"'
+
+
+async def worker(http, url: str, until: float, latencies: list, errors: list):
+    while timer() < until:
+        start = timer()
+        resp = await http.get(url)
+        if resp.status_code != 200:
+            errors.append(resp.status_code)
+        latencies.append(timer() - start)
+
+
+def counted_requests(exposition: str) -> int:
+    """Sum of http_requests_total samples for the client info route"""
+    total = 0
+    for line in exposition.splitlines():
+        if line.startswith("http_requests_total{") and ROUTE in line:
+            total += int(float(line.rsplit(" ", 1)[1]))
+    return total
+
+
+async def main():
+    parser = base_parser(__doc__)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--warmup", type=float, default=3, help="Seconds of unrecorded load first")
+    args = parser.parse_args()
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with client(args, limits=limits) as http:
+        headers = await login(http, args)
+        order = await create_order(http, headers)
+        url = f"{API}/client/{order['access_key']}/info"
+
+        await asyncio.gather(*[worker(http, url, timer() + args.warmup, [], []) for _ in range(args.concurrency)])
+
+        metrics = await http.get("/metrics")
+        before = counted_requests(metrics.text) if metrics.status_code == 200 else None
+
+        latencies, errors = [], []
+        cpu_before = read_cpu_seconds(args.server_pid) if args.server_pid else None
+        until = timer() + args.seconds
+        start = timer()
+        await asyncio.gather(*[
+            worker(http, url, until, latencies, errors) for _ in range(args.concurrency)
+        ])
+        elapsed = timer() - start
+        cpu_after = read_cpu_seconds(args.server_pid) if args.server_pid else None
+
+        metrics = await http.get("/metrics")
+        after = counted_requests(metrics.text) if metrics.status_code == 200 else None
+
+    print(f"🚀 {len(latencies) / elapsed:.0f} req/s over {elapsed:.1f}s, {len(errors)} errors")
+    print("📊 " + summarize("client info", latencies))
+    if cpu_before is not None and cpu_after is not None:
+        print(f"🔥 server CPU: {1e6 * (cpu_after - cpu_before) / len(latencies):.0f}us per request")
+    if before is None:
+        print("📏 metrics: disabled (/metrics not served)")
+    else:
+        print(f"📏 metrics: server counted {after - before} of {len(latencies)} requests")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Parallel large uploads vs. client read latency
+
+Uploads --uploads files of --size-mb each in parallel while polling
+/client/{key}/info, then reports the info-call latency distribution and
+the server's peak RSS.
+
+Usage: python benchmarks/upload_concurrency.py --server-pid <uvicorn pid>
+"""
+import asyncio
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from common import API, base_parser, client, login, create_order, summarize, RssSampler, timer
+
+
+def make_payload(size_mb: int) -> str:
+    """Write a random payload once so the client side stays cheap"""
+    fd, path = tempfile.mkstemp(suffix=".zip")
+    block = os.urandom(1024 * 1024)
+    with os.fdopen(fd, "wb") as f:
+        for _ in range(size_mb):
+            f.write(block)
+    return path
+
+
+async def upload(http, headers, access_key: str, payload: str):
+    with open(payload, "rb") as f:
+        resp = await http.post(
+            f"{API}/files/upload",
+            params={"access_key": access_key, "file_type": "source"},
+            files={"file": ("bench.zip", f, "application/zip")},
+            headers=headers,
+        )
+    resp.raise_for_status()
+
+
+async def poll_info(http, access_key: str, stop: asyncio.Event, latencies: list):
+    while not stop.is_set():
+        start = timer()
+        resp = await http.get(f"{API}/client/{access_key}/info")
+        resp.raise_for_status()
+        latencies.append(timer() - start)
+        await asyncio.sleep(0.01)
+
+
+async def main():
+    parser = base_parser(__doc__)
+    parser.add_argument("--uploads", type=int, default=10)
+    parser.add_argument("--size-mb", type=int, default=500)
+    parser.add_argument("--pollers", type=int, default=4)
+    args = parser.parse_args()
+
+    payload = make_payload(args.size_mb)
+    try:
+        async with client(args) as http:
+            headers = await login(http, args)
+            order = await create_order(http, headers)
+            key = order["access_key"]
+
+            latencies = []
+            stop = asyncio.Event()
+            with RssSampler(args.server_pid) as rss:
+                pollers = [
+                    asyncio.create_task(poll_info(http, key, stop, latencies))
+                    for _ in range(args.pollers)
+                ]
+                start = timer()
+                await asyncio.gather(*[
+                    upload(http, headers, key, payload) for _ in range(args.uploads)
+                ])
+                elapsed = timer() - start
+                stop.set()
+                await asyncio.gather(*pollers)
+
+        total_mb = args.uploads * args.size_mb
+        print(f"📤 {args.uploads} x {args.size_mb}MiB uploaded in {elapsed:.1f}s "
+              f"({total_mb / elapsed:.1f} MiB/s)")
+        print("📊 " + summarize("/client/{key}/info", latencies))
+        print("🧠 " + rss.report())
+    finally:
+        os.unlink(payload)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
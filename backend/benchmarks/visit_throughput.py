@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Sustained /client/{key}/info throughput
+
+Hammers the client landing call with --concurrency workers for --seconds
+and prints requests/second, latency percentiles and the access log writer
+counters from /admin/system/stats (dropped rows, back-pressure waits).
+
+Usage: python benchmarks/visit_throughput.py --concurrency 64 --seconds 20
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from common import API, base_parser, client, login, create_order, summarize, timer
+
+
+async def worker(http, url: str, until: float, latencies: list, errors: list):
+    while timer() < until:
+        start = timer()
+        resp = await http.get(url)
+        if resp.status_code != 200:
+            errors.append(resp.status_code)
+        latencies.append(timer() - start)
+
+
+async def main():
+    parser = base_parser(__doc__)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--path", default="/client/{key}/info")
+    args = parser.parse_args()
+
+    limits = {"max_connections": args.concurrency, "max_keepalive_connections": args.concurrency}
+    async with client(args) as http:
+        headers = await login(http, args)
+        order = await create_order(http, headers)
+        url = API + args.path.format(key=order["access_key"])
+
+    async with client(args, limits=httpx.Limits(**limits)) as http:
+        latencies, errors = [], []
+        until = timer() + args.seconds
+        start = timer()
+        await asyncio.gather(*[
+            worker(http, url, until, latencies, errors) for _ in range(args.concurrency)
+        ])
+        elapsed = timer() - start
+
+        await asyncio.sleep(1)  # let the log writer catch up
+        stats = (await http.get(f"{API}/admin/system/stats", headers=headers)).json()
+
+    print(f"🚀 {len(latencies) / elapsed:.0f} req/s over {elapsed:.1f}s, {len(errors)} errors")
+    print("📊 " + summarize(args.path, latencies))
+    print(f"📝 {stats.get('access_log')}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -2,8 +2,14 @@
 """
 Backend项目健康检查脚本
 检查所有必要文件是否存在，导入是否正常
+传入服务地址时，还会探测运行中服务的 /health/live 和 /health/ready
+
+Usage: python check_health.py [http://localhost:8000]
 """
 import sys
+import json
+import urllib.error
+import urllib.request
 from pathlib import Path
 import importlib.util
 
@@ -20,6 +26,7 @@ required_files = [
     "app/core/security.py",
     "app/core/deps.py",
     "app/db/session.py",
+    "app/services/health.py",
     "app/models/admin.py",
     "app/models/order.py",
     "app/models/file.py",
@@ -80,6 +87,37 @@ for dir_path in required_dirs:
         print(f"  ❌ {dir_path}/ - 缺失!")
 
 print()
+
+
+def probe(base_url: str, path: str):
+    """GET a health endpoint; returns (status code, JSON body)"""
+    try:
+        with urllib.request.urlopen(base_url.rstrip("/") + path, timeout=10) as resp:
+            return resp.status, json.load(resp)
+    except urllib.error.HTTPError as e:
+        # 503 from /health/ready still carries the check results
+        return e.code, json.load(e)
+
+
+if len(sys.argv) > 1:
+    base_url = sys.argv[1]
+    print(f"🌐 探测运行中的服务: {base_url}")
+    try:
+        code, live = probe(base_url, "/health/live")
+        print(f"  {'✅' if code == 200 else '❌'} /health/live - 事件循环延迟 {live.get('loop_lag_ms')}ms")
+        code, ready = probe(base_url, "/health/ready")
+    except (urllib.error.URLError, OSError, ValueError) as e:
+        print(f"  ❌ 无法连接服务: {e}")
+        sys.exit(1)
+    for name, check in ready.get("checks", {}).items():
+        details = {k: v for k, v in check.items() if k not in ("ok", "latency_ms")}
+        print(f"  {'✅' if check['ok'] else '❌'} {name} ({check['latency_ms']}ms) {json.dumps(details, ensure_ascii=False)}")
+    if code != 200:
+        print(f"❌ 服务未就绪 (HTTP {code})")
+        sys.exit(1)
+    print("✅ 服务已就绪!")
+    print()
+
 print("=" * 60)
 print("  健康检查完成!")
 print("=" * 60)
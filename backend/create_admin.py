@@ -12,6 +12,7 @@ sys.path.insert(0, str(Path(__file__).parent))
 from app.db.session import AsyncSessionLocal, init_db
 from app.models.admin import Admin
 from app.core.security import get_password_hash
+from app.services.admin_cache import admin_cache
 
 
 async def create_admin(username: str, password: str):
@@ -38,6 +39,10 @@ async def create_admin(username: str, password: str):
         db.add(admin)
         await db.commit()
         
+        # Drop any cached principal for this username in running workers
+        # (reaches other processes when CACHE_BACKEND=sqlite)
+        await admin_cache.invalidate(username)
+        
         print(f"✅ Admin '{username}' created successfully!")
         print(f"   Username: {username}")
         print(f"   Password: {password}")
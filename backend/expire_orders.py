@@ -0,0 +1,56 @@
+"""
+Script to mark orders past their expiry date as expired
+Usage: python expire_orders.py [--action mark|purge_files|delete]
+
+Sets status "expired" on orders whose expires_at has passed. With
+purge_files it also deletes the files of orders expired for more than
+ORDER_EXPIRY_PURGE_AFTER_DAYS; with delete it removes those orders entirely.
+The API does this periodically (ORDER_EXPIRY_SWEEP_INTERVAL_SECONDS, with
+ORDER_EXPIRY_ACTION); it is safe while serving.
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.core.config import settings
+from app.db.session import engine, init_db
+from app.services.blob_gc import deletion_worker
+from app.services.order_expiry import expiry_sweeper
+from app.services.storage import storage
+
+
+async def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Mark expired orders")
+    parser.add_argument(
+        "--action", choices=["mark", "purge_files", "delete"], default=settings.ORDER_EXPIRY_ACTION,
+        help="What to do with long-expired orders (default: ORDER_EXPIRY_ACTION)",
+    )
+    args = parser.parse_args()
+
+    print("=" * 50)
+    print("  Xianyu Order API - Expire Orders")
+    print("=" * 50)
+    print()
+
+    await init_db()
+    expiry_sweeper.action = args.action
+    print(f"⏰ Sweeping expired orders (action: {args.action}) ...")
+    await deletion_worker.start()
+    result = await expiry_sweeper.run_once()
+    await deletion_worker.stop()
+
+    print("✅ Sweep complete")
+    print(f"   Orders marked expired:  {result['expired']}")
+    print(f"   Orders purged of files: {result['purged']}")
+    print(f"   Orders deleted:         {result['deleted']}")
+    await storage.close()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,123 @@
+"""
+Script to move legacy UUID-named uploads into the content-addressed blob store
+Usage: python migrate_blobs.py [--dry-run]
+
+Blobs go to the configured STORAGE_BACKEND, so this also uploads legacy
+files to S3 when that is in use. Files with identical content collapse into
+one blob; the report at the end shows how much disk space that reclaimed.
+Safe to re-run: already migrated rows are skipped.
+"""
+import asyncio
+import hashlib
+import sys
+from pathlib import Path
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent))
+
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal, init_db
+from app.models.blob import Blob
+from app.models.file import File
+from app.models.order import Order  # noqa: F401  (registers the table files references)
+from app.services import blob_store
+from app.services.storage import storage
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(path: Path) -> str:
+    """SHA-256 of a file, read in chunks"""
+    hasher = hashlib.sha256()
+    with open(path, "rb") as fh:
+        while True:
+            chunk = fh.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def format_size(size: int) -> str:
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TiB"
+
+
+async def migrate(dry_run: bool):
+    """Migrate every legacy File row"""
+    await init_db()
+
+    migrated = 0
+    duplicates = 0
+    missing = 0
+    reclaimed = 0
+    seen = set()
+
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(File).order_by(File.id))
+        files = [f for f in result.scalars().all() if not blob_store.is_digest(f.filename_saved)]
+        print(f"📦 {len(files)} legacy file(s) to migrate")
+
+        for db_file in files:
+            legacy_path = Path(settings.UPLOAD_DIR) / db_file.filename_saved
+            if not legacy_path.exists():
+                print(f"⚠️  Missing on disk: {db_file.filename_saved} (file id {db_file.id})")
+                missing += 1
+                continue
+
+            digest = await asyncio.to_thread(hash_file, legacy_path)
+
+            existing = await db.execute(select(Blob.digest).where(Blob.digest == digest))
+            duplicate = digest in seen or existing.scalar_one_or_none() is not None
+            seen.add(digest)
+            if duplicate:
+                duplicates += 1
+                reclaimed += db_file.file_size
+            migrated += 1
+
+            if dry_run:
+                continue
+
+            # Blob first, then the row, then drop the legacy name: a crash at
+            # any point leaves every row pointing at bytes that exist
+            if not duplicate:
+                await storage.put_file(
+                    blob_store.storage_key(digest), legacy_path, content_sha256=digest, move=False
+                )
+            await db.execute(
+                insert(Blob)
+                .values(digest=digest, size=db_file.file_size, ref_count=1)
+                .on_conflict_do_update(index_elements=[Blob.digest], set_={"ref_count": Blob.ref_count + 1})
+            )
+            db_file.filename_saved = digest
+            db_file.content_hash = digest
+            await db.commit()
+            await asyncio.to_thread(legacy_path.unlink)
+
+    print()
+    print("✅ Dry run complete" if dry_run else "✅ Migration complete")
+    print(f"   Files migrated:    {migrated}")
+    print(f"   Duplicates merged: {duplicates}")
+    print(f"   Missing on disk:   {missing}")
+    print(f"   Space reclaimed:   {format_size(reclaimed)}")
+    
+    await storage.close()
+
+
+async def main():
+    """Main function"""
+    print("=" * 50)
+    print("  Xianyu Order API - Migrate Files to Blob Store")
+    print("=" * 50)
+    print()
+
+    await migrate(dry_run="--dry-run" in sys.argv[1:])
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
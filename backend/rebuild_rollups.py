@@ -0,0 +1,50 @@
+"""
+Script to rebuild the access-log rollups used by the analytics endpoints
+Usage: python rebuild_rollups.py [--order-id N]
+
+Recomputes hourly/daily counts and unique-IP sketches from access_logs, for
+one order or all of them. The API maintains the rollups as logs are written;
+run this once after upgrading to backfill existing logs. Safe to run while
+the API is serving: each order is swapped in one short transaction.
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent))
+
+from sqlalchemy import select
+from app.db.session import AsyncSessionLocal, init_db
+from app.models.order import Order
+from app.services import rollups
+
+
+async def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Rebuild access-log rollups")
+    parser.add_argument("--order-id", type=int, default=None)
+    args = parser.parse_args()
+
+    print("=" * 50)
+    print("  Xianyu Order API - Rebuild Access Rollups")
+    print("=" * 50)
+    print()
+
+    await init_db()
+    if args.order_id is not None:
+        order_ids = [args.order_id]
+    else:
+        async with AsyncSessionLocal() as db:
+            order_ids = (await db.execute(select(Order.id).order_by(Order.id))).scalars().all()
+
+    for done, order_id in enumerate(order_ids, 1):
+        await rollups.rebuild(order_id)
+        print(f"  rebuilt {done}/{len(order_ids)} orders", end="\r")
+    print()
+    print(f"✅ Rollups rebuilt for {len(order_ids)} order(s)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
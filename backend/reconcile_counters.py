@@ -0,0 +1,39 @@
+"""
+Script to recompute the denormalized Order counters in bulk
+Usage: python reconcile_counters.py
+
+Re-derives file_count, total_bytes, visit_count, download_count and
+last_access_at of every order from the files and access_logs tables and
+repairs the rows that drifted. The API also does this periodically
+(ORDER_COUNTERS_RECONCILE_INTERVAL_SECONDS); run this after restoring a
+backup or editing rows by hand. Safe to run while the API is serving.
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.core.config import settings
+from app.db.session import init_db
+from app.services.order_stats import reconcile
+
+
+async def main():
+    """Main function"""
+    print("=" * 50)
+    print("  Xianyu Order API - Reconcile Order Counters")
+    print("=" * 50)
+    print()
+
+    await init_db()
+    result = await reconcile(settings.ORDER_COUNTERS_RECONCILE_BATCH_SIZE)
+
+    print("✅ Reconciliation complete")
+    print(f"   Orders checked:  {result['checked']}")
+    print(f"   Orders repaired: {result['drifted']}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,54 @@
+"""
+Script to find stored files nothing references any more
+Usage: python reconcile_storage.py [--dry-run]
+
+Lists the storage backend (blobs, log archives and legacy top-level uploads)
+and compares it with the database, in key order and in constant memory.
+Objects no row references, older than ORPHAN_GRACE_SECONDS, are moved to
+.quarantine/<date>/ and deleted after ORPHAN_QUARANTINE_DAYS; files the
+database references but storage lacks are reported. The API does this
+periodically (ORPHAN_RECONCILE_INTERVAL_SECONDS); it is safe while serving.
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.db.session import engine, init_db
+from app.services.blob_gc import orphan_reconciler, QUARANTINE_PREFIX
+from app.services.storage import storage
+
+
+async def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Quarantine orphaned stored files")
+    parser.add_argument("--dry-run", action="store_true", help="Report only; move and delete nothing")
+    args = parser.parse_args()
+
+    print("=" * 50)
+    print("  Xianyu Order API - Reconcile Storage")
+    print("=" * 50)
+    print()
+
+    await init_db()
+    print(f"🔍 Comparing storage with the database{' (dry run)' if args.dry_run else ''} ...")
+    result = await orphan_reconciler.run_once(dry_run=args.dry_run)
+
+    print("✅ Reconciliation complete")
+    print(f"   Objects scanned:    {result['scanned']}")
+    print(f"   Orphans:            {result['orphans']} ({result['orphan_bytes']:,} bytes)"
+          f"{'' if args.dry_run else f' -> {QUARANTINE_PREFIX}/'}")
+    print(f"   Too recent to tell: {result['recent']}")
+    print(f"   Purged:             {result['purged']}")
+    print(f"   Missing:            {result['missing']}")
+    for key in orphan_reconciler.missing_sample:
+        print(f"     - {key}")
+    await storage.close()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,49 @@
+"""
+Script to check a signed access log export against its manifest
+Usage: python verify_export.py order-<id>-access-logs-signed.zip
+
+Recomputes the SHA-256 of the exported file, compares it and the size with
+manifest.json, and checks the manifest's HMAC signature. Needs the same
+SECRET_KEY as the server that made the export.
+"""
+import hashlib
+import json
+import sys
+import zipfile
+from pathlib import Path
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.services.log_export import verify_manifest
+
+
+def main():
+    """Main function"""
+    if len(sys.argv) != 2:
+        raise SystemExit(__doc__)
+
+    with zipfile.ZipFile(sys.argv[1]) as archive:
+        manifest = json.loads(archive.read("manifest.json"))
+        digest = hashlib.sha256()
+        size = 0
+        with archive.open(manifest["file"]) as fh:
+            for chunk in iter(lambda: fh.read(1024 * 1024), b""):
+                digest.update(chunk)
+                size += len(chunk)
+
+    problems = verify_manifest(manifest, digest.hexdigest(), size)
+    if problems:
+        print("❌ Export failed verification:")
+        for problem in problems:
+            print(f"   - {problem}")
+        raise SystemExit(1)
+
+    print(f"✅ {manifest['file']} is intact")
+    print(f"   Order:       {manifest['order_id']}")
+    print(f"   Rows:        {manifest['rows']}")
+    print(f"   Exported at: {manifest['exported_at']} by {manifest['exported_by']}")
+
+
+if __name__ == "__main__":
+    main()